@@ -0,0 +1,278 @@
+"""
+Answering many independent questions in one request (``/chat/batch``).
+
+Questions are processed in waves of ``chat_batch_wave_size``. For each wave:
+
+1. guardrails classify all questions with one model call per validator, while
+   the answer cache embeds all of them in one embedding call;
+2. the questions left (not refused, not cached) are expanded concurrently;
+3. every expanded query of the wave is embedded in a few large requests
+   (``chat_batch_embedding_size`` texts each);
+4. near-duplicate expansions are dropped per question and all remaining
+   vectors are searched with grouped statements
+   (``Database.fetch_grouped_vector_search``);
+5. each question's answer is generated as in the fast path (one LLM call over
+   its papers) and emitted as soon as it is ready.
+
+Retrieval of the next wave overlaps with generation of the previous ones.
+Expansion and generation calls share one semaphore, so a batch never has more
+than ``chat_batch_llm_concurrency`` LLM calls in flight.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, List, Optional
+
+import numpy as np
+
+from app.agent_infrastructure.agents.fast_path import generate
+from app.agent_infrastructure.evaluation import eval_queue
+from app.agent_infrastructure.guardrails.guardrails import guardrails_validator_batch
+from app.agent_infrastructure.infrastructure.answer_cache import AnswerCacheLookup, CachedAnswer, answer_cache
+from app.agent_infrastructure.tools.document_retriver import (
+    NUM_QUERIES,
+    SEARCH_LIMIT,
+    deduplicate_papers,
+    embed,
+    fuse_results,
+    multi_query_retriever,
+)
+from app.core.config import settings
+from app.core.deadline import current_deadline, timeout_for
+from app.core.metrics import metrics
+from app.core.resilience import get_upstream
+from app.core.vectors import as_batch, dedupe_rows
+from app.db.client import Database
+from app.schema.chat_response import REFUSAL_MESSAGE, BatchAnswer, BatchSummary, CitedDocument
+from app.schema.retrieved_paper import RetrievedPaper
+
+batch_questions = metrics.counter(
+    "chat_batch_questions_total", "Questions handled by /chat/batch, by outcome (answered/refused/cached/failed)"
+)
+batch_stage_seconds = metrics.histogram("chat_batch_stage_seconds", "Duration of one /chat/batch wave stage, by stage")
+agent_upstream = get_upstream("agent_llm", hedge=False)
+
+
+@dataclass
+class BatchItem:
+    """One question on its way through a batch."""
+    index: int
+    question: str
+    lookup: Optional[AnswerCacheLookup] = None
+    papers: List[RetrievedPaper] = field(default_factory=list)
+
+
+class BatchAnswerer:
+    """
+    Answers the questions of one /chat/batch request, emitting answers as they complete.
+
+    Attributes:
+        questions (list[str]): The questions, answered independently of each other.
+        bypass_cache (bool): Skip answer cache hits (fresh answers are still stored).
+    """
+
+    def __init__(self, questions: List[str], bypass_cache: bool = False):
+        self.questions = questions
+        self.bypass_cache = bypass_cache
+        self.started = time.perf_counter()
+        self._llm = asyncio.Semaphore(settings.chat_batch_llm_concurrency)
+        self._summary = BatchSummary(questions=len(questions))
+
+    def summary(self) -> BatchSummary:
+        elapsed = time.perf_counter() - self.started
+        self._summary.elapsed_ms = elapsed * 1000
+        done = self._summary.answered + self._summary.refused + self._summary.cached + self._summary.failed
+        self._summary.questions_per_minute = done / elapsed * 60 if elapsed > 0 else 0.0
+        deadline = current_deadline()
+        self._summary.degradations = list(deadline.degradations) if deadline is not None else []
+        return self._summary
+
+    async def run(self) -> AsyncIterator[BatchAnswer]:
+        """Yield one ``BatchAnswer`` per question, in completion order."""
+        queue: asyncio.Queue = asyncio.Queue()
+        generations: List[asyncio.Task] = []
+
+        async def produce():
+            try:
+                size = max(1, settings.chat_batch_wave_size)
+                for start in range(0, len(self.questions), size):
+                    items = [
+                        BatchItem(index, question)
+                        for index, question in enumerate(self.questions[start:start + size], start=start)
+                    ]
+                    try:
+                        ready = await self._prepare_wave(items, queue)
+                    except Exception as e:
+                        print(f"Error preparing batch wave at {start}: {e}")
+                        for item in items:
+                            await queue.put(self._emit(item, error=str(e)))
+                        continue
+                    generations.extend(asyncio.create_task(self._generate(item, queue)) for item in ready)
+                await asyncio.gather(*generations, return_exceptions=True)
+            finally:
+                await queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (answer := await queue.get()) is not None:
+                yield answer
+        finally:
+            # The client went away (or the deadline hit): stop the remaining work.
+            for task in [producer, *generations]:
+                if not task.done():
+                    task.cancel()
+
+    async def _prepare_wave(self, items: List[BatchItem], queue: asyncio.Queue) -> List[BatchItem]:
+        """
+        Guardrails, answer cache and retrieval for one wave.
+
+        Refusals, cache hits and, if retrieval fails, errors are emitted here;
+        the questions left to answer are returned.
+        """
+        started = time.perf_counter()
+        verdicts, lookups = await asyncio.gather(
+            guardrails_validator_batch([item.question for item in items]),
+            self._lookup_answers(items),
+        )
+        batch_stage_seconds.observe(time.perf_counter() - started, stage="guardrails_and_cache")
+
+        ready = []
+        for item, verdict, lookup in zip(items, verdicts, lookups):
+            item.lookup = lookup
+            if not verdict.get("validationPassed", False):
+                await queue.put(self._emit(item, answer=REFUSAL_MESSAGE, refused=True))
+            elif lookup is not None and lookup.hit is not None:
+                await queue.put(self._emit(
+                    item, answer=lookup.hit.answer, documents=lookup.hit.documents, cached=True
+                ))
+            else:
+                ready.append(item)
+        if ready:
+            try:
+                await self._retrieve(ready)
+            except Exception as e:
+                # Answering from zero papers would pass as "answered" (and be cached): fail these questions.
+                print(f"Error retrieving for batch wave at {items[0].index}: {e}")
+                for item in ready:
+                    await queue.put(self._emit(item, error=str(e)))
+                return []
+        return ready
+
+    async def _lookup_answers(self, items: List[BatchItem]) -> List[Optional[AnswerCacheLookup]]:
+        if not settings.answer_cache_enabled:
+            return [None] * len(items)
+        try:
+            return await answer_cache.lookup_many(
+                [[{"role": "user", "content": item.question}] for item in items], bypass=self.bypass_cache
+            )
+        except Exception as e:
+            print(f"Error in batch answer cache lookup: {e}")
+            return [None] * len(items)
+
+    async def _expand(self, question: str) -> List[str]:
+        async with self._llm:
+            queries = await multi_query_retriever(question, NUM_QUERIES)
+        return [query for query in queries if isinstance(query, str) and query.strip()] or [question]
+
+    async def _embed(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Embeddings of ``texts`` in requests of ``chat_batch_embedding_size``; None where a request failed."""
+        size = max(1, settings.chat_batch_embedding_size)
+        chunks = [texts[start:start + size] for start in range(0, len(texts), size)]
+        batches = await asyncio.gather(*(asyncio.to_thread(embed.embed_documents, chunk) for chunk in chunks))
+        vectors: List[Optional[np.ndarray]] = []
+        for chunk, batch in zip(chunks, batches):
+            vectors.extend(batch if len(batch) == len(chunk) else [None] * len(chunk))
+        return vectors
+
+    async def _retrieve(self, items: List[BatchItem]) -> None:
+        """Fill ``papers`` for every item, sharing embedding requests and search statements across the wave."""
+        started = time.perf_counter()
+        expansions = await asyncio.gather(*(self._expand(item.question) for item in items))
+        expanded = time.perf_counter()
+        vectors = await self._embed([query for queries in expansions for query in queries])
+        embedded = time.perf_counter()
+
+        search_vectors, owners, offset = [], [], 0
+        for item, queries in zip(items, expansions):
+            rows = [vector for vector in vectors[offset:offset + len(queries)] if vector is not None]
+            offset += len(queries)
+            if not rows:
+                continue
+            batch = as_batch(rows)
+            kept = batch[dedupe_rows(batch, settings.retrieval_query_dedup_similarity)]
+            search_vectors.append(kept)
+            owners.extend([item] * len(kept))
+        if search_vectors:
+            results = await Database.fetch_grouped_vector_search(np.concatenate(search_vectors), limit=SEARCH_LIMIT)
+            for item, papers in zip(owners, results):
+                item.papers.extend(papers)
+        for item in items:
+            item.papers = deduplicate_papers(fuse_results(item.papers))
+
+        batch_stage_seconds.observe(expanded - started, stage="query_expansion")
+        batch_stage_seconds.observe(embedded - expanded, stage="embedding")
+        batch_stage_seconds.observe(time.perf_counter() - embedded, stage="vector_search")
+
+    async def _generate(self, item: BatchItem, queue: asyncio.Queue) -> None:
+        """Answer one question from its papers (fast path generation) and emit it."""
+        state = {"messages": [{"role": "user", "content": item.question}], "retrieved_docs": [item.papers]}
+        try:
+            async with self._llm:
+                update = await asyncio.wait_for(
+                    agent_upstream.acall(lambda: generate(state)),
+                    timeout=timeout_for(settings.chat_deadline_seconds),
+                )
+            answer = update["messages"][-1].content
+        except asyncio.TimeoutError:
+            await queue.put(self._emit(item, error="Question deadline exceeded"))
+            return
+        except Exception as e:
+            print(f"Error answering batch question {item.index}: {e}")
+            await queue.put(self._emit(item, error=str(e)))
+            return
+
+        documents = [paper.to_dict() for paper in item.papers]
+        emitted = self._emit(item, answer=answer, documents=documents)
+        await queue.put(emitted)
+        self._store(item, answer, [doc.model_dump() for doc in emitted.documents])
+        try:
+            await eval_queue.enqueue_evaluation(
+                item.question, answer, [item.papers], pipeline="batch", model=update.get("model")
+            )
+        except Exception as e:
+            print(f"Error queueing evaluation for batch question {item.index}: {e}")
+
+    @staticmethod
+    def _store(item: BatchItem, answer: str, documents: List[dict]) -> None:
+        """Cache a fresh answer unless the batch ran degraded."""
+        deadline = current_deadline()
+        if item.lookup is None or (deadline is not None and deadline.degradations):
+            return
+        answer_cache.store(item.lookup, CachedAnswer(answer=answer, documents=documents))
+
+    def _emit(
+            self,
+            item: BatchItem,
+            answer: Optional[str] = None,
+            documents: Optional[List[dict]] = None,
+            refused: bool = False,
+            cached: bool = False,
+            error: Optional[str] = None,
+    ) -> BatchAnswer:
+        outcome = "failed" if error else "refused" if refused else "cached" if cached else "answered"
+        batch_questions.inc(outcome=outcome)
+        setattr(self._summary, outcome, getattr(self._summary, outcome) + 1)
+        return BatchAnswer(
+            index=item.index,
+            question=item.question,
+            answer=answer,
+            documents=[
+                CitedDocument(id=doc.get("id"), title=doc.get("title"), category=doc.get("category"))
+                for doc in documents or []
+            ],
+            refused=refused,
+            cached=cached,
+            error=error,
+            completed_ms=(time.perf_counter() - self.started) * 1000,
+        )
@@ -0,0 +1,122 @@
+import re
+from typing import List, Tuple
+
+from langgraph.graph import END, START, StateGraph
+
+from app.agent_infrastructure.agents.main_agent import rag_agent
+from app.agent_infrastructure.agents.model_router import MULTI_STEP, get_model, route_model
+from app.agent_infrastructure.prompt_templates import rag_answer_prompt_template
+from app.agent_infrastructure.tools.document_retriver import document_retriever_utils
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.schema.langgraph_agent_states import MAINAGENTSTATE
+from app.schema.retrieved_paper import RetrievedPaper
+
+pipeline_routes = metrics.counter("chat_pipeline_routes_total", "Requests routed to each pipeline, by reason")
+
+# Follow-ups that refer back to the conversation instead of naming the subject.
+_ANAPHORA = re.compile(r"\b(it|its|this|that|these|those|they|them|above|previous|earlier)\b", re.IGNORECASE)
+_MAX_FAST_PATH_WORDS = 60
+
+
+def _content(message) -> str:
+    return message.get("content", "") if isinstance(message, dict) else getattr(message, "content", "")
+
+
+def _role(message) -> str:
+    return message.get("role", "") if isinstance(message, dict) else getattr(message, "type", "")
+
+
+def route_question(messages: List) -> Tuple[str, str]:
+    """
+    Decide between the fast path and the full ReAct agent.
+
+    The fast path retrieves on the latest message verbatim, so anything that
+    needs planning, several searches or the earlier conversation to form the
+    query goes to the agent.
+
+    Args:
+        messages (list): The conversation, latest user message last.
+
+    Returns:
+        tuple[str, str]: ``("fast" | "agent", reason)``.
+    """
+    question = _content(messages[-1]).strip()
+    words = question.split()
+    has_history = any(_role(m) in ("assistant", "ai") for m in messages[:-1])
+
+    if len(words) < 3 and "?" not in question:
+        return "agent", "no_question"
+    if len(words) > _MAX_FAST_PATH_WORDS:
+        return "agent", "long_question"
+    if question.count("?") > 1:
+        return "agent", "several_questions"
+    if MULTI_STEP.search(question):
+        return "agent", "multi_step"
+    if has_history and _ANAPHORA.search(question):
+        return "agent", "follow_up"
+    return "fast", "single_lookup"
+
+
+def format_context(papers: List[RetrievedPaper]) -> str:
+    """Render retrieved papers for the generation prompt."""
+    if not papers:
+        return "No documents were retrieved."
+    return "\n\n".join(
+        f"[{paper.id}] {paper.title} ({paper.category})\n{paper.abstract}"
+        for paper in papers
+    )
+
+
+async def retrieve(state: MAINAGENTSTATE) -> dict:
+    """Retrieve on the latest user message, without asking the LLM first."""
+    documents = await document_retriever_utils(_content(state["messages"][-1]))
+    return {"retrieved_docs": [documents]}
+
+
+async def generate(state: MAINAGENTSTATE) -> dict:
+    """Answer in a single generation call with the documents in the system prompt."""
+    documents = [doc for batch in state.get("retrieved_docs") or [] for doc in batch]
+    messages = rag_answer_prompt_template(format_context(documents)) + state["messages"]
+    model = route_model(state)
+    response = await get_model(model).ainvoke(messages)
+    return {"messages": [response], "model": model}
+
+
+def build_fast_path_agent():
+    """
+    Retrieve-then-generate graph with the same state as ``rag_agent``.
+
+    The generation node is named ``agent`` so streaming and evaluation treat
+    its tokens like the ReAct agent's answer.
+    """
+    graph = StateGraph(MAINAGENTSTATE)
+    graph.add_node("retrieve", retrieve)
+    graph.add_node("agent", generate)
+    graph.add_edge(START, "retrieve")
+    graph.add_edge("retrieve", "agent")
+    graph.add_edge("agent", END)
+    return graph.compile()
+
+
+fast_rag_agent = build_fast_path_agent()
+
+
+def select_agent(messages: List, pipeline: str | None = None):
+    """
+    Pick the graph for a conversation.
+
+    Args:
+        messages (list): The conversation, latest user message last.
+        pipeline (str | None): "auto", "agent" or "fast"; defaults to ``settings.chat_pipeline``.
+
+    Returns:
+        tuple[str, CompiledStateGraph]: The pipeline name and its graph.
+    """
+    pipeline = pipeline or settings.chat_pipeline
+    if pipeline == "auto":
+        pipeline, reason = route_question(messages)
+    else:
+        reason = "forced"
+    pipeline_routes.inc(pipeline=pipeline, reason=reason)
+    return pipeline, fast_rag_agent if pipeline == "fast" else rag_agent
@@ -3,7 +3,7 @@ from langchain_core.messages import AnyMessage
 from langgraph.prebuilt import create_react_agent
 
 from app.agent_infrastructure.prompt_templates import agent_prompt_template
-from app.agent_infrastructure.infrastructure.llm_clients import gpt_41
+from app.agent_infrastructure.agents.model_router import record_routed_model, select_agent_model
 from app.agent_infrastructure.tools.document_retriver import document_retriever
 from app.schema.langgraph_agent_states import MAINAGENTSTATE
 
@@ -21,9 +21,11 @@ def prompt(state: MAINAGENTSTATE) -> list[AnyMessage]:
     system_msg = agent_prompt_template()
     return system_msg + state["messages"]
 
+# The model is chosen per LLM call (gpt-4o or gpt-4o-mini) by the routing policy.
 rag_agent = create_react_agent(
-    model=gpt_41,
+    model=select_agent_model,
     tools=[document_retriever],
     prompt=prompt,
+    post_model_hook=record_routed_model,
     state_schema=MAINAGENTSTATE
 )
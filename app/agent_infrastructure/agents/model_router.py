@@ -0,0 +1,197 @@
+import json
+import math
+import re
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from app.agent_infrastructure.infrastructure.llm_clients import get_chat_model
+from app.agent_infrastructure.tools.document_retriver import document_retriever
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.schema.retrieved_paper import as_paper
+
+routing_decisions = metrics.counter("model_routing_decisions_total", "Generation model chosen per LLM call, by reason")
+
+LARGE_MODEL, SMALL_MODEL = "gpt-4o", "gpt-4o-mini"
+# Routed model -> ``llm_clients`` client, built on first use.
+MODELS = {LARGE_MODEL: "gpt_41", SMALL_MODEL: "gpt_41_mini_agent"}
+# The ReAct agent needs the tool schema bound; bind once per model rather than per call.
+_tool_models: dict = {}
+
+
+def get_model(name: str):
+    """The chat client for a routed model name (``LARGE_MODEL`` or ``SMALL_MODEL``)."""
+    return get_chat_model(MODELS[name])
+
+
+def get_tool_model(name: str):
+    """``get_model(name)`` with the retriever tool bound."""
+    if name not in _tool_models:
+        _tool_models[name] = get_model(name).bind_tools([document_retriever])
+    return _tool_models[name]
+
+# Questions that usually need several retrievals or reasoning between them.
+MULTI_STEP = re.compile(
+    r"\b(compare|comparison|contrast|versus|vs\.?|difference between|differences between|"
+    r"step by step|and then|first\b.*\bthen|pros and cons|trade-?offs?|each of)\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class RoutingFeatures:
+    """Cheap per-call features the routing policy looks at."""
+    query_words: int
+    context_chars: int
+    conversation_turns: int
+    multi_step: int
+
+    def vector(self) -> List[float]:
+        return [self.query_words / 10, self.context_chars / 1000, self.conversation_turns, self.multi_step]
+
+
+FEATURE_NAMES = ["query_words_x10", "context_kchars", "conversation_turns", "multi_step"]
+
+
+def _content(message) -> str:
+    content = message.get("content", "") if isinstance(message, dict) else getattr(message, "content", "")
+    return content if isinstance(content, str) else str(content)
+
+
+def _is_user(message) -> bool:
+    role = message.get("role") if isinstance(message, dict) else getattr(message, "type", None)
+    return role in ("user", "human")
+
+
+def extract_features(state: dict) -> RoutingFeatures:
+    """
+    Features from the agent state: the latest question, the retrieved context and the conversation length.
+
+    Args:
+        state (dict): LangGraph agent state (messages, retrieved_docs).
+
+    Returns:
+        RoutingFeatures: The features for this call.
+    """
+    user_messages = [m for m in state.get("messages", []) if _is_user(m)]
+    question = _content(user_messages[-1]) if user_messages else ""
+    context_chars = sum(
+        len(as_paper(doc).abstract)
+        for batch in state.get("retrieved_docs") or []
+        for doc in (batch if isinstance(batch, list) else [batch])
+    )
+    return RoutingFeatures(
+        query_words=len(question.split()),
+        context_chars=context_chars,
+        conversation_turns=len(user_messages),
+        multi_step=int(bool(MULTI_STEP.search(question))),
+    )
+
+
+class RoutingClassifier:
+    """Logistic model predicting that the small model answers as well as the large one."""
+
+    def __init__(self, weights: List[float], bias: float, threshold: float = 0.5):
+        self.weights = weights
+        self.bias = bias
+        self.threshold = threshold
+
+    @classmethod
+    def load(cls, path: str) -> "RoutingClassifier":
+        data = json.loads(Path(path).read_text())
+        return cls(data["weights"], data["bias"], data.get("threshold", 0.5))
+
+    def probability(self, features: RoutingFeatures) -> float:
+        z = self.bias + sum(w * x for w, x in zip(self.weights, features.vector()))
+        return 1 / (1 + math.exp(-z))
+
+
+class ModelRoutingPolicy:
+    """
+    Chooses gpt-4o or gpt-4o-mini for each generation call.
+
+    Modes: ``off`` (always gpt-4o), ``heuristic`` (mini for short single-turn
+    questions over a small context) and ``classifier`` (a logistic model fitted
+    by ``scripts/replay_model_routing.py``, falling back to the heuristic when
+    no weights are configured).
+    """
+
+    def __init__(
+            self,
+            mode: str = "heuristic",
+            max_query_words: int = 20,
+            max_context_chars: int = 6000,
+            max_turns: int = 1,
+            classifier: Optional[RoutingClassifier] = None,
+    ):
+        self.mode = mode
+        self.max_query_words = max_query_words
+        self.max_context_chars = max_context_chars
+        self.max_turns = max_turns
+        self.classifier = classifier
+
+    @classmethod
+    def from_settings(cls) -> "ModelRoutingPolicy":
+        classifier = None
+        if settings.model_routing_mode == "classifier" and settings.model_routing_classifier_path:
+            try:
+                classifier = RoutingClassifier.load(settings.model_routing_classifier_path)
+            except Exception as e:
+                print(f"Could not load routing classifier, using the heuristic: {e}")
+        return cls(
+            mode=settings.model_routing_mode,
+            max_query_words=settings.model_routing_max_query_words,
+            max_context_chars=settings.model_routing_max_context_chars,
+            max_turns=settings.model_routing_max_turns,
+            classifier=classifier,
+        )
+
+    def choose(self, features: RoutingFeatures) -> Tuple[str, str]:
+        """
+        Returns:
+            tuple[str, str]: The model name and the reason for the decision.
+        """
+        if self.mode == "off":
+            return LARGE_MODEL, "routing_off"
+        if self.classifier is not None:
+            probability = self.classifier.probability(features)
+            return (SMALL_MODEL if probability >= self.classifier.threshold else LARGE_MODEL), "classifier"
+        if features.multi_step:
+            return LARGE_MODEL, "multi_step"
+        if features.conversation_turns > self.max_turns:
+            return LARGE_MODEL, "long_conversation"
+        if features.query_words > self.max_query_words:
+            return LARGE_MODEL, "long_query"
+        if features.context_chars > self.max_context_chars:
+            return LARGE_MODEL, "large_context"
+        return SMALL_MODEL, "simple_question"
+
+
+routing_policy = ModelRoutingPolicy.from_settings()
+
+
+def route_model(state: dict) -> str:
+    """Pick and log the model for one generation call."""
+    features = extract_features(state)
+    model, reason = routing_policy.choose(features)
+    routing_decisions.inc(model=model, reason=reason)
+    print(f"Model routing: {model} ({reason}) {asdict(features)}")
+    return model
+
+
+def record_routed_model(state: dict) -> dict:
+    """
+    ``post_model_hook`` of the ReAct agent: keep the routed model in the state.
+
+    Routing only looks at the user messages and the retrieved documents, which
+    the model call does not change, so choosing again gives the model that ran
+    (without logging the decision twice).
+    """
+    model, _ = routing_policy.choose(extract_features(state))
+    return {"model": model}
+
+
+def select_agent_model(state: dict, runtime=None):
+    """Dynamic model for ``create_react_agent``: the routed model with the retriever tool bound."""
+    return get_tool_model(route_model(state))
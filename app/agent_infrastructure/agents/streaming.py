@@ -0,0 +1,58 @@
+import json
+from typing import Any, AsyncIterator, List, Tuple
+
+from app.schema.retrieved_paper import as_paper
+
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def document_ids(documents: List[Any]) -> List[Any]:
+    """Best-effort ids for retrieved documents (falls back to the title)."""
+    return [paper.id or paper.title for paper in map(as_paper, documents)]
+
+
+async def stream_agent_events(agent_input: dict, agent) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Run the agent and yield ``(event, data)`` pairs for the client.
+
+    Yields ``retrieval_started`` / ``retrieval_finished`` around each
+    ``document_retriever`` call (or the fast path's ``retrieve`` node), ``token``
+    for every answer token generated by the agent node (tokens from the
+    query-expansion LLM inside the tool are skipped), and finally
+    ``final_state`` with the full LangGraph state.
+
+    Args:
+        agent_input (dict): The initial state for the agent.
+        agent: The graph to run, ``rag_agent`` or ``fast_rag_agent``.
+    """
+    async for event in agent.astream_events(agent_input, version="v2"):
+        kind = event["event"]
+        metadata = event.get("metadata", {})
+
+        if kind == "on_chat_model_stream" and metadata.get("langgraph_node") == "agent":
+            content = event["data"]["chunk"].content
+            if content:
+                yield "token", {"content": content}
+
+        elif kind == "on_tool_start" and event["name"] == "document_retriever":
+            yield "retrieval_started", {"query": event["data"].get("input", {}).get("query")}
+
+        elif kind == "on_chain_start" and event["name"] == "retrieve" and metadata.get("langgraph_node") == "retrieve":
+            yield "retrieval_started", {"query": agent_input["messages"][-1]["content"]}
+
+        elif kind == "on_tool_end" and event["name"] == "document_retriever":
+            update = getattr(event["data"].get("output"), "update", None) or {}
+            documents = [doc for batch in update.get("retrieved_docs", []) for doc in batch]
+            yield "retrieval_finished", {"document_ids": document_ids(documents), "count": len(documents)}
+
+        elif kind == "on_chain_end" and event["name"] == "retrieve" and metadata.get("langgraph_node") == "retrieve":
+            update = event["data"].get("output") or {}
+            documents = [doc for batch in update.get("retrieved_docs", []) for doc in batch]
+            yield "retrieval_finished", {"document_ids": document_ids(documents), "count": len(documents)}
+
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            yield "final_state", event["data"]["output"]
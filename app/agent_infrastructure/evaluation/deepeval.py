@@ -1,4 +1,3 @@
-import asyncio
 import json
 from deepeval.test_case import LLMTestCase, ToolCall
 from deepeval.metrics import (
@@ -16,127 +15,127 @@ from deepeval.models import AzureOpenAIModel
 from deepeval import evaluate
 from app.db.client import Database
 from app.core.config import settings
+from app.agent_infrastructure.evaluation.sampling import to_text_context
 
+# Online evaluation metrics by config name (see ``sampling.JUDGE_CALLS`` for their cost).
+METRIC_CLASSES = {
+    "answer_relevancy": AnswerRelevancyMetric,
+    "faithfulness": FaithfulnessMetric,
+    "contextual_relevancy": ContextualRelevancyMetric,
+    "task_completion": TaskCompletionMetric,
+    "bias": BiasMetric,
+    "toxicity": ToxicityMetric,
+    "hallucination": HallucinationMetric,
+}
 
-def _to_text_context(retrieved_docs: List[Any]) -> List[str]:
+
+METRICS_COLUMNS = ("query", "output", "metrics")
+
+
+def metrics_row(user_query: str,
+                agent_output: str,
+                results: Dict[str, Any],
+                sampling: Dict[str, Any] | None = None) -> tuple:
     """
-    Convert your retrieved docs to strings for DeepEval.
-    Handles both dict format and Document objects with metadata and page_content.
+    One ``metrics`` table row (``METRICS_COLUMNS``) for DeepEval test results.
+
+    With ``sampling`` (``key``, ``strata`` and ``weights`` by DeepEval metric
+    name) each metric records its ``sampling_weight`` (1 / inclusion
+    probability), so weighted aggregates over the table stay unbiased.
     """
-    if not retrieved_docs:
-        return []
-    
-    out = []
-    
-    # Flatten if it's a nested list
-    docs_to_process = retrieved_docs
-    if retrieved_docs and isinstance(retrieved_docs[0], list):
-        docs_to_process = retrieved_docs[0]
-    
-    for d in docs_to_process:
-        text = ""
-        
-        # Handle Document objects (with metadata and page_content attributes)
-        if hasattr(d, 'metadata') and hasattr(d, 'page_content'):
-            title = d.metadata.get("title", "") if d.metadata else ""
-            category = d.metadata.get("category", "") if d.metadata else ""
-            abstract = d.page_content or ""
-            text = abstract or f"{title} [{category}]"
-        
-        # Handle dictionary format
-        elif isinstance(d, dict):
-            abstract = d.get("abstract") or ""
-            title = d.get("title") or ""
-            cat = d.get("category") or ""
-            text = abstract or f"{title} [{cat}]"
-        
-        if text:
-            out.append(text)
-    
-    return out
-
-
-async def _insert_metrics_async(user_query: str, agent_output: str, results: Dict[str, Any]) -> None:
-    """Async helper to insert metrics (assumes DB is already initialized)."""
-    try:
-        json_list = []
-        for test in results:
-            test_dict = {
-                "name": test.name,
-                "success": test.success,
-                "metrics_data": []
+    json_list = []
+    for test in results:
+        test_dict = {
+            "name": test.name,
+            "success": test.success,
+            "metrics_data": []
+        }
+        if sampling:
+            test_dict["sampling"] = {"key": sampling["key"], "strata": sampling["strata"]}
+        for metric in test.metrics_data:
+            metric_dict = {
+                "name": metric.name,
+                "threshold": metric.threshold,
+                "success": metric.success,
+                "score": metric.score,
+                "reason": metric.reason
             }
-            for metric in test.metrics_data:
-                metric_dict = {
-                    "name": metric.name,
-                    "threshold": metric.threshold,
-                    "success": metric.success,
-                    "score": metric.score,
-                    "reason": metric.reason
-                }
-                test_dict["metrics_data"].append(metric_dict)
-            json_list.append(test_dict)
- 
-        await Database.execute(
-            """
-            INSERT INTO metrics (query, output, metrics)
-            VALUES ($1, $2, $3::jsonb)
-            """,
-            user_query,
-            agent_output,
-            json.dumps(json_list),
-        )
+            if sampling:
+                metric_dict["sampling_weight"] = sampling["weights"].get(metric.name, 1.0)
+            test_dict["metrics_data"].append(metric_dict)
+        json_list.append(test_dict)
+    return user_query, agent_output, json.dumps(json_list)
+
+
+async def _insert_metrics_async(user_query: str,
+                                agent_output: str,
+                                results: Dict[str, Any],
+                                sampling: Dict[str, Any] | None = None) -> None:
+    """Async helper to write one metrics row (see ``metrics_row``); raises if it was not stored."""
+    try:
+        await Database.copy_rows("metrics", METRICS_COLUMNS, [metrics_row(user_query, agent_output, results, sampling)])
     except Exception as e:
         print(f"❌ Error inserting metrics into DB: {e}")
         raise
 
 
+def build_judge_model() -> AzureOpenAIModel:
+    """The Azure OpenAI model DeepEval metrics use as judge."""
+    return AzureOpenAIModel(
+        model_name=settings.azure_openai_41_mini_deployment_name,
+        deployment_name=settings.azure_openai_41_mini_deployment_name,
+        azure_openai_api_key=settings.azure_openai_41_mini_api_key,
+        openai_api_version=settings.azure_openai_41_mini_api_version,
+        azure_endpoint=settings.azure_openai_41_mini_endpoint,
+        temperature=0
+    )
+
+
+def build_test_case(user_query: str,
+                    agent_output: str,
+                    context: List[str],
+                    tools_used: List[str] | None = None,
+                    name: str | None = None) -> LLMTestCase:
+    """One DeepEval test case from a finished chat turn (``context`` already as text)."""
+    return LLMTestCase(
+        input=user_query,
+        actual_output=agent_output,
+        context=context,
+        retrieval_context=context,
+        tools_called=[ToolCall(name=tool) for tool in (tools_used or [])],
+        name=name,
+    )
+
+
+def build_metrics(judge: AzureOpenAIModel, names: List[str] | None = None) -> list:
+    """
+    The online evaluation metrics judged by ``judge``: response generation
+    (answer relevancy, faithfulness), retrieval (contextual relevancy), task
+    completion and safety (bias, toxicity, hallucination).
+
+    Args:
+        judge (AzureOpenAIModel): The judge model shared by all metrics.
+        names (list[str] | None): Subset of ``METRIC_CLASSES`` keys; all metrics when None.
+    """
+    return [METRIC_CLASSES[name](model=judge) for name in (names or METRIC_CLASSES)]
+
+
 async def run_deep_eval(user_query: str,
                              agent_output: str,
                              retrieved_docs: List[Any],
                              tools_used: List[str] | None = None) -> Dict[str, Dict[str, Any]]:
     """
-    Run DeepEval metrics asynchronously and return the results.
+    Run DeepEval metrics for a single turn and store the results.
+
+    The API enqueues evaluations instead (see ``eval_queue``); this inline
+    variant is kept for ad-hoc runs.
     """
     try:
         print("⚡ DeepEval started...")
 
-        azure_openai = AzureOpenAIModel(
-            model_name=settings.azure_openai_41_mini_deployment_name,
-            deployment_name=settings.azure_openai_41_mini_deployment_name,
-            azure_openai_api_key=settings.azure_openai_41_mini_api_key,
-            openai_api_version=settings.azure_openai_41_mini_api_version,
-            azure_endpoint=settings.azure_openai_41_mini_endpoint,
-            temperature=0
-        )
-
-        tool_calls = [ToolCall(name=name) for name in (tools_used or [])]
-
-        rag_context = _to_text_context(retrieved_docs)
-
-        test_case = [LLMTestCase(
-            input=user_query,
-            actual_output=agent_output,
-            context=rag_context,
-            retrieval_context=rag_context,
-            tools_called=tool_calls
-        )]
-
-        metrics = [
-            # Response generation metrics
-            AnswerRelevancyMetric(model=azure_openai),
-            FaithfulnessMetric(model=azure_openai),
-            # Retrieval metrics
-            ContextualRelevancyMetric(model=azure_openai),
-            # Task completion metrics
-            TaskCompletionMetric(model=azure_openai),
-            # ToolCorrectnessMetric(),
-            # Safety metrics
-            BiasMetric(model=azure_openai),
-            ToxicityMetric(model=azure_openai),
-            HallucinationMetric(model=azure_openai),
-        ]
-        results = evaluate(test_cases=test_case, metrics=metrics)
+        azure_openai = build_judge_model()
+        test_case = [build_test_case(user_query, agent_output, to_text_context(retrieved_docs), tools_used)]
+        results = evaluate(test_cases=test_case, metrics=build_metrics(azure_openai))
         await _insert_metrics_async(user_query, agent_output, results.test_results)
         return results
 
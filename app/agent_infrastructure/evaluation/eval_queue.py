@@ -0,0 +1,210 @@
+import json
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, List
+
+from app.agent_infrastructure.evaluation.sampling import SamplingDecision, evaluation_sampler, to_text_context
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.client import Database
+from app.schema.retrieved_paper import as_paper
+
+EVAL_JOBS_DDL = """
+CREATE TABLE IF NOT EXISTS eval_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    payload JSONB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    enqueued_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    claimed_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS eval_jobs_pending_idx ON eval_jobs (id) WHERE status IN ('pending', 'running');
+"""
+
+eval_jobs_enqueued = metrics.counter("eval_jobs_enqueued_total", "Evaluation jobs enqueued by the API")
+eval_queue_backlog = metrics.gauge("eval_queue_backlog", "Evaluation jobs waiting or running, by status")
+eval_queue_lag = metrics.gauge("eval_queue_lag_seconds", "Age of the oldest pending evaluation job")
+
+
+@dataclass
+class EvalJob:
+    """A claimed evaluation job; ``context`` is the retrieved documents as text."""
+    id: int
+    attempts: int
+    user_query: str
+    agent_output: str
+    context: List[str]
+    tools_used: List[str]
+    sampling: SamplingDecision | None = None
+
+
+def _top_category(retrieved_docs: List[Any]) -> str:
+    """Most frequent arXiv category among the retrieved documents."""
+    categories = Counter()
+    for batch in retrieved_docs or []:
+        for doc in (batch if isinstance(batch, list) else [batch]):
+            category = as_paper(doc).category
+            if category:
+                categories[category] += 1
+    return categories.most_common(1)[0][0] if categories else "none"
+
+
+async def ensure_schema() -> None:
+    await Database.execute(EVAL_JOBS_DDL)
+
+
+async def enqueue_evaluation(user_query: str,
+                             agent_output: str,
+                             retrieved_docs: List[Any],
+                             tools_used: List[str] | None = None,
+                             pipeline: str | None = None,
+                             cache_hit: bool = False,
+                             model: str | None = None) -> None:
+    """
+    Queue a finished chat turn for DeepEval; the worker process does the judging.
+
+    Only the metrics picked by ``evaluation_sampler`` (stratified by top
+    category, pipeline, routed model and cache hit) are queued, with their inclusion
+    probabilities; nothing is queued when no metric is sampled. Documents are
+    reduced to their text here so the job is plain JSON. Jobs are inserted
+    directly, not through the bulk writer, which may drop rows.
+    """
+    strata = {
+        "category": _top_category(retrieved_docs),
+        "pipeline": pipeline or "agent",
+        "model": model or "none",
+        "cache_hit": str(cache_hit).lower(),
+    }
+    decision = evaluation_sampler.sample(evaluation_sampler.sample_key(user_query, agent_output), strata)
+    if not decision.probabilities:
+        return
+    payload = {
+        "user_query": user_query,
+        "agent_output": agent_output,
+        "context": to_text_context(retrieved_docs),
+        "tools_used": tools_used or [],
+        "sampling": {"key": decision.key, "strata": decision.strata, "probabilities": decision.probabilities},
+    }
+    try:
+        await Database.execute("INSERT INTO eval_jobs (payload) VALUES ($1::jsonb);", json.dumps(payload))
+        eval_jobs_enqueued.inc()
+    except Exception as e:
+        print(f"❌ Error enqueuing evaluation: {e}")
+
+
+async def claim_jobs(limit: int, visibility_timeout: float) -> List[EvalJob]:
+    """
+    Claim up to ``limit`` jobs, oldest first.
+
+    ``FOR UPDATE SKIP LOCKED`` lets several workers poll without blocking on
+    each other. Jobs left ``running`` longer than ``visibility_timeout``
+    seconds (a worker died mid-batch) are claimed again.
+    """
+    rows = await Database.fetch(
+        """
+        UPDATE eval_jobs
+        SET status = 'running', claimed_at = now(), attempts = attempts + 1
+        WHERE id IN (
+            SELECT id FROM eval_jobs
+            WHERE status = 'pending'
+               OR (status = 'running' AND claimed_at < now() - make_interval(secs => $2))
+            ORDER BY id
+            FOR UPDATE SKIP LOCKED
+            LIMIT $1
+        )
+        RETURNING id, attempts, payload;
+        """,
+        limit,
+        float(visibility_timeout),
+    )
+    jobs = []
+    for row in sorted(rows, key=lambda r: r["id"]):
+        payload = json.loads(row["payload"])
+        sampling = payload.get("sampling")
+        jobs.append(EvalJob(
+            id=row["id"],
+            attempts=row["attempts"],
+            user_query=payload["user_query"],
+            agent_output=payload["agent_output"],
+            context=payload.get("context") or [],
+            tools_used=payload.get("tools_used") or [],
+            sampling=SamplingDecision(**sampling) if sampling else None,
+        ))
+    return jobs
+
+
+async def complete_jobs(job_ids: List[int]) -> None:
+    if job_ids:
+        await Database.execute(
+            "UPDATE eval_jobs SET status = 'done', finished_at = now(), error = NULL WHERE id = ANY($1::bigint[]);",
+            job_ids,
+        )
+
+
+async def skip_jobs(job_ids: List[int], reason: str) -> None:
+    if job_ids:
+        await Database.execute(
+            "UPDATE eval_jobs SET status = 'skipped', finished_at = now(), error = $2 WHERE id = ANY($1::bigint[]);",
+            job_ids,
+            reason,
+        )
+
+
+async def fail_job(job: EvalJob, error: str, max_attempts: int) -> None:
+    """Put the job back in the queue, or mark it failed after ``max_attempts``."""
+    status = "failed" if job.attempts >= max_attempts else "pending"
+    await Database.execute(
+        "UPDATE eval_jobs SET status = $2, error = $3, finished_at = CASE WHEN $2 = 'failed' THEN now() END "
+        "WHERE id = $1;",
+        job.id,
+        status,
+        error[:2000],
+    )
+
+
+async def refresh_queue_stats() -> dict:
+    """
+    Read the backlog and lag from the table and publish them as gauges.
+
+    Returns:
+        dict: ``pending`` and ``running`` counts and ``lag_seconds`` (age of the oldest pending job).
+    """
+    row = await Database.fetchrow(
+        """
+        SELECT count(*) FILTER (WHERE status = 'pending') AS pending,
+               count(*) FILTER (WHERE status = 'running') AS running,
+               COALESCE(EXTRACT(EPOCH FROM now() - min(enqueued_at) FILTER (WHERE status = 'pending')), 0) AS lag
+        FROM eval_jobs
+        WHERE status IN ('pending', 'running');
+        """,
+        pool="admin",
+    )
+    stats = {"pending": row["pending"], "running": row["running"], "lag_seconds": float(row["lag"])}
+    eval_queue_backlog.set(stats["pending"], status="pending")
+    eval_queue_backlog.set(stats["running"], status="running")
+    eval_queue_lag.set(stats["lag_seconds"])
+    return stats
+
+
+class QueueStatsRefresher:
+    """Refreshes the queue gauges at most every ``interval`` seconds (for ``/metrics`` scrapes)."""
+
+    def __init__(self, interval: float = 15):
+        self.interval = interval
+        self._refreshed_at = 0.0
+
+    async def maybe_refresh(self) -> None:
+        now = time.monotonic()
+        if now - self._refreshed_at < self.interval:
+            return
+        self._refreshed_at = now
+        try:
+            await refresh_queue_stats()
+        except Exception as e:
+            print(f"Error reading evaluation queue stats: {e}")
+
+
+queue_stats_refresher = QueueStatsRefresher(interval=settings.eval_queue_stats_interval_seconds)
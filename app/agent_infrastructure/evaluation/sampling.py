@@ -0,0 +1,157 @@
+"""
+Sampling of online evaluations, without DeepEval.
+
+The API decides which metrics a chat turn is evaluated with when it enqueues
+the job (``eval_queue``); only the evaluation worker imports DeepEval
+(``deepeval.py``) to run them.
+"""
+
+import hashlib
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.schema.retrieved_paper import RetrievedPaper, as_paper
+
+# Online evaluation metrics by config name, with a rough count of judge calls each makes per test case.
+JUDGE_CALLS = {
+    "answer_relevancy": 3,
+    "faithfulness": 3,
+    "contextual_relevancy": 2,
+    "task_completion": 2,
+    "bias": 2,
+    "toxicity": 2,
+    "hallucination": 1,
+}
+METRIC_NAMES = tuple(JUDGE_CALLS)
+
+sampling_decisions = metrics.counter(
+    "eval_sampling_decisions_total", "Online evaluation sampling decisions per metric (sampled/skipped)"
+)
+
+
+def to_text_context(retrieved_docs: List[Any]) -> List[str]:
+    """
+    Convert your retrieved docs to strings for DeepEval.
+    Handles ``RetrievedPaper`` records, dicts and Document objects (see ``as_paper``).
+    """
+    if not retrieved_docs:
+        return []
+    
+    out = []
+    
+    # Flatten if it's a nested list
+    docs_to_process = retrieved_docs
+    if retrieved_docs and isinstance(retrieved_docs[0], list):
+        docs_to_process = retrieved_docs[0]
+    
+    for d in docs_to_process:
+        if not isinstance(d, (RetrievedPaper, dict)) and not hasattr(d, 'page_content'):
+            continue
+        paper = as_paper(d)
+        text = paper.abstract or f"{paper.title or ''} [{paper.category or ''}]"
+        if text:
+            out.append(text)
+    
+    return out
+
+
+@dataclass
+class SamplingDecision:
+    """Metrics chosen for one chat turn and their inclusion probabilities."""
+    key: str
+    strata: Dict[str, str]
+    probabilities: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def metric_names(self) -> List[str]:
+        return list(self.probabilities)
+
+    @property
+    def weights(self) -> Dict[str, float]:
+        return {name: 1 / p for name, p in self.probabilities.items()}
+
+    @property
+    def judge_calls(self) -> int:
+        return sum(JUDGE_CALLS.get(name, 1) for name in self.probabilities)
+
+
+class EvaluationSampler:
+    """
+    Decides which metrics to run for a chat turn.
+
+    Each metric has a base rate, multiplied by the multiplier of every stratum
+    the turn belongs to (``cache_hit:true``, ``pipeline:fast``,
+    ``model:gpt-4o-mini``, ``category:cs.CL``, ...). The draw is a hash of the turn's key and the
+    metric name, so the same request always gets the same decision.
+
+    Attributes:
+        rates (dict[str, float]): Base sampling rate per metric.
+        strata_multipliers (dict[str, float]): Rate multiplier per ``dimension:value`` stratum.
+    """
+
+    def __init__(self, rates: Dict[str, float], strata_multipliers: Dict[str, float] | None = None):
+        self.rates = {name: rate for name, rate in rates.items() if name in METRIC_NAMES}
+        self.strata_multipliers = strata_multipliers or {}
+
+    @staticmethod
+    def sample_key(user_query: str, agent_output: str) -> str:
+        return hashlib.sha256(f"{user_query}\n{agent_output}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _draw(key: str, metric: str) -> float:
+        """Uniform in [0, 1), deterministic for (key, metric)."""
+        digest = hashlib.sha256(f"{key}:{metric}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+    def rate(self, metric: str, strata: Dict[str, str]) -> float:
+        rate = self.rates.get(metric, 0.0)
+        for dimension, value in strata.items():
+            rate *= self.strata_multipliers.get(f"{dimension}:{value}", 1.0)
+        return min(rate, 1.0)
+
+    def sample(self, key: str, strata: Dict[str, str]) -> SamplingDecision:
+        decision = SamplingDecision(key=key, strata=strata)
+        for metric in self.rates:
+            rate = self.rate(metric, strata)
+            if rate > 0 and self._draw(key, metric) < rate:
+                decision.probabilities[metric] = rate
+                sampling_decisions.inc(metric=metric, result="sampled")
+            else:
+                sampling_decisions.inc(metric=metric, result="skipped")
+        return decision
+
+
+class JudgeCallBudget:
+    """
+    Sliding one-hour budget of judge LLM calls (0 means unlimited).
+
+    Turns over budget are dropped rather than delayed; that is not corrected
+    by the sampling weights, so size the rates to stay under the budget.
+    """
+
+    def __init__(self, calls_per_hour: int):
+        self.calls_per_hour = calls_per_hour
+        self._spent: deque = deque()
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def try_spend(self, calls: int) -> bool:
+        if self.calls_per_hour <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            while self._spent and self._spent[0][0] <= now - 3600:
+                self._total -= self._spent.popleft()[1]
+            if self._total + calls > self.calls_per_hour:
+                return False
+            self._spent.append((now, calls))
+            self._total += calls
+            return True
+
+
+evaluation_sampler = EvaluationSampler(settings.eval_sampling_rates, settings.eval_sampling_strata)
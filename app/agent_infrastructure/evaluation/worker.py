@@ -0,0 +1,247 @@
+"""
+Evaluation worker: drains the ``eval_jobs`` queue with batched DeepEval runs.
+
+Runs outside the API process so LLM-judged metrics never compete with live
+traffic. Each poll claims up to ``--batch-size`` jobs (``SKIP LOCKED``, so
+several workers can run side by side), evaluates them with one ``evaluate()``
+call per set of sampled metrics, bounded judge concurrency and one shared
+judge client, stores the results (with sampling weights) in ``metrics`` and
+marks the jobs done. Jobs that would exceed the hourly judge-call budget
+are skipped.
+
+Usage:
+    python -m app.agent_infrastructure.evaluation.worker
+    python -m app.agent_infrastructure.evaluation.worker --batch-size 32 --max-concurrent 16 --metrics-port 9101
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+from deepeval import evaluate
+from deepeval.evaluate import AsyncConfig, DisplayConfig
+
+from app.agent_infrastructure.evaluation.deepeval import (
+    METRIC_CLASSES,
+    METRICS_COLUMNS,
+    build_judge_model,
+    build_metrics,
+    build_test_case,
+    metrics_row,
+)
+from app.agent_infrastructure.evaluation.eval_queue import (
+    EvalJob,
+    claim_jobs,
+    complete_jobs,
+    ensure_schema,
+    fail_job,
+    refresh_queue_stats,
+    skip_jobs,
+)
+from app.agent_infrastructure.evaluation.sampling import JudgeCallBudget
+from app.core.config import settings
+from app.core.metrics import metrics, render_prometheus
+from app.db.client import Database
+
+eval_jobs_processed = metrics.counter("eval_jobs_processed_total", "Evaluation jobs finished by the worker, by outcome")
+eval_batch_seconds = metrics.histogram(
+    "eval_batch_seconds", "Time to evaluate one batch of jobs",
+    buckets=(1, 2.5, 5, 10, 20, 40, 60, 120, 300, 600),
+)
+eval_batch_size = metrics.histogram(
+    "eval_batch_size", "Jobs per evaluated batch", buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+
+
+class EvaluationWorker:
+    """
+    Polls the queue and evaluates claimed jobs in batches.
+
+    Attributes:
+        batch_size (int): Jobs claimed and evaluated per ``evaluate()`` call.
+        max_concurrent (int): Concurrent judge calls within a batch.
+        poll_seconds (float): Sleep when the queue is empty.
+        max_attempts (int): Attempts before a job is marked failed.
+        visibility_timeout (float): Seconds before a job claimed by a dead worker is retried.
+        budget (JudgeCallBudget): Hourly judge-call budget of this worker.
+    """
+
+    def __init__(
+            self,
+            batch_size: int = 16,
+            max_concurrent: int = 8,
+            poll_seconds: float = 2,
+            max_attempts: int = 3,
+            visibility_timeout: float = 600,
+            judge_calls_per_hour: int = 0,
+    ):
+        self.batch_size = batch_size
+        self.max_concurrent = max_concurrent
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.budget = JudgeCallBudget(judge_calls_per_hour)
+        # One judge client for the worker's lifetime instead of one per evaluation.
+        self.judge = build_judge_model()
+
+    def _evaluate(self, jobs: List[EvalJob], metric_names: List[str]) -> dict:
+        """Blocking DeepEval run of ``metric_names`` over the jobs; returns the test results by job id."""
+        test_cases = [
+            build_test_case(job.user_query, job.agent_output, job.context, job.tools_used, name=str(job.id))
+            for job in jobs
+        ]
+        results = evaluate(
+            test_cases=test_cases,
+            metrics=build_metrics(self.judge, metric_names),
+            async_config=AsyncConfig(run_async=True, max_concurrent=self.max_concurrent),
+            display_config=DisplayConfig(show_indicator=False, print_results=False),
+        )
+        return {str(result.name): result for result in results.test_results}
+
+    def _evaluate_groups(self, groups: dict) -> dict:
+        results = {}
+        for metric_names, jobs in groups.items():
+            results.update(self._evaluate(jobs, list(metric_names)))
+        return results
+
+    def _sampling(self, job: EvalJob) -> dict | None:
+        """Sampling info for the metrics rows, with weights keyed by DeepEval metric name."""
+        if job.sampling is None:
+            return None
+        return {
+            "key": job.sampling.key,
+            "strata": job.sampling.strata,
+            "weights": {
+                metric.__name__: job.sampling.weights[name]
+                for name, metric in zip(job.sampling.metric_names, build_metrics(self.judge, job.sampling.metric_names))
+            },
+        }
+
+    async def run_batch(self, jobs: List[EvalJob]) -> None:
+        started = time.perf_counter()
+        # evaluate() runs one metric list over all its test cases, so group jobs by their sampled metrics.
+        groups, over_budget = defaultdict(list), []
+        for job in jobs:
+            metric_names = tuple(job.sampling.metric_names) if job.sampling else tuple(METRIC_CLASSES)
+            cost = job.sampling.judge_calls if job.sampling else len(metric_names)
+            if self.budget.try_spend(cost):
+                groups[metric_names].append(job)
+            else:
+                over_budget.append(job.id)
+        if over_budget:
+            await skip_jobs(over_budget, "judge call budget exhausted")
+            eval_jobs_processed.inc(len(over_budget), outcome="over_budget")
+        jobs = [job for group in groups.values() for job in group]
+        if not jobs:
+            return
+        try:
+            # evaluate() runs its own event loop, so keep it off this one.
+            results = await asyncio.to_thread(self._evaluate_groups, groups)
+        except Exception as e:
+            print(f"❌ Error evaluating batch of {len(jobs)} jobs: {e}")
+            for job in jobs:
+                await fail_job(job, str(e), self.max_attempts)
+                eval_jobs_processed.inc(outcome="retried" if job.attempts < self.max_attempts else "failed")
+            return
+        eval_batch_seconds.observe(time.perf_counter() - started)
+        eval_batch_size.observe(len(jobs))
+
+        evaluated, rows = [], []
+        for job in jobs:
+            result = results.get(str(job.id))
+            if result is None:
+                await fail_job(job, "no result returned by evaluate()", self.max_attempts)
+                eval_jobs_processed.inc(outcome="failed" if job.attempts >= self.max_attempts else "retried")
+                continue
+            try:
+                rows.append(metrics_row(job.user_query, job.agent_output, [result], self._sampling(job)))
+            except Exception as e:
+                await fail_job(job, str(e), self.max_attempts)
+                eval_jobs_processed.inc(outcome="failed" if job.attempts >= self.max_attempts else "retried")
+                continue
+            evaluated.append(job)
+        # Written directly (not through the lossy bulk writer): jobs are only marked
+        # done once their results are known to be in the metrics table.
+        try:
+            await Database.copy_rows("metrics", METRICS_COLUMNS, rows)
+        except Exception as e:
+            print(f"❌ Error inserting metrics into DB: {e}")
+            for job in evaluated:
+                await fail_job(job, str(e), self.max_attempts)
+                eval_jobs_processed.inc(outcome="failed" if job.attempts >= self.max_attempts else "retried")
+            return
+        done = [job.id for job in evaluated]
+        await complete_jobs(done)
+        eval_jobs_processed.inc(len(done), outcome="done")
+        print(f"⚡ Evaluated {len(done)}/{len(jobs)} jobs in {time.perf_counter() - started:.1f}s")
+
+    async def run(self, once: bool = False) -> None:
+        """Poll until cancelled (or until the queue is empty with ``once``)."""
+        while True:
+            jobs = await claim_jobs(self.batch_size, self.visibility_timeout)
+            if jobs:
+                await self.run_batch(jobs)
+            try:
+                await refresh_queue_stats()
+            except Exception as e:
+                print(f"Error reading evaluation queue stats: {e}")
+            if not jobs:
+                if once:
+                    return
+                await asyncio.sleep(self.poll_seconds)
+
+
+def serve_metrics(port: int) -> None:
+    """Expose the worker's metrics for Prometheus on a background thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Worker metrics on :{port}/metrics")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run the batched DeepEval worker")
+    parser.add_argument("--batch-size", type=int, default=settings.eval_worker_batch_size)
+    parser.add_argument("--max-concurrent", type=int, default=settings.eval_worker_max_concurrent)
+    parser.add_argument("--poll-seconds", type=float, default=settings.eval_worker_poll_seconds)
+    parser.add_argument("--metrics-port", type=int, default=settings.eval_worker_metrics_port,
+                        help="Serve Prometheus metrics on this port (0 disables)")
+    parser.add_argument("--once", action="store_true", help="Exit once the queue is empty")
+    args = parser.parse_args()
+
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+    await Database.init()
+    try:
+        await ensure_schema()
+        worker = EvaluationWorker(
+            batch_size=args.batch_size,
+            max_concurrent=args.max_concurrent,
+            poll_seconds=args.poll_seconds,
+            max_attempts=settings.eval_job_max_attempts,
+            visibility_timeout=settings.eval_job_visibility_timeout_seconds,
+            judge_calls_per_hour=settings.eval_judge_calls_per_hour,
+        )
+        await worker.run(once=args.once)
+    finally:
+        await Database.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,112 +1,93 @@
-from typing import List, Optional
-from app.agent_infrastructure.guardrails.guardrails_models import GuardrailsModels
-from guardrails import AsyncGuard, OnFailAction
-from guardrails.validator_base import (
-    FailResult,
-    PassResult,
-    ValidationResult,
-    Validator,
-    register_validator,
-)
+import threading
+from typing import List
+from app.core.config import settings
+from app.core.deadline import record_degradation, timeout_for
+from app.core.instrumentation import span
 import asyncio
 
-@register_validator(name="constrain_topic", data_type="string")
-class ConstrainTopic(Validator):
-    def __init__(
-        self,
-        banned_topics: Optional[list[str]] = ["politics"],
-        threshold: float = 0.8,
-        guard_models: Optional[GuardrailsModels] = None,
-        **kwargs
-    ):
-        self.topics = banned_topics
-        self.threshold = threshold
-        self.guard_models = guard_models or GuardrailsModels()
-        super().__init__(**kwargs)
+_guard = None
+_validators: dict | None = None
+_guard_lock = threading.Lock()
 
-    def _validate(
-        self, value: str, metadata: Optional[dict[str, str]] = None
-    ) -> ValidationResult:
-        detected_topics = self.guard_models.detect_topic(
-            value, self.topics, self.threshold
-        )
-        if detected_topics:
-            return FailResult(
-                error_message=f"Sorry I cannot assist with that request as it contains the following banned topics: {detected_topics}"
-            )
-        return PassResult()
-
-@register_validator(name="constrain_bias", data_type="string")
-class ConstrainBias(Validator):
-    def __init__(
-        self,
-        threshold: float = 0.8,
-        guard_models: Optional[GuardrailsModels] = None,
-        **kwargs
-    ):
-        self.threshold = threshold
-        self.guard_models = guard_models or GuardrailsModels()
-        super().__init__(**kwargs)
 
-    def _validate(
-        self, value: str, metadata: Optional[dict[str, str]] = None
-    ) -> ValidationResult:
-        detected_bias = self.guard_models.detect_bias(
-            value, self.threshold
-        )
-        if detected_bias:
-            return FailResult(
-                error_message=f"Sorry I cannot assist with that request as it contains the following banned bias: {detected_bias}"
-            )
-        return PassResult()
+def get_guard():
+    """
+    Return the process-wide validators (by name) and ``AsyncGuard``, built on first use.
 
-@register_validator(name="constrain_toxic", data_type="string")
-class ConstrainToxic(Validator):
-    def __init__(
-        self,
-        threshold: float = 0.8,
-        guard_models: Optional[GuardrailsModels] = None,
-        **kwargs
-    ):
-        self.threshold = threshold
-        self.guard_models = guard_models or GuardrailsModels()
-        super().__init__(**kwargs)
+    Importing this module does not import the ``guardrails`` library nor build
+    the models; the API does it during its start-up warm-up.
+    """
+    global _guard, _validators
+    if _guard is None:
+        with _guard_lock:
+            if _guard is None:
+                from app.agent_infrastructure.guardrails.validators import build_guard
+                _validators, _guard = build_guard()
+    return _validators, _guard
 
-    def _validate(
-        self, value: str, metadata: Optional[dict[str, str]] = None
-    ) -> ValidationResult:
-        detected_toxic = self.guard_models.detect_toxic(
-            value, self.threshold
-        )
-        if detected_toxic:
-            return FailResult(
-                error_message=f"Sorry I cannot assist with that request as it contains the following banned toxic: {detected_toxic}"
-            )
-        return PassResult()
- 
 
-guard = AsyncGuard(name='topic_guard').use_many(
-    ConstrainTopic(
-        banned_topics=["nudity", "violence", "adult content", "illegal", "hate speech", "offensive"],
-        on_fail=OnFailAction.NOOP,
-    ),
-    ConstrainBias(
-        on_fail=OnFailAction.NOOP,
-    ),
-    ConstrainToxic(
-        on_fail=OnFailAction.NOOP,
-    )
-)
+async def _loaded_guard():
+    """``get_guard`` without blocking the event loop while the guard is built."""
+    if _guard is None:
+        await asyncio.to_thread(get_guard)
+    return _validators, _guard
 
 
 async def guardrails_validator(text: str):
-    """Validate text using guardrails, it'll detect topics, bias, and toxicity."""
+    """
+    Validate text using guardrails, it'll detect topics, bias, and toxicity.
+
+    If the guardrail models fail, the request passes when ``guardrails_fail_mode``
+    is "open" (default) and is refused when it is "closed".
+    """
     try:
-        result = await guard.validate(text)
+        async with span("guardrails"):
+            _, guard = await _loaded_guard()
+            result = await asyncio.wait_for(
+                guard.validate(text), timeout=timeout_for(settings.guardrails_timeout_seconds)
+            )
         return result.to_dict()
+    except asyncio.TimeoutError:
+        print("Validation timed out, skipping guardrails")
+        record_degradation("guardrails_timeout")
+        return {"validationPassed": settings.guardrails_fail_mode != "closed", "error": "timeout"}
     except Exception as e:
         print(f"Validation failed: {e}")
-        return {"validationPassed": True, "error": str(e)}
+        # Guardrail models unavailable (errors or open breaker): apply the configured policy.
+        return {"validationPassed": settings.guardrails_fail_mode != "closed", "error": str(e)}
+
+async def guardrails_validator_batch(texts: List[str]) -> List[dict]:
+    """
+    Validate many texts at once, for /chat/batch.
+
+    Each validator classifies all the texts that miss the verdict cache in a
+    single model call, and the three validators run concurrently. Verdicts are
+    shared with ``guardrails_validator`` through the cache. Model errors and
+    timeouts are handled as for a single text.
+
+    Returns:
+        list[dict]: Per text, ``validationPassed`` and the labels ``detected`` by each validator.
+    """
+    try:
+        async with span("guardrails_batch"):
+            validators, _ = await _loaded_guard()
+            detected = await asyncio.wait_for(
+                asyncio.gather(*(asyncio.to_thread(v.detect_many, texts) for v in validators.values())),
+                timeout=timeout_for(settings.guardrails_batch_timeout_seconds),
+            )
+    except asyncio.TimeoutError:
+        print("Batch validation timed out, skipping guardrails")
+        record_degradation("guardrails_timeout")
+        return [{"validationPassed": settings.guardrails_fail_mode != "closed", "error": "timeout"} for _ in texts]
+    except Exception as e:
+        print(f"Batch validation failed: {e}")
+        return [{"validationPassed": settings.guardrails_fail_mode != "closed", "error": str(e)} for _ in texts]
+
+    results = []
+    for i in range(len(texts)):
+        labels = {name: found[i] for name, found in zip(validators, detected) if found[i]}
+        results.append({"validationPassed": not labels, "detected": labels})
+    return results
 
 async def main():
     test_texts = [
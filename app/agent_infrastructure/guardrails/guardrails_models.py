@@ -1,13 +1,25 @@
+import time
 import httpx
 from app.core.config import settings
+from app.core.deadline import timeout_for
+from app.core.metrics import metrics
+from app.core.resilience import get_upstream
 from typing import List
 
+model_latency = metrics.histogram(
+    "guardrails_model_latency_seconds", "Guardrail model inference latency by model and backend"
+)
+
 
 class GuardrailsModels:
     """
     A class to interact with Guardrails classification models asynchronously.
 
+    Models are served over HTTP by default; set ``guardrails_backend=onnx`` to run
+    the exported ONNX models in-process instead.
+
     Attributes:
+        backend (str): Either "http" or "onnx".
         guardrails_models_auth_token (str): Authorization token for the API.
         topic_classification_endpoint (str): URL for topic detection model.
         bias_classification_endpoint (str): URL for bias detection model.
@@ -22,6 +34,19 @@ class GuardrailsModels:
         self.topic_classification_endpoint = settings.topic_detection_model_url
         self.bias_classification_endpoint = settings.bias_detection_model_url
         self.toxic_classification_endpoint = settings.toxic_classification_model_url
+        self.backend = settings.guardrails_backend
+        self._onnx = None
+        self._http: httpx.Client | None = None
+        if self.backend == "onnx":
+            from app.agent_infrastructure.guardrails.onnx_backend import get_onnx_backend
+            self._onnx = get_onnx_backend()
+        else:
+            # One keep-alive pool for all model endpoints instead of a new connection per call.
+            limits = httpx.Limits(
+                max_connections=settings.http_pool_connections,
+                max_keepalive_connections=settings.http_pool_connections,
+            )
+            self._http = httpx.Client(limits=limits)
 
     def _topic_detection_model(self, text: str, topics: list) -> dict:
         """
@@ -37,21 +62,42 @@ class GuardrailsModels:
         Raises:
             RuntimeError: If there is a network or HTTP error.
         """
+        started = time.perf_counter()
+        try:
+            if self._onnx is not None:
+                return self._onnx.zero_shot(text, topics)
+            return self._post(self.topic_classification_endpoint, {"text": text, "topics": topics}, upstream="guardrails_topic")
+        finally:
+            model_latency.observe(time.perf_counter() - started, model="bart-mnli", backend=self.backend)
+
+    def _post(self, endpoint: str, payload: dict | str | list, upstream: str) -> dict | list:
+        """
+        POST a JSON payload to a guardrails model endpoint.
+
+        The call is hedged against a slow model replica and guarded by the
+        upstream's circuit breaker.
+
+        Raises:
+            RuntimeError: If there is a network or HTTP error, or the breaker is open.
+        """
         headers = {
             "Authorization": f"Bearer {self.guardrails_models_auth_token}",
             "Content-Type": "application/json"
         }
-        payload = {"text": text, "topics": topics}
 
-        try:
-            with httpx.Client(timeout=10) as client:
-                response = client.post(self.topic_classification_endpoint, headers=headers, json=payload)
+        def send() -> dict | list:
+            try:
+                response = self._http.post(
+                    endpoint, headers=headers, json=payload, timeout=timeout_for(settings.guardrails_timeout_seconds)
+                )
                 response.raise_for_status()
                 return response.json()
-        except httpx.RequestError as e:
-            raise RuntimeError(f"Network error: {e}")
-        except httpx.HTTPStatusError as e:
-            raise RuntimeError(f"HTTP error: {e.response.status_code} - {e.response.text}")
+            except httpx.RequestError as e:
+                raise RuntimeError(f"Network error: {e}")
+            except httpx.HTTPStatusError as e:
+                raise RuntimeError(f"HTTP error: {e.response.status_code} - {e.response.text}")
+
+        return get_upstream(upstream).call(send)
 
     def _toxic_classification_model(self, texts: str | list) -> dict:
         """
@@ -66,17 +112,13 @@ class GuardrailsModels:
         Raises:
             RuntimeError: If there is a network error.
         """
-        headers = {
-            "Authorization": f"Bearer {self.guardrails_models_auth_token}",
-            "Content-Type": "application/json"
-        }
+        started = time.perf_counter()
         try:
-            with httpx.Client(timeout=10) as client:
-                response = client.post(self.toxic_classification_endpoint, headers=headers, json=texts)
-                response.raise_for_status()
-                return response.json()
-        except httpx.RequestError as e:
-            raise RuntimeError(f"Network error: {e}")
+            if self._onnx is not None:
+                return self._onnx.classify("toxic-comment", texts)
+            return self._post(self.toxic_classification_endpoint, texts, upstream="guardrails_toxic")
+        finally:
+            model_latency.observe(time.perf_counter() - started, model="toxic-comment", backend=self.backend)
 
     def _bias_classification_model(self, texts: str | list) -> dict:
         """
@@ -91,24 +133,21 @@ class GuardrailsModels:
         Raises:
             RuntimeError: If there is a network error.
         """
-        headers = {
-            "Authorization": f"Bearer {self.guardrails_models_auth_token}",
-            "Content-Type": "application/json"
-        }
+        started = time.perf_counter()
         try:
-            with httpx.Client(timeout=10) as client:
-                response = client.post(self.bias_classification_endpoint, headers=headers, json=texts)
-                response.raise_for_status()
-                return response.json()
-        except httpx.RequestError as e:
-            raise RuntimeError(f"Network error: {e}")
+            if self._onnx is not None:
+                return self._onnx.classify("bias-comment", texts)
+            return self._post(self.bias_classification_endpoint, texts, upstream="guardrails_bias")
+        finally:
+            model_latency.observe(time.perf_counter() - started, model="bias-comment", backend=self.backend)
     
         
     def detect_topic(
             self,
             text: str,
             topics: List[str],
-            threshold: float = 0.8
+            threshold: float = 0.8,
+            raise_errors: bool = False
     ) -> List[str]:
         """Detect topics in text above the given threshold."""
         try:
@@ -123,12 +162,15 @@ class GuardrailsModels:
                 if score > threshold]
         except Exception as e:
             print(f"Error in detect_topic: {e}")
+            if raise_errors:
+                raise
             return []
     
     def detect_bias(
             self,
             text: str,
-            threshold: float = 0.8
+            threshold: float = 0.8,
+            raise_errors: bool = False
     ) -> List[str]:
         """Detect bias in text above the given threshold."""
         try:
@@ -145,12 +187,15 @@ class GuardrailsModels:
             ]
         except Exception as e:
             print(f"Error in detect_bias: {e}")
+            if raise_errors:
+                raise
             return []
     
     def detect_toxic(
             self,
             text: str,
-            threshold: float = 0.8
+            threshold: float = 0.8,
+            raise_errors: bool = False
     ) -> List[str]:
         """Detect toxicity in text above the given threshold."""
         try:
@@ -167,7 +212,54 @@ class GuardrailsModels:
             ]
         except Exception as e:
             print(f"Error in detect_toxic: {e}")
+            if raise_errors:
+                raise
+            return []
+
+    @staticmethod
+    def _labels_per_text(result: list, count: int, threshold: float, label: str) -> List[List[str]]:
+        """
+        Split a classifier response for ``count`` texts into detected labels per text.
+
+        Each entry is the text's top ``{"label", "score"}`` or a list of them.
+
+        Raises:
+            RuntimeError: If the response does not have one entry per text.
+        """
+        if not isinstance(result, list) or len(result) != count:
+            raise RuntimeError(f"Expected {count} classifications, got: {str(result)[:200]}")
+        return [
+            [
+                item["label"]
+                for item in (entry if isinstance(entry, list) else [entry])
+                if item["score"] > threshold and item["label"] == label
+            ]
+            for entry in result
+        ]
+
+    def detect_bias_many(self, texts: List[str], threshold: float = 0.8) -> List[List[str]]:
+        """
+        Detect bias in many texts with one classifier call.
+
+        Raises:
+            RuntimeError: If the model is unavailable or answers in an unexpected format.
+        """
+        if not texts:
+            return []
+        result = self._bias_classification_model(texts=list(texts))
+        return self._labels_per_text(result, len(texts), threshold, 'BIASED')
+
+    def detect_toxic_many(self, texts: List[str], threshold: float = 0.8) -> List[List[str]]:
+        """
+        Detect toxicity in many texts with one classifier call.
+
+        Raises:
+            RuntimeError: If the model is unavailable or answers in an unexpected format.
+        """
+        if not texts:
             return []
+        result = self._toxic_classification_model(texts=list(texts))
+        return self._labels_per_text(result, len(texts), threshold, 'toxic')
 
 
 # Example usage
@@ -0,0 +1,218 @@
+"""
+In-process ONNX Runtime backend for the guardrails classifiers.
+
+Loads the models exported by ``model_hosting/guardrails_models/onnx_conversion.py``
+(``<model_dir>/<model_name>/1/{model.onnx, config.json, tokenizer files}``) and
+serves them from the app process, returning the same response shapes as the
+HTTP endpoints so ``GuardrailsModels`` can switch backends transparently.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+try:
+    import onnxruntime as ort
+    from transformers import AutoTokenizer
+except ImportError:  # optional dependency, see the `guardrails-onnx` extra
+    ort = None
+    AutoTokenizer = None
+
+TOPIC_MODEL = "bart-mnli"
+TOXIC_MODEL = "toxic-comment"
+BIAS_MODEL = "bias-comment"
+
+HYPOTHESIS_TEMPLATE = "This example is {}."
+
+# Per batch; the per-call latency callers see (queueing included) is guardrails_model_latency_seconds.
+batch_latency = metrics.histogram(
+    "guardrails_onnx_batch_seconds", "Tokenization and ONNX Runtime inference time per batch, by model"
+)
+batch_sizes = metrics.histogram(
+    "guardrails_onnx_batch_size", "Items per ONNX Runtime batch", buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+
+
+def _softmax(x: np.ndarray, axis: int = -1) -> np.ndarray:
+    e = np.exp(x - x.max(axis=axis, keepdims=True))
+    return e / e.sum(axis=axis, keepdims=True)
+
+
+class _BatchingModel:
+    """
+    One ONNX session plus a micro-batcher.
+
+    Concurrent callers enqueue their inputs; a collector thread groups whatever
+    arrives within ``max_wait_ms`` (up to ``max_batch_size`` items) and runs the
+    batch on the shared, bounded inference pool.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            model_path: Path,
+            executor: ThreadPoolExecutor,
+            max_batch_size: int,
+            max_wait_ms: float,
+            intra_op_threads: int
+    ):
+        self.name = name
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        session_options = ort.SessionOptions()
+        if intra_op_threads:
+            session_options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            str(model_path / "model.onnx"),
+            sess_options=session_options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+
+        with open(model_path / "config.json") as f:
+            config = json.load(f)
+        self.id2label = {int(k): v for k, v in config["id2label"].items()}
+
+        self._pending: list[tuple[list, Future]] = []
+        self._cond = threading.Condition()
+        threading.Thread(target=self._collect, name=f"onnx-batcher-{name}", daemon=True).start()
+
+    def infer(self, texts: List[str], text_pairs: List[str] | None = None) -> np.ndarray:
+        """Return logits for the given texts (or text pairs), batched with concurrent callers."""
+        future: Future = Future()
+        items = list(zip(texts, text_pairs)) if text_pairs is not None else [(t, None) for t in texts]
+        with self._cond:
+            self._pending.append((items, future))
+            self._cond.notify()
+        return future.result()
+
+    def _collect(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.max_wait
+                while sum(len(items) for items, _ in self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, size = [], 0
+                while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch_size):
+                    items, future = self._pending.pop(0)
+                    batch.append((items, future))
+                    size += len(items)
+            self.executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch: list[tuple[list, Future]]) -> None:
+        try:
+            items = [item for items, _ in batch for item in items]
+            texts = [text for text, _ in items]
+            pairs = [pair for _, pair in items] if items[0][1] is not None else None
+
+            started = time.perf_counter()
+            encoded = self.tokenizer(texts, pairs, padding=True, truncation=True, return_tensors="np")
+            feed = {k: v.astype(np.int64) for k, v in encoded.items() if k in self.input_names}
+            logits = self.session.run(["logits"], feed)[0]
+            batch_latency.observe(time.perf_counter() - started, model=self.name)
+            batch_sizes.observe(len(items), model=self.name)
+
+            offset = 0
+            for batch_items, future in batch:
+                future.set_result(logits[offset:offset + len(batch_items)])
+                offset += len(batch_items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+
+class OnnxGuardrailsBackend:
+    """
+    Runs the topic, toxic and bias classifiers in-process with ONNX Runtime.
+
+    Methods return the same payloads as the HTTP model endpoints: zero-shot
+    returns ``{"sequence", "labels", "scores"}`` and the classifiers return
+    ``[{"label", "score"}]``.
+    """
+
+    def __init__(self, model_dir: str | None = None):
+        if ort is None or AutoTokenizer is None:
+            raise RuntimeError(
+                "The onnx guardrails backend needs onnxruntime and transformers "
+                "(pip install '.[guardrails-onnx]')."
+            )
+        model_dir = Path(model_dir or settings.guardrails_onnx_model_dir)
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.guardrails_onnx_max_workers,
+            thread_name_prefix="onnx-guardrails",
+        )
+        self.models = {
+            name: _BatchingModel(
+                name=name,
+                model_path=model_dir / name / "1",
+                executor=self.executor,
+                max_batch_size=settings.guardrails_onnx_max_batch_size,
+                max_wait_ms=settings.guardrails_onnx_batch_wait_ms,
+                intra_op_threads=settings.guardrails_onnx_intra_op_threads,
+            )
+            for name in (TOPIC_MODEL, TOXIC_MODEL, BIAS_MODEL)
+        }
+
+    def zero_shot(self, text: str, topics: List[str]) -> dict:
+        """Zero-shot topic classification matching the transformers pipeline output."""
+        model = self.models[TOPIC_MODEL]
+        if not topics:
+            return {"sequence": text, "labels": [], "scores": []}
+        label2id = {v.lower(): k for k, v in model.id2label.items()}
+        entail_id = next(i for label, i in label2id.items() if label.startswith("entail"))
+        contra_id = next(i for label, i in label2id.items() if label.startswith("contra"))
+
+        logits = model.infer([text] * len(topics), [HYPOTHESIS_TEMPLATE.format(t) for t in topics])
+        if settings.guardrails_zero_shot_multi_label:
+            scores = _softmax(logits[:, [contra_id, entail_id]])[:, 1]
+        else:
+            scores = _softmax(logits[:, entail_id])
+
+        order = np.argsort(-scores)
+        return {
+            "sequence": text,
+            "labels": [topics[i] for i in order],
+            "scores": [float(scores[i]) for i in order],
+        }
+
+    def classify(self, model_name: str, texts: str | list) -> list:
+        """Single-label classification matching the transformers pipeline output."""
+        model = self.models[model_name]
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        probs = _softmax(model.infer(batch))
+        best = probs.argmax(axis=-1)
+        return [
+            {"label": model.id2label[int(i)], "score": float(p[i])}
+            for i, p in zip(best, probs)
+        ]
+
+
+_backend: OnnxGuardrailsBackend | None = None
+_backend_lock = threading.Lock()
+
+
+def get_onnx_backend() -> OnnxGuardrailsBackend:
+    """Return the process-wide backend, loading the models on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = OnnxGuardrailsBackend()
+    return _backend
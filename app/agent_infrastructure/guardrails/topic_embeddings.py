@@ -0,0 +1,130 @@
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from app.agent_infrastructure.infrastructure.embeddings import CustomEmbedding
+from app.core.config import settings
+from app.core.vectors import normalize
+
+# Short descriptions embedded alongside the topic name to build each prototype.
+TOPIC_DESCRIPTIONS: Dict[str, List[str]] = {
+    "nudity": ["nude or naked people", "explicit sexual imagery"],
+    "violence": ["graphic violence, killing or physically hurting people", "how to attack someone"],
+    "adult content": ["pornography and sexually explicit material", "erotic adult content"],
+    "illegal": ["how to commit a crime", "buying drugs or weapons illegally", "hacking into accounts"],
+    "hate speech": ["hateful slurs against a race, religion or ethnicity", "attacking people for their identity"],
+    "offensive": ["insulting and offensive language", "vulgar abuse aimed at a person"],
+}
+
+
+class EmbeddingTopicDetector:
+    """
+    Detect banned topics by cosine similarity against topic prototype embeddings.
+
+    Each topic prototype is the mean of the normalized embeddings of the topic
+    name and its descriptions, computed with the same embedding service used for
+    retrieval. A prompt costs a single embedding call plus one matrix-vector
+    product, instead of one NLI forward pass per topic.
+
+    Per-topic thresholds (and optionally the prototypes themselves) are loaded
+    from the JSON written by ``scripts/calibrate_topic_guard.py``.
+    """
+
+    def __init__(self, embedding: CustomEmbedding | None = None, calibration_path: str | None = None):
+        self.embedding = embedding or CustomEmbedding()
+        self.calibration_path = calibration_path or settings.guardrails_topic_calibration_path
+        self._prototypes: Dict[str, np.ndarray] = {}
+        self._thresholds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._load_calibration()
+
+    def _load_calibration(self) -> None:
+        if not self.calibration_path or not Path(self.calibration_path).is_file():
+            return
+        with open(self.calibration_path) as f:
+            calibration = json.load(f)
+        self._thresholds = {k: float(v) for k, v in calibration.get("thresholds", {}).items()}
+        for topic, vector in calibration.get("prototypes", {}).items():
+            self._prototypes[topic] = normalize(vector)
+
+    def prototype_matrix(self, topics: List[str]) -> np.ndarray:
+        """Return a (len(topics), dim) matrix of normalized prototypes, embedding any missing ones."""
+        missing = [t for t in topics if t not in self._prototypes]
+        if missing:
+            with self._lock:
+                missing = [t for t in missing if t not in self._prototypes]
+                phrases = [(t, p) for t in missing for p in [t, *TOPIC_DESCRIPTIONS.get(t, [])]]
+                if phrases:
+                    vectors = self.embedding.embed_documents([p for _, p in phrases])
+                    if len(vectors) != len(phrases):
+                        raise RuntimeError("Embedding service returned no vectors for topic prototypes")
+                    normalize(vectors, copy=False)
+                    for topic in missing:
+                        rows = [i for i, (t, _) in enumerate(phrases) if t == topic]
+                        self._prototypes[topic] = normalize(vectors[rows].mean(axis=0))
+        return np.stack([self._prototypes[t] for t in topics])
+
+    def similarities(self, text: str, topics: List[str]) -> np.ndarray:
+        """Cosine similarity between the text and each topic prototype."""
+        vector = self.embedding.embed_query(text)
+        if len(vector) == 0:
+            raise RuntimeError("Embedding service returned no vector for the prompt")
+        return self.prototype_matrix(topics) @ normalize(vector)
+
+    def detect_topics_many(self, texts: List[str], topics: List[str], threshold: float | None = None) -> List[List[str]]:
+        """
+        ``detect_topic`` for many texts, with one embedding call for all of them.
+
+        Raises:
+            RuntimeError: If the embedding service is unavailable.
+        """
+        if not texts or not topics:
+            return [[] for _ in texts]
+        vectors = self.embedding.embed_documents(list(texts))
+        if len(vectors) != len(texts):
+            raise RuntimeError("Embedding service returned no vectors for the prompts")
+        fallback = settings.guardrails_topic_embedding_threshold if threshold is None else threshold
+        limits = np.array([self._thresholds.get(t, fallback) for t in topics], dtype=np.float32)
+        scores = normalize(vectors, copy=False) @ self.prototype_matrix(topics).T
+        detected = []
+        for row in scores:
+            hits = np.flatnonzero(row > limits)
+            detected.append([topics[i] for i in hits[np.argsort(-row[hits])]])
+        return detected
+
+    def detect_topic(self, text: str, topics: List[str], threshold: float | None = None) -> List[str]:
+        """
+        Return the topics whose similarity exceeds their calibrated threshold.
+
+        Args:
+            text (str): The input text to classify.
+            topics (List[str]): Banned topics to check.
+            threshold (float | None): Fallback cosine threshold for uncalibrated topics.
+
+        Returns:
+            List[str]: Detected topics, most similar first.
+
+        Raises:
+            RuntimeError: If the embedding service is unavailable.
+        """
+        if not topics:
+            return []
+        fallback = settings.guardrails_topic_embedding_threshold if threshold is None else threshold
+        scores = self.similarities(text, topics)
+        limits = np.array([self._thresholds.get(t, fallback) for t in topics], dtype=np.float32)
+        hits = np.flatnonzero(scores > limits)
+        return [topics[i] for i in hits[np.argsort(-scores[hits])]]
+
+
+_detector: EmbeddingTopicDetector | None = None
+
+
+def get_embedding_topic_detector() -> EmbeddingTopicDetector:
+    """Return the process-wide detector so prototypes are embedded once."""
+    global _detector
+    if _detector is None:
+        _detector = EmbeddingTopicDetector()
+    return _detector
@@ -0,0 +1,181 @@
+"""
+Guardrails validators: banned topics, bias and toxicity.
+
+Imported lazily by ``guardrails.get_guard`` so the ``guardrails`` library and
+the classification models are only loaded when the guard is first needed (the
+API's start-up warm-up).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from app.agent_infrastructure.guardrails.guardrails_models import GuardrailsModels
+from app.agent_infrastructure.guardrails.topic_embeddings import get_embedding_topic_detector
+from app.agent_infrastructure.guardrails.verdict_cache import verdict_cache
+from app.core.config import settings
+from guardrails import AsyncGuard, OnFailAction
+from guardrails.validator_base import (
+    FailResult,
+    PassResult,
+    ValidationResult,
+    Validator,
+    register_validator,
+)
+
+@register_validator(name="constrain_topic", data_type="string")
+class ConstrainTopic(Validator):
+    def __init__(
+        self,
+        banned_topics: Optional[list[str]] = ["politics"],
+        threshold: float = 0.8,
+        guard_models: Optional[GuardrailsModels] = None,
+        **kwargs
+    ):
+        self.topics = banned_topics
+        self.threshold = threshold
+        self.guard_models = guard_models or GuardrailsModels()
+        super().__init__(**kwargs)
+
+    def _validate(
+        self, value: str, metadata: Optional[dict[str, str]] = None
+    ) -> ValidationResult:
+        detector = settings.guardrails_topic_detector
+        detected_topics = verdict_cache.get_or_compute(
+            "constrain_topic",
+            self._cache_config(detector),
+            value,
+            lambda: self._detect_topics(value, detector),
+        )
+        if detected_topics:
+            return FailResult(
+                error_message=f"Sorry I cannot assist with that request as it contains the following banned topics: {detected_topics}"
+            )
+        return PassResult()
+
+    def _cache_config(self, detector: str) -> dict:
+        return {"topics": sorted(self.topics or []), "threshold": self.threshold, "detector": detector}
+
+    def _detect_topics(self, value: str, detector: str) -> list[str]:
+        """Run the configured topic detector: zero-shot MNLI or embedding similarity."""
+        if detector == "embedding":
+            # Cosine thresholds come from calibration, not the MNLI probability threshold.
+            return get_embedding_topic_detector().detect_topic(value, self.topics)
+        return self.guard_models.detect_topic(
+            value, self.topics, self.threshold, raise_errors=True
+        )
+
+    def detect_many(self, texts: List[str]) -> List[List[str]]:
+        """Banned topics per text, through the verdict cache; the misses are classified together."""
+        detector = settings.guardrails_topic_detector
+        return verdict_cache.get_or_compute_many(
+            "constrain_topic", self._cache_config(detector), texts, lambda batch: self._detect_topics_many(batch, detector)
+        )
+
+    def _detect_topics_many(self, texts: List[str], detector: str) -> List[List[str]]:
+        if detector == "embedding":
+            return get_embedding_topic_detector().detect_topics_many(texts, self.topics)
+        # Zero-shot takes one text per call; concurrent calls are batched by the ONNX
+        # backend and spread over replicas by the HTTP endpoint.
+        with ThreadPoolExecutor(max_workers=settings.guardrails_batch_topic_workers) as executor:
+            return list(executor.map(lambda text: self._detect_topics(text, detector), texts))
+
+@register_validator(name="constrain_bias", data_type="string")
+class ConstrainBias(Validator):
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        guard_models: Optional[GuardrailsModels] = None,
+        **kwargs
+    ):
+        self.threshold = threshold
+        self.guard_models = guard_models or GuardrailsModels()
+        super().__init__(**kwargs)
+
+    def _validate(
+        self, value: str, metadata: Optional[dict[str, str]] = None
+    ) -> ValidationResult:
+        detected_bias = verdict_cache.get_or_compute(
+            "constrain_bias",
+            {"threshold": self.threshold},
+            value,
+            lambda: self.guard_models.detect_bias(
+                value, self.threshold, raise_errors=True
+            ),
+        )
+        if detected_bias:
+            return FailResult(
+                error_message=f"Sorry I cannot assist with that request as it contains the following banned bias: {detected_bias}"
+            )
+        return PassResult()
+
+    def detect_many(self, texts: List[str]) -> List[List[str]]:
+        """Bias labels per text, through the verdict cache; the misses go to the model in one call."""
+        return verdict_cache.get_or_compute_many(
+            "constrain_bias",
+            {"threshold": self.threshold},
+            texts,
+            lambda batch: self.guard_models.detect_bias_many(batch, self.threshold),
+        )
+
+@register_validator(name="constrain_toxic", data_type="string")
+class ConstrainToxic(Validator):
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        guard_models: Optional[GuardrailsModels] = None,
+        **kwargs
+    ):
+        self.threshold = threshold
+        self.guard_models = guard_models or GuardrailsModels()
+        super().__init__(**kwargs)
+
+    def _validate(
+        self, value: str, metadata: Optional[dict[str, str]] = None
+    ) -> ValidationResult:
+        detected_toxic = verdict_cache.get_or_compute(
+            "constrain_toxic",
+            {"threshold": self.threshold},
+            value,
+            lambda: self.guard_models.detect_toxic(
+                value, self.threshold, raise_errors=True
+            ),
+        )
+        if detected_toxic:
+            return FailResult(
+                error_message=f"Sorry I cannot assist with that request as it contains the following banned toxic: {detected_toxic}"
+            )
+        return PassResult()
+
+    def detect_many(self, texts: List[str]) -> List[List[str]]:
+        """Toxicity labels per text, through the verdict cache; the misses go to the model in one call."""
+        return verdict_cache.get_or_compute_many(
+            "constrain_toxic",
+            {"threshold": self.threshold},
+            texts,
+            lambda batch: self.guard_models.detect_toxic_many(batch, self.threshold),
+        )
+
+
+def build_guard() -> tuple[dict, AsyncGuard]:
+    """
+    The validators by name and the guard running them.
+
+    The three validators share one ``GuardrailsModels``, so one HTTP connection
+    pool (or one set of ONNX sessions) serves them all.
+    """
+    guard_models = GuardrailsModels()
+    validators = {
+        "constrain_topic": ConstrainTopic(
+            banned_topics=["nudity", "violence", "adult content", "illegal", "hate speech", "offensive"],
+            guard_models=guard_models,
+            on_fail=OnFailAction.NOOP,
+        ),
+        "constrain_bias": ConstrainBias(
+            guard_models=guard_models,
+            on_fail=OnFailAction.NOOP,
+        ),
+        "constrain_toxic": ConstrainToxic(
+            guard_models=guard_models,
+            on_fail=OnFailAction.NOOP,
+        ),
+    }
+    return validators, AsyncGuard(name='topic_guard').use_many(*validators.values())
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, List
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+_WHITESPACE = re.compile(r"\s+")
+
+cache_lookups = metrics.counter(
+    "guardrails_verdict_cache_lookups_total", "Guardrail verdict cache lookups by validator and result (hit/miss)"
+)
+
+
+class GuardrailVerdictCache:
+    """
+    Bounded TTL cache of per-validator guardrail verdicts.
+
+    Entries are keyed on a hash of the validator name, its configuration
+    (topics, thresholds) and the normalized text, so changing one validator's
+    configuration only invalidates that validator's verdicts.
+
+    Attributes:
+        max_entries (int): Maximum number of verdicts kept (LRU eviction).
+        ttl_seconds (float): How long a verdict stays valid.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize unicode and whitespace; case is kept since the classifiers are cased."""
+        return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+    @classmethod
+    def make_key(cls, validator: str, config: dict, text: str) -> str:
+        payload = json.dumps(
+            {"validator": validator, "config": config, "text": cls.normalize(text)},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at < now:
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_compute(
+            self,
+            validator: str,
+            config: dict,
+            text: str,
+            compute: Callable[[], List[str]]
+    ) -> List[str]:
+        """
+        Return the cached verdict for this validator/config/text or compute and store it.
+
+        Args:
+            validator (str): The validator name.
+            config (dict): The validator configuration that affects its verdict.
+            text (str): The text being validated.
+            compute (Callable[[], List[str]]): Runs the classifier; may raise on upstream errors.
+
+        Returns:
+            List[str]: The detected labels (empty when the text passes).
+        """
+        if not settings.guardrails_cache_enabled:
+            return compute()
+
+        key = self.make_key(validator, config, text)
+        hit, value = self.get(key)
+        if hit:
+            cache_lookups.inc(validator=validator, result="hit")
+            return list(value)
+
+        cache_lookups.inc(validator=validator, result="miss")
+        # Upstream failures propagate uncached, so ``guardrails_fail_mode`` decides the outcome.
+        value = compute()
+        self.set(key, tuple(value))
+        return value
+
+    def get_or_compute_many(
+            self,
+            validator: str,
+            config: dict,
+            texts: List[str],
+            compute_many: Callable[[List[str]], List[List[str]]]
+    ) -> List[List[str]]:
+        """
+        ``get_or_compute`` for many texts: the misses are classified in one ``compute_many`` call.
+
+        Args:
+            validator (str): The validator name.
+            config (dict): The validator configuration that affects its verdict.
+            texts (List[str]): The texts being validated.
+            compute_many (Callable[[List[str]], List[List[str]]]): Classifies a list of
+                texts, one verdict per text in order; may raise on upstream errors.
+
+        Returns:
+            List[List[str]]: The detected labels per text.
+        """
+        if not texts:
+            return []
+        if not settings.guardrails_cache_enabled:
+            return compute_many(list(texts))
+
+        verdicts: List[Any] = [None] * len(texts)
+        misses: dict = {}
+        for i, text in enumerate(texts):
+            key = self.make_key(validator, config, text)
+            hit, value = self.get(key)
+            if hit:
+                cache_lookups.inc(validator=validator, result="hit")
+                verdicts[i] = list(value)
+            else:
+                cache_lookups.inc(validator=validator, result="miss")
+                misses.setdefault(key, []).append(i)
+
+        if misses:
+            keys = list(misses)
+            # Raises for the whole batch, as get_or_compute does; nothing is cached.
+            computed = compute_many([texts[misses[key][0]] for key in keys])
+            for key, value in zip(keys, computed):
+                self.set(key, tuple(value))
+                for i in misses[key]:
+                    verdicts[i] = list(value)
+        return verdicts
+
+
+verdict_cache = GuardrailVerdictCache(
+    max_entries=settings.guardrails_cache_max_entries,
+    ttl_seconds=settings.guardrails_cache_ttl_seconds,
+)
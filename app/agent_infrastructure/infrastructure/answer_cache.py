@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.agent_infrastructure.guardrails.verdict_cache import GuardrailVerdictCache
+from app.agent_infrastructure.infrastructure.embeddings import CustomEmbedding
+from app.agent_infrastructure.tools.document_retriver import invalidate_retrieval_cache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.vectors import normalize
+from app.db.client import Database
+
+answer_cache_lookups = metrics.counter(
+    "answer_cache_lookups_total", "Semantic answer cache lookups by result (hit/miss/bypass)"
+)
+
+
+@dataclass
+class CachedAnswer:
+    """A stored answer and the documents it cited."""
+    answer: str
+    documents: List[dict]
+    created_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class AnswerCacheLookup:
+    """Result of a lookup; kept so a miss can be stored without embedding the question again."""
+    fingerprint: str
+    vector: Optional[np.ndarray]
+    hit: Optional[CachedAnswer] = None
+    similarity: float = 0.0
+
+
+class SemanticAnswerCache:
+    """
+    Answer-level cache keyed on the meaning of the latest question.
+
+    Entries are grouped by a fingerprint of the earlier conversation, so a
+    follow-up only matches answers given in the same context. Within a group
+    the latest user message is compared by cosine similarity of its embedding;
+    the best match above ``threshold`` is returned.
+
+    The whole cache, and the retrieval cache with it, is dropped when the
+    ``arxiv`` table changes (checked at most every ``index_check_seconds``),
+    since cached answers cite documents from the old index.
+
+    Attributes:
+        threshold (float): Minimum cosine similarity for a hit.
+        max_entries (int): Maximum number of answers kept (LRU eviction).
+        ttl_seconds (float): How long an answer stays valid.
+        index_check_seconds (float): How often to check the arxiv index for changes.
+    """
+
+    def __init__(
+            self,
+            threshold: float = 0.95,
+            max_entries: int = 5000,
+            ttl_seconds: float = 21600,
+            index_check_seconds: float = 60,
+            embedding: CustomEmbedding | None = None,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.index_check_seconds = index_check_seconds
+        self.embedding = embedding or CustomEmbedding()
+        self._entries: "OrderedDict[int, tuple[str, np.ndarray, float, CachedAnswer]]" = OrderedDict()
+        self._by_fingerprint: Dict[str, set] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._index_version: Any = None
+        self._index_checked_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def fingerprint(messages: List[dict]) -> str:
+        """Hash of every message before the latest one (role and normalized content)."""
+        history = [
+            [m.get("role", ""), GuardrailVerdictCache.normalize(m.get("content", "")).lower()]
+            for m in messages[:-1]
+        ]
+        return hashlib.sha256(json.dumps(history).encode("utf-8")).hexdigest()
+
+    async def _embed(self, text: str) -> Optional[np.ndarray]:
+        vector = await asyncio.to_thread(self.embedding.embed_query, GuardrailVerdictCache.normalize(text))
+        if len(vector) == 0 or not vector.any():
+            return None
+        return normalize(vector)
+
+    async def lookup(self, messages: List[dict], bypass: bool = False) -> AnswerCacheLookup:
+        """
+        Find a stored answer for this conversation's latest question.
+
+        Args:
+            messages (list[dict]): The conversation, latest user message last.
+            bypass (bool): Skip the search but still embed, so the fresh answer can be stored.
+
+        Returns:
+            AnswerCacheLookup: ``hit`` is set when a close enough answer exists.
+        """
+        await self.check_index_version()
+        lookup = AnswerCacheLookup(self.fingerprint(messages), await self._embed(messages[-1].get("content", "")))
+        return self._search(lookup, bypass)
+
+    async def lookup_many(self, conversations: List[List[dict]], bypass: bool = False) -> List[AnswerCacheLookup]:
+        """
+        ``lookup`` for many conversations, embedding all their latest questions in one call.
+
+        Returns:
+            list[AnswerCacheLookup]: One lookup per conversation, in order.
+        """
+        await self.check_index_version()
+        texts = [GuardrailVerdictCache.normalize(messages[-1].get("content", "")) for messages in conversations]
+        vectors = await asyncio.to_thread(self.embedding.embed_documents, texts) if texts else []
+        if len(vectors) != len(texts):
+            vectors = [None] * len(texts)
+        lookups = []
+        for messages, vector in zip(conversations, vectors):
+            if vector is not None and vector.any():
+                vector = normalize(vector)
+            else:
+                vector = None
+            lookups.append(self._search(AnswerCacheLookup(self.fingerprint(messages), vector), bypass))
+        return lookups
+
+    def _search(self, lookup: AnswerCacheLookup, bypass: bool) -> AnswerCacheLookup:
+        """Set ``lookup.hit`` to the closest stored answer in the lookup's conversation group, if close enough."""
+        if bypass:
+            answer_cache_lookups.inc(result="bypass")
+            return lookup
+        if lookup.vector is None:
+            answer_cache_lookups.inc(result="miss")
+            return lookup
+
+        now = time.monotonic()
+        with self._lock:
+            ids = [
+                entry_id for entry_id in self._by_fingerprint.get(lookup.fingerprint, ())
+                if self._entries[entry_id][2] > now
+            ]
+            if ids:
+                matrix = np.stack([self._entries[entry_id][1] for entry_id in ids])
+                similarities = matrix @ lookup.vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._entries.move_to_end(ids[best])
+                    lookup.hit = self._entries[ids[best]][3]
+                    lookup.similarity = float(similarities[best])
+
+        answer_cache_lookups.inc(result="hit" if lookup.hit else "miss")
+        return lookup
+
+    def store(self, lookup: AnswerCacheLookup, answer: CachedAnswer) -> None:
+        """Store an answer under the lookup's fingerprint and question embedding."""
+        if lookup.vector is None:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            expires_at = time.monotonic() + self.ttl_seconds
+            self._entries[entry_id] = (lookup.fingerprint, lookup.vector, expires_at, answer)
+            self._by_fingerprint.setdefault(lookup.fingerprint, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                old_id, (old_fingerprint, *_) = self._entries.popitem(last=False)
+                bucket = self._by_fingerprint[old_fingerprint]
+                bucket.discard(old_id)
+                if not bucket:
+                    del self._by_fingerprint[old_fingerprint]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_fingerprint.clear()
+
+    def invalidate_index(self) -> None:
+        """Drop answers and retrieved documents after the arxiv index was refreshed."""
+        self.clear()
+        invalidate_retrieval_cache()
+
+    async def check_index_version(self, force: bool = False) -> None:
+        """Clear the cache if the arxiv table changed since the last check."""
+        now = time.monotonic()
+        if not force and now - self._index_checked_at < self.index_check_seconds:
+            return
+        self._index_checked_at = now
+        try:
+            version = await Database.fetch_arxiv_index_version()
+        except Exception as e:
+            print(f"Error checking arxiv index version: {e}")
+            return
+        if self._index_version is not None and version != self._index_version:
+            print("arxiv index changed, clearing the answer and retrieval caches")
+            self.invalidate_index()
+        self._index_version = version
+
+
+answer_cache = SemanticAnswerCache(
+    threshold=settings.answer_cache_similarity,
+    max_entries=settings.answer_cache_max_entries,
+    ttl_seconds=settings.answer_cache_ttl_seconds,
+    index_check_seconds=settings.answer_cache_index_check_seconds,
+)
+
+metrics.gauge("answer_cache_entries", "Answers held in the semantic answer cache", callback=lambda: len(answer_cache))
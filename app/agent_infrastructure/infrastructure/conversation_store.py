@@ -0,0 +1,166 @@
+import json
+from typing import Any, List, Optional
+
+from app.agent_infrastructure.infrastructure.llm_clients import get_chat_model
+from app.core.config import settings
+from app.db.client import Database
+
+CONVERSATIONS_DDL = """
+CREATE TABLE IF NOT EXISTS conversations (
+    user_id TEXT NOT NULL,
+    conversation_id TEXT NOT NULL,
+    summary TEXT NOT NULL DEFAULT '',
+    messages JSONB NOT NULL DEFAULT '[]'::jsonb,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, conversation_id)
+);
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for budgeting history."""
+    return len(text) // 4 + 1
+
+
+def _message_tokens(message: dict) -> int:
+    return estimate_tokens(message.get("content", "")) + 4
+
+
+class ConversationStore:
+    """
+    Server-side chat history in Postgres, keyed by user and conversation id.
+
+    Only user messages and final answers are stored; the tool outputs of a
+    turn are reduced to the ids of the documents it cited. When the stored
+    history exceeds ``token_budget``, the oldest messages beyond the
+    ``keep_recent`` most recent ones are folded into a running summary by
+    gpt-4o-mini.
+
+    Attributes:
+        token_budget (int): Approximate tokens of summary plus history sent to the agent.
+        keep_recent (int): Messages always kept verbatim.
+    """
+
+    def __init__(self, token_budget: int = 2000, keep_recent: int = 6):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+
+    async def ensure_schema(self) -> None:
+        await Database.execute(CONVERSATIONS_DDL)
+
+    async def _fetch(self, user_id: str, conversation_id: str) -> Optional[Any]:
+        return await Database.fetchrow(
+            """
+            SELECT summary, messages, version
+            FROM conversations
+            WHERE user_id = $1 AND conversation_id = $2;
+            """,
+            user_id,
+            conversation_id,
+        )
+
+    async def load(self, user_id: str, conversation_id: str) -> List[dict]:
+        """
+        The stored history as agent messages: the summary (if any) as a system
+        message, then the recent turns with their cited document ids.
+
+        Returns:
+            list[dict]: Messages in ``{"role", "content"}`` form, empty for a new conversation.
+        """
+        row = await self._fetch(user_id, conversation_id)
+        if row is None:
+            return []
+        messages = []
+        if row["summary"]:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{row['summary']}"})
+        for message in json.loads(row["messages"]):
+            content = message["content"]
+            if message.get("document_ids"):
+                content += f"\n\n[documents cited: {', '.join(str(i) for i in message['document_ids'])}]"
+            messages.append({"role": message["role"], "content": content})
+        return messages
+
+    async def append(self, user_id: str, conversation_id: str, messages: List[dict]) -> None:
+        """Atomically append messages (``role``, ``content`` and optional ``document_ids``)."""
+        await Database.execute(
+            """
+            INSERT INTO conversations (user_id, conversation_id, messages)
+            VALUES ($1, $2, $3::jsonb)
+            ON CONFLICT (user_id, conversation_id)
+            DO UPDATE SET messages = conversations.messages || EXCLUDED.messages, updated_at = now();
+            """,
+            user_id,
+            conversation_id,
+            json.dumps(messages),
+        )
+
+    async def compact(self, user_id: str, conversation_id: str) -> bool:
+        """
+        Summarize the oldest messages if the history is over budget.
+
+        Concurrent appends are safe (only a prefix of the array is removed) and
+        concurrent compactions are detected with the row version.
+
+        Returns:
+            bool: True if the history was compacted.
+        """
+        row = await self._fetch(user_id, conversation_id)
+        if row is None:
+            return False
+        messages = json.loads(row["messages"])
+        total = estimate_tokens(row["summary"]) + sum(_message_tokens(m) for m in messages)
+        if total <= self.token_budget or len(messages) <= self.keep_recent:
+            return False
+
+        # Fold the oldest messages until what remains fits, but never the recent window.
+        drop, remaining = 0, total
+        while drop < len(messages) - self.keep_recent and remaining > self.token_budget // 2:
+            remaining -= _message_tokens(messages[drop])
+            drop += 1
+        summary = await self._summarize(row["summary"], messages[:drop])
+
+        result = await Database.execute(
+            """
+            UPDATE conversations
+            SET summary = $3,
+                messages = COALESCE(
+                    (SELECT jsonb_agg(element ORDER BY position)
+                     FROM jsonb_array_elements(messages) WITH ORDINALITY AS t(element, position)
+                     WHERE position > $4),
+                    '[]'::jsonb),
+                version = version + 1,
+                updated_at = now()
+            WHERE user_id = $1 AND conversation_id = $2 AND version = $5;
+            """,
+            user_id,
+            conversation_id,
+            summary,
+            drop,
+            row["version"],
+        )
+        return result.endswith(" 1")
+
+    async def _summarize(self, previous_summary: str, messages: List[dict]) -> str:
+        transcript = "\n".join(
+            f"{m['role']}: {m['content']}"
+            + (f" [documents: {', '.join(str(i) for i in m['document_ids'])}]" if m.get("document_ids") else "")
+            for m in messages
+        )
+        prompt = [{
+            "role": "system",
+            "content": (
+                "Update the running summary of a conversation with a research assistant. Keep the topics, "
+                "the user's goals, conclusions reached and the ids of papers cited. "
+                f"Write at most {settings.conversation_summary_max_words} words.\n\n"
+                f"Current summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"
+            ),
+        }]
+        response = await get_chat_model("gpt_41_mini_summary").ainvoke(prompt)
+        return response.content.strip()
+
+
+conversation_store = ConversationStore(
+    token_budget=settings.conversation_token_budget,
+    keep_recent=settings.conversation_keep_recent_messages,
+)
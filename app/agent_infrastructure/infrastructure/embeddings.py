@@ -1,6 +1,13 @@
 import requests 
 import json 
+import threading
+from collections import OrderedDict
+import numpy as np
 from app.core.config import settings
+from app.core.deadline import record_degradation, timeout_for
+from app.core.instrumentation import span
+from app.core.resilience import get_upstream
+from app.core.vectors import EMPTY_BATCH, EMPTY_VECTOR, as_batch
 
 url = settings.embedding_api_url
 
@@ -10,33 +17,89 @@ headers = {
 } 
 
 
-def get_embeddings_from_api(data: list) -> list: 
-    response = requests.post(url, headers=headers, data=json.dumps(data)) 
-    if response.status_code == 200: 
-        result = response.json() 
-        if isinstance(result, dict):
-            return result.get("embeddings", [])
-        elif isinstance(result, list):
-            return result
-        else:
-            print(f"Unexpected API response format: {type(result)}")
-            print(f"Response: {result}")
-            return []
-    else: 
-        print(f"Error: {response.status_code}") 
-        print(response.text) 
-        return [] 
+# Keep-alive connections to the embedding service, shared by all threads (hedged calls included).
+_session = requests.Session()
+_session.mount(url or "http://", requests.adapters.HTTPAdapter(
+    pool_connections=1, pool_maxsize=settings.http_pool_connections
+))
+
+# Last good embedding per text, served when the embedding service is down.
+# Updated from many threads (to_thread callers, hedged calls), so always under the lock.
+_fallback_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_fallback_lock = threading.Lock()
+embedding_upstream = get_upstream("embedding")
+
+
+def _post_embeddings(data: list) -> np.ndarray:
+    """One request to the embedding service; raises on transport or HTTP errors."""
+    response = _session.post(
+        url, headers=headers, data=json.dumps(data),
+        timeout=timeout_for(settings.embedding_timeout_seconds),
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f"Embedding API error {response.status_code}: {response.text}")
+    result = response.json()
+    # Converted straight away so the parsed lists of Python floats can be freed.
+    if isinstance(result, dict):
+        return as_batch(result.get("embeddings", []))
+    elif isinstance(result, list):
+        return as_batch(result)
+    else:
+        print(f"Unexpected API response format: {type(result)}")
+        print(f"Response: {result}")
+        return EMPTY_BATCH
+
+
+def _remember(data: list, embeddings: np.ndarray) -> None:
+    if len(embeddings) != len(data):
+        return
+    # Copies, so a cached row does not keep its whole response batch alive.
+    vectors = [vector.copy() for vector in embeddings]
+    with _fallback_lock:
+        for text, vector in zip(data, vectors):
+            _fallback_cache[text] = vector
+            _fallback_cache.move_to_end(text)
+        while len(_fallback_cache) > settings.embedding_fallback_cache_size:
+            _fallback_cache.popitem(last=False)
+
+
+def _fallback(data: list, error: Exception) -> np.ndarray:
+    """Serve previously seen embeddings if every text has one, otherwise nothing."""
+    if isinstance(error, requests.Timeout):
+        record_degradation("embedding_timeout")
+    print(f"Error: {error}")
+    with _fallback_lock:
+        vectors = [_fallback_cache.get(text) for text in data]
+    if vectors and all(vector is not None for vector in vectors):
+        return np.stack(vectors)
+    return EMPTY_BATCH
+
+
+@span("embedding")
+def get_embeddings_from_api(data: list) -> np.ndarray: 
+    """
+    Embed texts through the embedding service, hedged against slow replicas.
+
+    Returns a contiguous ``(len(data), dim)`` float32 array; an empty batch (or
+    cached embeddings) when the service fails or its circuit breaker is open.
+    """
+    embeddings = embedding_upstream.call(
+        lambda: _post_embeddings(data),
+        fallback=lambda error: _fallback(data, error),
+    )
+    _remember(data, embeddings)
+    return embeddings
 
 
 class CustomEmbedding: 
-    def embed_documents(self, texts: list) -> list: 
-        """Get embeddings for documents (texts) using the custom API.""" 
+    def embed_documents(self, texts: list) -> np.ndarray: 
+        """Get embeddings for documents (texts) using the custom API, as a float32 batch.""" 
         return get_embeddings_from_api(texts) 
 
-    def embed_query(self, query: str) -> list: 
-        """Get embedding for a single query using the custom API.""" 
+    def embed_query(self, query: str) -> np.ndarray: 
+        """Get embedding for a single query using the custom API (empty when unavailable).""" 
         embeddings = get_embeddings_from_api([query]) 
-        return embeddings[0] if embeddings else []
+        return embeddings[0] if len(embeddings) else EMPTY_VECTOR
 
 if __name__ == "__main__":
     # Example usage
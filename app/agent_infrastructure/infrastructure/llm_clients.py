@@ -1,10 +1,86 @@
+# Standard library imports
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict
+from uuid import UUID
+
 # Third-party imports
-from langchain_openai import ChatOpenAI
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Local imports
+from app.core.instrumentation import record_span
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+
+class LLMSpanHandler(BaseCallbackHandler):
+    """
+    Callback handler that records every chat model call as a span.
+
+    Agent calls are split by outcome: ``<prefix>_tool_call`` when the model
+    asked for a tool (the planning call) and ``<prefix>_answer`` for the final
+    generation.
+    """
+
+    run_inline = True
+
+    def __init__(self, prefix: str, split_by_outcome: bool = False):
+        self.prefix = prefix
+        self.split_by_outcome = split_by_outcome
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        name = self.prefix
+        if self.split_by_outcome:
+            message = getattr(response.generations[0][0], "message", None) if response.generations else None
+            name = f"{self.prefix}_tool_call" if getattr(message, "tool_calls", None) else f"{self.prefix}_answer"
+        record_span(name, time.perf_counter() - started)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            record_span(f"{self.prefix}_error", time.perf_counter() - started)
+
+
+# Client name -> (model, span prefix, split spans by outcome). The mini agent client is the
+# same model as gpt_41_mini, with its own spans when the router uses it for agent generation.
+CHAT_MODELS = {
+    "gpt_41": ("gpt-4o", "agent_llm", True),
+    "gpt_41_mini": ("gpt-4o-mini", "query_expansion_llm", False),
+    "gpt_41_mini_agent": ("gpt-4o-mini", "agent_llm_mini", True),
+    "gpt_41_mini_summary": ("gpt-4o-mini", "conversation_summary_llm", False),
+}
+
+_chat_models: Dict[str, "ChatOpenAI"] = {}
+_chat_models_lock = threading.Lock()
+
+
+def get_chat_model(name: str) -> "ChatOpenAI":
+    """
+    Return the process-wide chat client ``name`` (a ``CHAT_MODELS`` key), built on first use.
 
-gpt_41 = ChatOpenAI(
-    model="gpt-4o"
-)
+    ``langchain_openai`` and the OpenAI SDK are only imported here, so importing
+    the app does not pay for them; the API builds the clients during its
+    start-up warm-up.
+    """
+    model = _chat_models.get(name)
+    if model is None:
+        with _chat_models_lock:
+            model = _chat_models.get(name)
+            if model is None:
+                from langchain_openai import ChatOpenAI
 
-gpt_41_mini = ChatOpenAI(
-    model="gpt-4o-mini"
-)
+                model_name, prefix, split_by_outcome = CHAT_MODELS[name]
+                model = ChatOpenAI(
+                    model=model_name,
+                    callbacks=[LLMSpanHandler(prefix, split_by_outcome=split_by_outcome)]
+                )
+                _chat_models[name] = model
+    return model
@@ -0,0 +1,50 @@
+import json
+from typing import Dict
+
+from app.core.config import settings
+from app.db.client import Database, bulk_writer
+
+REQUEST_LOG_DDL = """
+CREATE TABLE IF NOT EXISTS request_log (
+    id BIGSERIAL PRIMARY KEY,
+    method TEXT NOT NULL,
+    path TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    duration_ms DOUBLE PRECISION NOT NULL,
+    stages JSONB NOT NULL DEFAULT '{}'::jsonb,
+    logged_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+REQUEST_LOG_COLUMNS = ("method", "path", "status", "duration_ms", "stages")
+
+# Probes and scrapes: frequent and uninteresting.
+UNLOGGED_PATHS = {"/", "/ready", "/metrics"}
+
+
+class RequestLog:
+    """
+    One ``request_log`` row per API request: status, duration and the time spent per stage.
+
+    Rows go through ``bulk_writer``, so logging never takes a connection from
+    vector search and the insert happens after the response has been sent. Under sustained
+    overload rows are dropped (and counted) rather than slowing requests down.
+    """
+
+    async def ensure_schema(self) -> None:
+        await Database.execute(REQUEST_LOG_DDL)
+
+    async def record(self, method: str, path: str, status: int, seconds: float, stages: Dict[str, float]) -> None:
+        """``ServerTimingMiddleware`` hook: buffer the row of a finished request (``stages`` in seconds)."""
+        if not settings.request_log_enabled or path in UNLOGGED_PATHS:
+            return
+        stages_ms = {name: stage_seconds * 1000 for name, stage_seconds in stages.items()}
+        try:
+            await bulk_writer.write(
+                "request_log", REQUEST_LOG_COLUMNS, (method, path, status, seconds * 1000, json.dumps(stages_ms))
+            )
+        except Exception as e:
+            print(f"Error logging request {method} {path}: {e}")
+
+
+request_log = RequestLog()
@@ -0,0 +1,110 @@
+"""
+Start-up warm-up of the API, run by the FastAPI lifespan before it serves.
+
+Importing the app builds nothing expensive: the LLM clients, the guardrails
+validators and models are created on first use. Without a warm-up the first
+requests would pay for that, plus DNS/TLS to every upstream. The steps below
+run concurrently once the database pools are open:
+
+* ``guardrails``: build the guard (loads the ONNX models with that backend)
+  and classify a trial text with each model, which opens their HTTP pool;
+* ``embedding_search``: embed a trial query, opening the embedding service's
+  connection pool, and search with it, which touches every search target
+  and the top of the HNSW index (a target that is down or an empty index
+  fails the step);
+* ``llm_clients``: build the chat clients and the tool-bound agent models and
+  list the available models, which opens the OpenAI connection pool shared by
+  all clients without a billed completion.
+
+Every step fails open: a dependency that is down at start-up is reported (log,
+``startup_warmup_seconds`` and ``/ready``) and retried by the first request,
+as without a warm-up.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict
+
+from app.agent_infrastructure.agents.model_router import MODELS, get_tool_model
+from app.agent_infrastructure.guardrails.guardrails import get_guard
+from app.agent_infrastructure.infrastructure.llm_clients import CHAT_MODELS, get_chat_model
+from app.agent_infrastructure.tools.document_retriver import SEARCH_LIMIT, embed
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.vectors import as_batch
+from app.db.client import Database
+
+WARMUP_QUERY = "retrieval augmented generation for question answering over scientific papers"
+
+warmup_seconds = metrics.gauge("startup_warmup_seconds", "Duration of each start-up warm-up step, by step and outcome")
+
+
+async def _guardrails() -> None:
+    validators, _ = await asyncio.to_thread(get_guard)
+    topic = validators["constrain_topic"]
+    # Straight to the models: guardrails_validator turns model errors into a verdict (guardrails_fail_mode),
+    # which would hide a model that is down.
+    await asyncio.gather(
+        asyncio.to_thread(topic._detect_topics_many, [WARMUP_QUERY], settings.guardrails_topic_detector),
+        asyncio.to_thread(topic.guard_models.detect_bias_many, [WARMUP_QUERY]),
+        asyncio.to_thread(topic.guard_models.detect_toxic_many, [WARMUP_QUERY]),
+    )
+
+
+async def _embedding_search() -> None:
+    vector = await asyncio.to_thread(embed.embed_query, WARMUP_QUERY)
+    if not len(vector):
+        raise RuntimeError("the embedding service returned no embedding")
+    missing_shards = []
+    papers = await Database.fetch_batch_vector_search(as_batch([vector]), limit=SEARCH_LIMIT, missing_shards=missing_shards)
+    # A search failure raises; a shard left out or an empty index would still look like a search.
+    if missing_shards:
+        raise RuntimeError(f"search targets unavailable: {', '.join(missing_shards)}")
+    if not papers:
+        raise RuntimeError("the vector search returned no papers")
+
+
+async def _llm_clients() -> None:
+    def build():
+        for name in CHAT_MODELS:
+            get_chat_model(name)
+        for name in MODELS:
+            get_tool_model(name)
+
+    await asyncio.to_thread(build)
+    # All ChatOpenAI clients share langchain_openai's default async HTTP client.
+    await get_chat_model("gpt_41").root_async_client.models.list()
+
+
+WARMUP_STEPS: Dict[str, Callable[[], Awaitable[None]]] = {
+    "guardrails": _guardrails,
+    "embedding_search": _embedding_search,
+    "llm_clients": _llm_clients,
+}
+
+
+async def warm_up() -> Dict[str, dict]:
+    """
+    Run the warm-up steps concurrently, each within ``startup_warmup_timeout_seconds``.
+
+    Returns:
+        dict[str, dict]: Per step, its ``outcome`` ("ok", "timeout" or the error) and ``seconds``.
+    """
+    async def run(name: str, step: Callable[[], Awaitable[None]]) -> tuple:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(step(), timeout=settings.startup_warmup_timeout_seconds)
+            outcome = "ok"
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+        except Exception as e:
+            outcome = f"error: {e}"
+        elapsed = time.perf_counter() - started
+        warmup_seconds.set(elapsed, step=name, outcome="ok" if outcome == "ok" else "failed")
+        print(f"Warm-up {name}: {outcome} in {elapsed:.2f}s")
+        return name, {"outcome": outcome, "seconds": round(elapsed, 3)}
+
+    started = time.perf_counter()
+    report = dict(await asyncio.gather(*(run(name, step) for name, step in WARMUP_STEPS.items())))
+    print(f"Warm-up finished in {time.perf_counter() - started:.2f}s")
+    return report
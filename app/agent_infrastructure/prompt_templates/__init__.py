@@ -1,3 +1,3 @@
-from .templates import agent_prompt_template, multi_query_retriever_prompt
+from .templates import agent_prompt_template, multi_query_retriever_prompt, rag_answer_prompt_template
 
-__all__ = ["agent_prompt_template", "multi_query_retriever_prompt"]
\ No newline at end of file
+__all__ = ["agent_prompt_template", "multi_query_retriever_prompt", "rag_answer_prompt_template"]
\ No newline at end of file
@@ -44,6 +44,20 @@ You are an expert RAG (Retrieval-Augmented Generation) assistant designed to pro
 """
     }]
 
+def rag_answer_prompt_template(context: str):
+    """System prompt for the fast path: answer once from documents retrieved up front."""
+    instructions = agent_prompt_template()[0]["content"].split("##Tools you have access to:")[0]
+    return [{
+        "role": "system",
+        "content": f"""{instructions}
+## Retrieved context
+
+The documents below were retrieved for the user's latest question. Answer from them directly.
+
+{context}
+"""
+    }]
+
 def multi_query_retriever_prompt(question: str, number_of_queries: int = 5):
     return [{
         "role": "system",
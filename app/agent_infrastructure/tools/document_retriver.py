@@ -1,42 +1,68 @@
 import asyncio
 import json
-from typing import List, Annotated
+import re
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, List, Annotated, Optional
+import numpy as np
 from async_lru import alru_cache 
-from langchain_core.documents import Document
 from langchain_core.tools import tool
-from app.agent_infrastructure.infrastructure.llm_clients import gpt_41_mini
+from app.agent_infrastructure.infrastructure.llm_clients import get_chat_model
+from app.core.config import settings
+from app.core.deadline import record_degradation, remaining, timeout_for
+from app.core.instrumentation import span
+from app.core.metrics import metrics
+from app.core.resilience import get_upstream
+from app.core.vectors import cosine_similarity, dedupe_rows
 from app.db.client import Database
 from app.agent_infrastructure.infrastructure.embeddings import CustomEmbedding
 from app.agent_infrastructure.prompt_templates import multi_query_retriever_prompt
 from app.schema.langgraph_tools_state import DocumentRetrieverState
+from app.schema.retrieved_paper import RetrievedPaper, as_paper
 from langchain_core.messages import ToolMessage
 from langgraph.prebuilt import InjectedState
 from langgraph.types import Command
 from langchain_core.tools.base import InjectedToolCallId
 
 embed = CustomEmbedding()
+# Expanded queries per retrieval, and papers kept per query vector.
+NUM_QUERIES = 5
+SEARCH_LIMIT = 5
+query_expansion_upstream = get_upstream("query_expansion_llm")
 
-def deduplicate_documents(documents: List[Document]) -> List[Document]:
+# Set per document_retriever_utils call; flipped when the retrieval ran degraded.
+_retrieval_degraded: ContextVar[dict | None] = ContextVar("retrieval_degraded", default=None)
+
+
+def _mark_degraded(name: str) -> None:
+    record_degradation(name)
+    flag = _retrieval_degraded.get()
+    if flag is not None:
+        flag["degraded"] = True
+
+def deduplicate_papers(papers: List[RetrievedPaper]) -> List[RetrievedPaper]:
     """
-    Remove duplicate documents based on title and abstract.
+    Remove duplicate papers based on title and abstract.
     
     Args:
-        documents (List[Document]): List of documents that may contain duplicates.
+        papers (List[RetrievedPaper]): List of papers that may contain duplicates.
         
     Returns:
-        List[Document]: List of unique documents.
+        List[RetrievedPaper]: List of unique papers.
     """
     seen = set()
-    unique_docs = []
+    unique_papers = []
     
-    for doc in documents:
-        identifier = (doc.metadata.get('title', ''), doc.page_content[:100])
+    for paper in papers:
+        identifier = (paper.title or '', paper.abstract[:100])
         if identifier not in seen:
             seen.add(identifier)
-            unique_docs.append(doc)
+            unique_papers.append(paper)
     
-    return unique_docs
+    return unique_papers
 
+@span("multi_query_retriever")
 async def multi_query_retriever(query: str, num_queries: int) -> List[str]:
     """
     Generate multiple search queries from the original query
@@ -49,9 +75,18 @@ async def multi_query_retriever(query: str, num_queries: int) -> List[str]:
     """
     messages = multi_query_retriever_prompt(query, num_queries)
     try:
-        response = await gpt_41_mini.ainvoke(messages)
+        # Hedged: a second completion goes out if the first is slower than usual.
+        response = await asyncio.wait_for(
+            query_expansion_upstream.acall(lambda: get_chat_model("gpt_41_mini").ainvoke(messages)),
+            timeout=timeout_for(settings.query_expansion_timeout_seconds),
+        )
+    except asyncio.TimeoutError:
+        print("Query expansion timed out, using the original query")
+        _mark_degraded("query_expansion_timeout")
+        return [query]
     except Exception as e:
         print(f"Error with gpt_41_mini: {e}")
+        _mark_degraded("query_expansion_error")
         return [query]
     try:
         queries = json.loads(response.content)
@@ -60,57 +95,231 @@ async def multi_query_retriever(query: str, num_queries: int) -> List[str]:
         queries = [query]
     return queries
 
-async def process_natural_language_query(query: str, num_queries: int) -> List[List[float]]:
+async def process_natural_language_query(query: str, num_queries: int) -> np.ndarray:
     """
     Process a natural language query by:
     1. Passing it to the multi_query_retriever to generate multiple search queries
     2. Batch embedding all generated queries for optimal performance
+    3. Dropping near-duplicate expansions, which would only repeat a search
     
     Args:
         query (str): The original natural language query from the user.
 
     Returns:
-        List[List[float]]: A list of embeddings for each generated query.
+        np.ndarray: A ``(n, dim)`` float32 batch, one embedding per distinct query.
+    """
+    budget = remaining()
+    if budget < settings.degrade_skip_expansion_below_seconds:
+        _mark_degraded("skip_query_expansion")
+        multi_queries = [query]
+    else:
+        if budget < settings.degrade_fewer_queries_below_seconds and num_queries > settings.degraded_num_queries:
+            _mark_degraded("fewer_expansion_queries")
+            num_queries = settings.degraded_num_queries
+        multi_queries = await multi_query_retriever(query, num_queries)
+    # A blocking HTTP call: keep it off the event loop (the prefetch runs concurrently with guardrails).
+    query_embeddings = await asyncio.to_thread(embed.embed_documents, multi_queries)
+    if len(query_embeddings) != len(multi_queries):
+        # Embedding service down (or breaker open) and no fallback embeddings for these queries.
+        _mark_degraded("embedding_unavailable")
+    return query_embeddings[dedupe_rows(query_embeddings, settings.retrieval_query_dedup_similarity)]
+
+
+def fuse_results(search_results: List[RetrievedPaper]) -> List[RetrievedPaper]:
+    """
+    Merge the papers found for several query vectors: each paper once, closest first.
+
+    Papers carry their similarity to the query that found them; a paper found
+    by several queries keeps its best score.
+    """
+    if not search_results:
+        return search_results
+    scores = np.fromiter((paper.score for paper in search_results), dtype=np.float32, count=len(search_results))
+    fused, seen = [], set()
+    for i in np.argsort(-scores, kind="stable"):
+        paper = search_results[i]
+        if paper.id not in seen:
+            seen.add(paper.id)
+            fused.append(paper)
+    return fused
+
+async def document_retriever_utils(query: str) -> List[RetrievedPaper]:
+    """
+    Retrieve documents for a query through the cache.
+
+    Results produced under a degraded budget (fewer expansions, lower search
+    effort) or by a failing upstream (no embeddings, a search error) are
+    returned but not kept in the cache.
+
+    Args:
+        query (str): The user query for document retrieval.
+
+    Returns:
+        list[RetrievedPaper]: The relevant papers, most similar first.
     """
-    multi_queries = await multi_query_retriever(query, num_queries)
-    query_embeddings = embed.embed_documents(multi_queries)
-    return query_embeddings
+    flag = {"degraded": False}
+    token = _retrieval_degraded.set(flag)
+    try:
+        documents = await _cached_document_retriever(query)
+    finally:
+        _retrieval_degraded.reset(token)
+    if flag["degraded"]:
+        _cached_document_retriever.cache_invalidate(query)
+        record_degradation("skip_cache_fill")
+    return documents
+
 
 @alru_cache(maxsize=128)
-async def document_retriever_utils(query: str) -> List[Document]:
+async def _cached_document_retriever(query: str) -> List[RetrievedPaper]:
     """
     Retrieves relevant documents based on a user query using optimized MultiQueryRetriever.
 
+    The cache keeps the search's ``RetrievedPaper`` tuples as they are.
+
     Args:
         user_query (str): The user query for document retrieval.
 
     Returns:
-        list[Document]: A list of relevant documents.
+        list[RetrievedPaper]: The relevant papers, most similar first.
     """
-    num_queries = 5 
     try:
-        query_embeddings = await process_natural_language_query(query, num_queries)
+        query_embeddings = await process_natural_language_query(query, NUM_QUERIES)
 
-        if not query_embeddings:
+        if len(query_embeddings) == 0:
             print("No query embeddings generated.")
             return []
     
-        search_results = await Database.fetch_batch_vector_search(query_vectors = query_embeddings, limit=5)  
-        documents = [
-            Document(
-                page_content=result["abstract"], 
-                metadata={"title": result["title"], "category": result["category"]}
-            ) 
-            for result in search_results
-        ]
-        unique_documents = deduplicate_documents(documents)
-
-        return unique_documents
+        ef_search = None
+        if remaining() < settings.degrade_search_effort_below_seconds:
+            _mark_degraded("reduced_search_effort")
+            ef_search = settings.degraded_ef_search
+        missing_shards = []
+        search_results = await Database.fetch_batch_vector_search(
+            query_vectors=query_embeddings, limit=SEARCH_LIMIT, ef_search=ef_search, missing_shards=missing_shards
+        )
+        if missing_shards:
+            # Partial results from a sharded search must not be cached as the answer to this query.
+            _mark_degraded("partial_search_results")
+        return deduplicate_papers(fuse_results(search_results))
     except Exception as e:
         print(f"Error in document_retriever: {e}")
+        # An empty result from a failure must not be cached as the answer to this query.
+        _mark_degraded("retrieval_error")
         return []
 
 
+def invalidate_retrieval_cache() -> None:
+    """Forget every cached retrieval, e.g. after the arxiv index was refreshed."""
+    _cached_document_retriever.cache_clear()
+
+
+metrics.gauge(
+    "retrieval_cache_lookups",
+    "document_retriever_utils cache hits and misses since start",
+    callback=lambda: {
+        (("result", "hit"),): _cached_document_retriever.cache_info().hits,
+        (("result", "miss"),): _cached_document_retriever.cache_info().misses,
+    },
+)
+
+
+retrieval_prefetches = metrics.counter(
+    "retrieval_prefetch_total", "Speculative retrievals by outcome (hit/miss/unused)"
+)
+retrieval_prefetch_saved = metrics.histogram(
+    "retrieval_prefetch_saved_seconds", "Retrieval time already done when a prefetch hit was used"
+)
+
+
+def _normalize_query(text: str) -> str:
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+class RetrievalPrefetch:
+    """
+    Retrieval started on the user's message before the agent asks for it.
+
+    The agent's first LLM call usually ends in a ``document_retriever`` call
+    whose query is a paraphrase of the user's message; running retrieval
+    during that call hides most of its latency.
+    """
+
+    def __init__(self, query: str):
+        self.query = query
+        self.started = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self.consumed = False
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> List[RetrievedPaper]:
+        try:
+            return await document_retriever_utils(self.query)
+        finally:
+            self.finished_at = time.perf_counter()
+
+    async def matches(self, query: str) -> bool:
+        """Whether ``query`` is close enough to the prefetched one to reuse its documents."""
+        if _normalize_query(query) == _normalize_query(self.query):
+            return True
+        vectors = await asyncio.to_thread(embed.embed_documents, [self.query, query])
+        if len(vectors) != 2:
+            return False
+        return float(cosine_similarity(vectors[:1], vectors[1])[0]) >= settings.retrieval_prefetch_similarity
+
+
+_prefetch: ContextVar[Optional[RetrievalPrefetch]] = ContextVar("retrieval_prefetch", default=None)
+
+
+@asynccontextmanager
+async def retrieval_prefetch(query: str, enabled: bool = True) -> AsyncIterator[Optional[RetrievalPrefetch]]:
+    """
+    Prefetch documents for ``query`` for the duration of the block.
+
+    The first ``document_retriever`` call inside the block reuses the result
+    if its query is semantically close; an unused prefetch is cancelled on exit.
+    """
+    if not enabled:
+        yield None
+        return
+    prefetch = RetrievalPrefetch(query)
+    token = _prefetch.set(prefetch)
+    try:
+        yield prefetch
+    finally:
+        _prefetch.reset(token)
+        if not prefetch.consumed:
+            retrieval_prefetches.inc(outcome="unused")
+        if not prefetch.task.done():
+            prefetch.task.cancel()
+
+
+async def _prefetched_documents(query: str) -> Optional[List[RetrievedPaper]]:
+    """Documents from the request's prefetch if it matches ``query``, else None."""
+    prefetch = _prefetch.get()
+    if prefetch is None or prefetch.consumed:
+        return None
+    prefetch.consumed = True
+    asked_at = time.perf_counter()
+    try:
+        matched = await prefetch.matches(query)
+    except Exception as e:
+        print(f"Prefetch comparison failed: {e}")
+        matched = False
+    if not matched:
+        retrieval_prefetches.inc(outcome="miss")
+        return None
+    try:
+        documents = await prefetch.task
+    except Exception:
+        documents = []
+    if not documents:
+        retrieval_prefetches.inc(outcome="miss")
+        return None
+    retrieval_prefetches.inc(outcome="hit")
+    retrieval_prefetch_saved.observe(min(asked_at, prefetch.finished_at) - prefetch.started)
+    return documents
+
+
 @tool(
     name_or_callable="document_retriever",
     description="This tool retrieves the documents relevant to the user query from the database",
@@ -120,22 +329,27 @@ async def document_retriever(
     query: str,
     tool_call_id: Annotated[str, InjectedToolCallId] = None,
     state: Annotated[dict, InjectedState] = None,
-    ) -> list[Document]:
+    ) -> Command:
     """
     Retrieves relevant documents based on a user query using optimized MultiQueryRetriever.
 
+    The papers go into ``retrieved_docs`` as ``RetrievedPaper`` records; only
+    the tool message shown to the LLM renders them as LangChain documents.
+
     Args:
         user_query (str): The user query for document retrieval.
 
     Returns:
-        list[Document]: A list of relevant documents.
+        Command: State update with the papers and the tool message.
     """
     try:
-        unique_documents = await document_retriever_utils(query)
+        unique_documents = await _prefetched_documents(query)
+        if unique_documents is None:
+            unique_documents = await document_retriever_utils(query)
         return Command(
             update={
                 "retrieved_docs": [unique_documents],
-                "messages": [ToolMessage(str(unique_documents), tool_call_id=tool_call_id)]
+                "messages": [ToolMessage(str([paper.to_document() for paper in unique_documents]), tool_call_id=tool_call_id)]
             }
         )
     except Exception as e:
@@ -148,13 +362,6 @@ async def document_retriever(
         )
     
 
-def docs_to_dicts(docs: List[Document]) -> List[dict]:
+def docs_to_dicts(docs: List[Any]) -> List[dict]:
     """Helper for DeepEval + API responses."""
-    return [
-        {
-            "title": d.metadata.get("title"),
-            "category": d.metadata.get("category"),
-            "abstract": d.page_content,
-        }
-        for d in docs
-    ]
+    return [as_paper(d).to_dict() for d in docs]
@@ -0,0 +1,183 @@
+"""
+Admission control for expensive endpoints.
+
+A global concurrency limit with a bounded wait queue. Waiters are served
+round-robin across users so one client sending a burst cannot starve the
+others. Requests are rejected fast with ``Retry-After`` instead of queueing
+when they could not start before the queue deadline.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+queue_wait = metrics.histogram("admission_queue_wait_seconds", "Time admitted requests spent queued")
+rejections = metrics.counter("admission_rejected_total", "Requests rejected by admission control, by reason")
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with per-user fair queuing.
+
+    Attributes:
+        max_concurrency (int): Requests allowed to run at once.
+        max_queue (int): Total waiting requests before new ones get 503.
+        max_queue_per_user (int): Waiting requests per user before that user gets 429.
+        queue_timeout (float): Longest a request may wait for a slot, in seconds.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, max_queue_per_user: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+        # Exponentially weighted service time, used to predict queue waits.
+        self._service_time = 1.0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def queue_depth_by_user(self) -> Dict[str, int]:
+        return {user: len(waiters) for user, waiters in self._waiters.items()}
+
+    def _estimated_wait(self, position: int) -> float:
+        return math.ceil(position / self.max_concurrency) * self._service_time
+
+    def _reject(self, status_code: int, reason: str, retry_after: float) -> HTTPException:
+        rejections.inc(reason=reason)
+        return HTTPException(
+            status_code=status_code,
+            detail=f"Server is busy ({reason}), please retry later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    async def acquire(self, user_id: str) -> None:
+        """
+        Wait for a slot or raise ``HTTPException`` (429/503 with ``Retry-After``).
+
+        Args:
+            user_id (str): The caller, used for fair queuing.
+        """
+        if self.in_flight < self.max_concurrency and not self._queued:
+            self.in_flight += 1
+            queue_wait.observe(0.0)
+            return
+
+        user_waiters = self._waiters.get(user_id)
+        if user_waiters and len(user_waiters) >= self.max_queue_per_user:
+            raise self._reject(429, "user_queue_full", self._estimated_wait(len(user_waiters)))
+        if self._queued >= self.max_queue:
+            raise self._reject(503, "queue_full", self._estimated_wait(self._queued))
+        estimated = self._estimated_wait(self._queued + 1)
+        if estimated > self.queue_timeout:
+            raise self._reject(503, "deadline", estimated)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user_id, deque()).append(future)
+        self._queued += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Slot was handed over just as we timed out; give it back.
+                self.release()
+            else:
+                self._remove(user_id, future)
+            raise self._reject(503, "timeout", self._service_time)
+        except BaseException:
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                self._remove(user_id, future)
+            raise
+        queue_wait.observe(time.perf_counter() - started)
+
+    def _remove(self, user_id: str, future: asyncio.Future) -> None:
+        waiters = self._waiters.get(user_id)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            self._queued -= 1
+            if not waiters:
+                del self._waiters[user_id]
+        future.cancel()
+
+    def release(self) -> None:
+        """Free a slot, handing it straight to the next user in round-robin order."""
+        while self._waiters:
+            user_id, waiters = next(iter(self._waiters.items()))
+            future = waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                self._waiters.move_to_end(user_id)
+            else:
+                del self._waiters[user_id]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def record_service_time(self, seconds: float) -> None:
+        self._service_time = 0.8 * self._service_time + 0.2 * seconds
+
+    @asynccontextmanager
+    async def admit(self, user_id: str) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block."""
+        await self.acquire(user_id)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_service_time(time.perf_counter() - started)
+            self.release()
+
+    def ticket(self) -> "AdmissionTicket":
+        """A release handle for work that outlives the handler (streamed responses)."""
+        return AdmissionTicket(self)
+
+
+class AdmissionTicket:
+    """Releases an admitted slot exactly once, whichever path finishes first."""
+
+    def __init__(self, controller: AdmissionController):
+        self.controller = controller
+        self.started = time.perf_counter()
+        self.released = False
+
+    def release(self) -> None:
+        if self.released:
+            return
+        self.released = True
+        self.controller.record_service_time(time.perf_counter() - self.started)
+        self.controller.release()
+
+
+chat_admission = AdmissionController(
+    max_concurrency=settings.admission_max_concurrency,
+    max_queue=settings.admission_max_queue,
+    max_queue_per_user=settings.admission_max_queue_per_user,
+    queue_timeout=settings.admission_queue_timeout_seconds,
+)
+
+# A batch holds its slot for minutes; batches get their own small limit instead of /chat/ slots.
+batch_admission = AdmissionController(
+    max_concurrency=settings.chat_batch_max_concurrent_batches,
+    max_queue=settings.chat_batch_max_concurrent_batches * 2,
+    max_queue_per_user=1,
+    queue_timeout=settings.admission_queue_timeout_seconds,
+)
+
+metrics.gauge("admission_queue_depth", "Requests waiting for an admission slot", callback=lambda: chat_admission.queue_depth)
+metrics.gauge("admission_in_flight", "Requests currently admitted", callback=lambda: chat_admission.in_flight)
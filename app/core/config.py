@@ -67,6 +67,18 @@ def parse_dict_of_lists_from_env(prefix, default_dict=None):
                 result[endpoint] = [item.strip() for item in value.split(",") if item.strip()]
     return result
 
+def parse_float_dict_from_env(env_key, default=None):
+    """Parse ``name=value`` pairs separated by commas into a dict of floats."""
+    value = os.getenv(env_key)
+    if not value:
+        return dict(default or {})
+    result = {}
+    for item in value.strip("\"'").split(","):
+        if "=" in item:
+            name, number = item.split("=", 1)
+            result[name.strip()] = float(number)
+    return result
+
 class Settings:
     """Application settings class."""
 
@@ -106,13 +118,161 @@ class Settings:
         self.topic_detection_model_url = os.getenv("topic_detection_model_url")
         self.bias_detection_model_url = os.getenv("bias_detection_model_url")
         self.toxic_classification_model_url = os.getenv("toxic_classification_model_url")
-           
+
+        # Guardrails backend: "http" (remote model endpoints) or "onnx" (in-process ONNX Runtime)
+        self.guardrails_backend = os.getenv("guardrails_backend", "http").lower()
+        self.guardrails_onnx_model_dir = os.getenv("guardrails_onnx_model_dir", "model_hosting/guardrails_models/models")
+        self.guardrails_onnx_max_workers = int(os.getenv("guardrails_onnx_max_workers", "2"))
+        self.guardrails_onnx_intra_op_threads = int(os.getenv("guardrails_onnx_intra_op_threads", "0"))
+        self.guardrails_onnx_max_batch_size = int(os.getenv("guardrails_onnx_max_batch_size", "16"))
+        self.guardrails_onnx_batch_wait_ms = float(os.getenv("guardrails_onnx_batch_wait_ms", "5"))
+        self.guardrails_zero_shot_multi_label = os.getenv("guardrails_zero_shot_multi_label", "false").lower() == "true"
+
+        # Topic guard: "mnli" (zero-shot bart-large-mnli) or "embedding" (prototype similarity)
+        self.guardrails_topic_detector = os.getenv("guardrails_topic_detector", "mnli").lower()
+        self.guardrails_topic_embedding_threshold = float(os.getenv("guardrails_topic_embedding_threshold", "0.5"))
+        self.guardrails_topic_calibration_path = os.getenv("guardrails_topic_calibration_path", "")
+
+        # Start the agent while input guardrails are still running (opt-in)
+        self.speculative_agent_enabled = os.getenv("speculative_agent_enabled", "false").lower() == "true"
+
+        # Guardrail verdict cache
+        self.guardrails_cache_enabled = os.getenv("guardrails_cache_enabled", "true").lower() == "true"
+        self.guardrails_cache_max_entries = int(os.getenv("guardrails_cache_max_entries", "10000"))
+        self.guardrails_cache_ttl_seconds = float(os.getenv("guardrails_cache_ttl_seconds", "3600"))
+
+        # Admission control for /chat/
+        self.admission_max_concurrency = int(os.getenv("admission_max_concurrency", "8"))
+        self.admission_max_queue = int(os.getenv("admission_max_queue", "32"))
+        self.admission_max_queue_per_user = int(os.getenv("admission_max_queue_per_user", "4"))
+        self.admission_queue_timeout_seconds = float(os.getenv("admission_queue_timeout_seconds", "15"))
+
+        # /chat/batch: many questions per request, retrieval work shared across them
+        self.chat_batch_max_questions = int(os.getenv("chat_batch_max_questions", "500"))
+        self.chat_batch_deadline_seconds = float(os.getenv("chat_batch_deadline_seconds", "900"))
+        self.chat_batch_max_concurrent_batches = int(os.getenv("chat_batch_max_concurrent_batches", "2"))
+        self.chat_batch_llm_concurrency = int(os.getenv("chat_batch_llm_concurrency", "16"))
+        self.chat_batch_wave_size = int(os.getenv("chat_batch_wave_size", "32"))
+        self.chat_batch_embedding_size = int(os.getenv("chat_batch_embedding_size", "128"))
+        self.guardrails_batch_timeout_seconds = float(os.getenv("guardrails_batch_timeout_seconds", "60"))
+        self.guardrails_batch_topic_workers = int(os.getenv("guardrails_batch_topic_workers", "8"))
+
+        # Request deadlines and graceful degradation (seconds of budget left)
+        self.chat_deadline_seconds = float(os.getenv("chat_deadline_seconds", "30"))
+        self.embedding_timeout_seconds = float(os.getenv("embedding_timeout_seconds", "10"))
+        self.guardrails_timeout_seconds = float(os.getenv("guardrails_timeout_seconds", "10"))
+        self.query_expansion_timeout_seconds = float(os.getenv("query_expansion_timeout_seconds", "8"))
+        self.degrade_fewer_queries_below_seconds = float(os.getenv("degrade_fewer_queries_below_seconds", "15"))
+        self.degrade_skip_expansion_below_seconds = float(os.getenv("degrade_skip_expansion_below_seconds", "8"))
+        self.degrade_search_effort_below_seconds = float(os.getenv("degrade_search_effort_below_seconds", "5"))
+        self.degraded_num_queries = int(os.getenv("degraded_num_queries", "2"))
+        self.degraded_ef_search = int(os.getenv("degraded_ef_search", "16"))
+
+        # Answer pipeline: "agent" (ReAct), "fast" (retrieve then generate) or "auto" (route per question)
+        self.chat_pipeline = os.getenv("chat_pipeline", "auto").lower()
+
+        # Generation model routing: "off" (always gpt-4o), "heuristic" or "classifier"
+        self.model_routing_mode = os.getenv("model_routing_mode", "heuristic").lower()
+        self.model_routing_max_query_words = int(os.getenv("model_routing_max_query_words", "20"))
+        self.model_routing_max_context_chars = int(os.getenv("model_routing_max_context_chars", "6000"))
+        self.model_routing_max_turns = int(os.getenv("model_routing_max_turns", "1"))
+        self.model_routing_classifier_path = os.getenv("model_routing_classifier_path", "")
+
+        # Start retrieval on the user's message while the agent plans its tool call (opt-in)
+        self.retrieval_prefetch_enabled = os.getenv("retrieval_prefetch_enabled", "false").lower() == "true"
+        self.retrieval_prefetch_similarity = float(os.getenv("retrieval_prefetch_similarity", "0.85"))
+        # Expanded queries at least this similar to an earlier one are not searched again.
+        self.retrieval_query_dedup_similarity = float(os.getenv("retrieval_query_dedup_similarity", "0.97"))
+
+        # Semantic answer cache (consulted after guardrails pass)
+        self.answer_cache_enabled = os.getenv("answer_cache_enabled", "true").lower() == "true"
+        self.answer_cache_similarity = float(os.getenv("answer_cache_similarity", "0.95"))
+        self.answer_cache_max_entries = int(os.getenv("answer_cache_max_entries", "5000"))
+        self.answer_cache_ttl_seconds = float(os.getenv("answer_cache_ttl_seconds", "21600"))
+        self.answer_cache_index_check_seconds = float(os.getenv("answer_cache_index_check_seconds", "60"))
+
+        # Server-side conversation history
+        self.conversation_token_budget = int(os.getenv("conversation_token_budget", "2000"))
+        self.conversation_keep_recent_messages = int(os.getenv("conversation_keep_recent_messages", "6"))
+        self.conversation_summary_max_words = int(os.getenv("conversation_summary_max_words", "200"))
+
+        # Online evaluation queue (API enqueues, the worker process evaluates)
+        self.eval_worker_batch_size = int(os.getenv("eval_worker_batch_size", "16"))
+        self.eval_worker_max_concurrent = int(os.getenv("eval_worker_max_concurrent", "8"))
+        self.eval_worker_poll_seconds = float(os.getenv("eval_worker_poll_seconds", "2"))
+        self.eval_worker_metrics_port = int(os.getenv("eval_worker_metrics_port", "9101"))
+        self.eval_job_max_attempts = int(os.getenv("eval_job_max_attempts", "3"))
+        self.eval_job_visibility_timeout_seconds = float(os.getenv("eval_job_visibility_timeout_seconds", "600"))
+        self.eval_queue_stats_interval_seconds = float(os.getenv("eval_queue_stats_interval_seconds", "15"))
+        # Online evaluation sampling: base rate per metric, multipliers per stratum
+        # ("cache_hit:true", "pipeline:fast", "model:gpt-4o-mini", "category:cs.CL"), and a judge-call budget
+        # per worker. Answers routed to the small model are checked more often.
+        self.eval_sampling_rates = parse_float_dict_from_env("eval_sampling_rates", {
+            "answer_relevancy": 0.2,
+            "faithfulness": 0.2,
+            "contextual_relevancy": 0.1,
+            "task_completion": 0.05,
+            "bias": 0.05,
+            "toxicity": 0.05,
+            "hallucination": 0.1,
+        })
+        self.eval_sampling_strata = parse_float_dict_from_env("eval_sampling_strata", {
+            "cache_hit:true": 0.25,
+            "model:gpt-4o-mini": 2.0,
+        })
+        self.eval_judge_calls_per_hour = int(os.getenv("eval_judge_calls_per_hour", "2000"))
+
+        # Outbound calls: hedged requests and circuit breakers
+        self.hedging_enabled = os.getenv("hedging_enabled", "true").lower() == "true"
+        self.hedge_min_delay_ms = float(os.getenv("hedge_min_delay_ms", "20"))
+        self.hedge_max_delay_ms = float(os.getenv("hedge_max_delay_ms", "2000"))
+        self.breaker_failure_threshold = int(os.getenv("breaker_failure_threshold", "5"))
+        self.breaker_reset_seconds = float(os.getenv("breaker_reset_seconds", "30"))
+        self.embedding_fallback_cache_size = int(os.getenv("embedding_fallback_cache_size", "2048"))
+        # "open" lets requests through when guardrail models are unavailable, "closed" refuses them.
+        self.guardrails_fail_mode = os.getenv("guardrails_fail_mode", "open").lower()
+        # Keep-alive connections kept per HTTP upstream (embedding service, guardrail models)
+        self.http_pool_connections = int(os.getenv("http_pool_connections", "32"))
+
+        # Start-up warm-up: build clients and models, open connections and run a trial
+        # embedding/search before the API reports ready
+        self.startup_warmup_enabled = os.getenv("startup_warmup_enabled", "true").lower() == "true"
+        self.startup_warmup_timeout_seconds = float(os.getenv("startup_warmup_timeout_seconds", "60"))
+
         self.db_host = os.getenv("HOST")
         self.db_port = os.getenv("PORT")
         self.db_database = os.getenv("DATABASE")
         self.db_user = os.getenv("USER")
         self.db_password = os.getenv("PASSWORD")
         self.db_default_schema = os.getenv("DEFAULT_SCHEMA", "public")
+        self.db_ssl = os.getenv("db_ssl", "require")
+        # Named pools: search (replicas when configured), write and admin
+        self.db_search_pool_min_size = int(os.getenv("db_search_pool_min_size", "4"))
+        self.db_search_pool_max_size = int(os.getenv("db_search_pool_max_size", "10"))
+        self.db_write_pool_min_size = int(os.getenv("db_write_pool_min_size", "1"))
+        self.db_write_pool_max_size = int(os.getenv("db_write_pool_max_size", "4"))
+        self.db_admin_pool_min_size = int(os.getenv("db_admin_pool_min_size", "1"))
+        self.db_admin_pool_max_size = int(os.getenv("db_admin_pool_max_size", "2"))
+        # Comma-separated postgres:// DSNs; search is spread across them instead of the primary.
+        self.db_read_replica_dsns = parse_list_from_env("db_read_replica_dsns")
+        # Sharded arxiv: one DSN per shard, rows placed by id hash or by date range
+        self.db_shard_dsns = parse_list_from_env("db_shard_dsns")
+        self.db_shard_strategy = os.getenv("db_shard_strategy", "hash").lower()
+        self.db_shard_date_boundaries = parse_list_from_env("db_shard_date_boundaries")
+        self.db_shard_date_field = os.getenv("db_shard_date_field", "published")
+        self.db_shard_timeout_seconds = float(os.getenv("db_shard_timeout_seconds", "2"))
+        self.db_shard_pool_min_size = int(os.getenv("db_shard_pool_min_size", "2"))
+        self.db_shard_pool_max_size = int(os.getenv("db_shard_pool_max_size", "8"))
+        # Query vectors per grouped (LATERAL) search statement
+        self.db_grouped_search_size = int(os.getenv("db_grouped_search_size", "32"))
+        # Buffered bulk writes (request logs) on their own small pool
+        self.db_bulk_writer_connections = int(os.getenv("db_bulk_writer_connections", "2"))
+        self.db_bulk_writer_batch_size = int(os.getenv("db_bulk_writer_batch_size", "500"))
+        self.db_bulk_writer_flush_interval_seconds = float(os.getenv("db_bulk_writer_flush_interval_seconds", "1"))
+        self.db_bulk_writer_max_buffered_rows = int(os.getenv("db_bulk_writer_max_buffered_rows", "10000"))
+        self.db_bulk_writer_put_timeout_seconds = float(os.getenv("db_bulk_writer_put_timeout_seconds", "1"))
+        # One request_log row (status, duration, stage timings) per API request, via the bulk writer
+        self.request_log_enabled = os.getenv("request_log_enabled", "true").lower() == "true"
 
 # Create settings instance
 settings = Settings()
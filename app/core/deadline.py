@@ -0,0 +1,75 @@
+"""
+Per-request deadlines.
+
+The deadline is set once at the API boundary and carried in a context
+variable, so every stage (guardrails, query expansion, embedding, database)
+can see how much time is left and degrade instead of overrunning. Stages
+record what they skipped with ``record_degradation`` and the endpoint
+reports the list back to the client.
+"""
+
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+
+from app.core.metrics import metrics
+
+degradations_total = metrics.counter("request_degradations_total", "Stage degradations caused by low deadline budget")
+
+
+class Deadline:
+    """Absolute deadline for one request plus the degradations applied so far."""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+        self.degradations: List[str] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def set_deadline(seconds: float) -> Deadline:
+    """Start a deadline for the current request context."""
+    deadline = Deadline(seconds)
+    _current.set(deadline)
+    return deadline
+
+
+def use_deadline(deadline: Deadline) -> Deadline:
+    """Carry a deadline started elsewhere into the current context, e.g. a streaming response body."""
+    _current.set(deadline)
+    return deadline
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def remaining(default: float = float("inf")) -> float:
+    """Seconds left for the current request, or ``default`` outside a request."""
+    deadline = _current.get()
+    return deadline.remaining() if deadline is not None else default
+
+
+def timeout_for(stage_max: float) -> float:
+    """A stage timeout: the stage's own limit, capped by the request's remaining budget."""
+    return max(0.001, min(stage_max, remaining()))
+
+
+def record_degradation(name: str) -> None:
+    """Note that a stage degraded (once per request per name)."""
+    deadline = _current.get()
+    if deadline is not None and name not in deadline.degradations:
+        deadline.degradations.append(name)
+        degradations_total.inc(stage=name)
+
+
+def stop_on_deadline(retry_state) -> bool:
+    """tenacity stop condition: give up when the next back-off would overrun the deadline."""
+    return remaining() <= retry_state.upcoming_sleep
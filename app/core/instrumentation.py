@@ -0,0 +1,136 @@
+"""
+Lightweight per-request stage timing.
+
+``span("stage")`` works as a sync/async context manager or decorator. Every span
+feeds the ``stage_duration_seconds`` histogram and, when a request is active,
+is also recorded on a context-local list that becomes the ``Server-Timing``
+response header. The cost is two ``perf_counter`` calls and a list append.
+"""
+
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.metrics import metrics
+
+stage_duration = metrics.histogram(
+    "stage_duration_seconds", "Duration of each pipeline stage"
+)
+request_duration = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request duration by path"
+)
+
+_request_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_spans", default=None)
+
+
+def start_request() -> List[Tuple[str, float]]:
+    """Begin collecting spans for the current request context and return the list."""
+    spans: List[Tuple[str, float]] = []
+    _request_spans.set(spans)
+    return spans
+
+
+def record_span(name: str, seconds: float) -> None:
+    """Record a finished stage duration."""
+    stage_duration.observe(seconds, stage=name)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+class span:
+    """Time a stage; usable as ``with``, ``async with`` or a decorator."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._started = 0.0
+
+    def __enter__(self) -> "span":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        record_span(self.name, time.perf_counter() - self._started)
+
+    async def __aenter__(self) -> "span":
+        return self.__enter__()
+
+    async def __aexit__(self, *exc) -> None:
+        self.__exit__(*exc)
+
+    def __call__(self, func: Callable) -> Callable:
+        name = self.name
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def stage_totals(spans: List[Tuple[str, float]]) -> Dict[str, float]:
+    """Seconds per stage name, summing repeated spans."""
+    totals: Dict[str, float] = {}
+    for name, seconds in spans:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return totals
+
+
+def server_timing_header(spans: List[Tuple[str, float]]) -> str:
+    """Aggregate spans by name into a ``Server-Timing`` header value (durations in ms)."""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in stage_totals(spans).items())
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware that collects spans per HTTP request and adds a
+    ``Server-Timing`` header. For streamed responses the header only covers
+    the stages finished before the first byte.
+
+    ``on_response(method, path, status, seconds, stages)`` is awaited once the
+    response has been sent, with every stage of the request (``stage_totals``).
+    """
+
+    def __init__(
+            self,
+            app,
+            on_response: Optional[Callable[[str, str, int, float, Dict[str, float]], Awaitable[None]]] = None,
+    ):
+        self.app = app
+        self.on_response = on_response
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        spans = start_request()
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing_header([*spans, ("total", time.perf_counter() - started)])
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            request_duration.observe(elapsed, path=scope.get("path", ""))
+            if self.on_response is not None:
+                await self.on_response(
+                    scope.get("method", ""), scope.get("path", ""), status, elapsed, stage_totals(spans)
+                )
@@ -0,0 +1,183 @@
+import math
+import threading
+from typing import Callable, Dict, Iterable, Tuple
+
+_DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels: dict) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> Iterable[Tuple[tuple, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+
+class Histogram:
+    """Cumulative bucket histogram (seconds by default) with optional labels."""
+
+    def __init__(self, name: str, description: str, buckets: Iterable[float] = _DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[tuple, list] = {}
+        self._sums: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._sums[key] += value
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(_label_key(labels), ()))
+
+    def sum(self, **labels) -> float:
+        return self._sums.get(_label_key(labels), 0.0)
+
+    def samples(self) -> Iterable[Tuple[tuple, list, float]]:
+        with self._lock:
+            return [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+
+
+class Gauge:
+    """
+    Point-in-time value, either set explicitly or read from a callback at scrape time.
+
+    A callback returns a float, or a dict mapping label tuples such as
+    ``(("pool", "search"),)`` to values.
+    """
+
+    def __init__(self, name: str, description: str, callback: Callable[[], float | Dict[tuple, float]] | None = None):
+        self.name = name
+        self.description = description
+        self.callback = callback
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return dict(self.samples()).get(_label_key(labels), 0.0)
+
+    def samples(self) -> Iterable[Tuple[tuple, float]]:
+        if self.callback is not None:
+            try:
+                value = self.callback()
+            except Exception:
+                return []
+            if isinstance(value, dict):
+                return [(_label_key(dict(k)), v) for k, v in value.items()]
+            return [((), value)]
+        with self._lock:
+            return list(self._values.items())
+
+
+class MetricsRegistry:
+    """Process-local registry so every module shares the same metric objects."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Counter | Histogram | Gauge] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter(name, description)
+            return self._metrics[name]
+
+    def histogram(self, name: str, description: str = "", buckets: Iterable[float] = _DEFAULT_BUCKETS) -> Histogram:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, description, buckets)
+            return self._metrics[name]
+
+    def gauge(self, name: str, description: str = "", callback: Callable | None = None) -> Gauge:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Gauge(name, description, callback)
+            return self._metrics[name]
+
+    def all(self) -> list:
+        with self._lock:
+            return list(self._metrics.values())
+
+
+metrics = MetricsRegistry()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    labels = key + extra
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def render_prometheus(registry: MetricsRegistry = metrics) -> str:
+    """Render every metric in the Prometheus text exposition format (0.0.4)."""
+    lines = []
+    for metric in registry.all():
+        kind = {Counter: "counter", Histogram: "histogram", Gauge: "gauge"}[type(metric)]
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {kind}")
+        if isinstance(metric, Histogram):
+            for key, counts, total in metric.samples():
+                cumulative = 0
+                for bound, count in zip((*metric.buckets, math.inf), counts):
+                    cumulative += count
+                    le = (("le", "+Inf" if math.isinf(bound) else repr(float(bound))),)
+                    lines.append(f"{metric.name}_bucket{_format_labels(key, le)} {cumulative}")
+                lines.append(f"{metric.name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{metric.name}_count{_format_labels(key)} {cumulative}")
+        else:
+            for key, value in metric.samples():
+                lines.append(f"{metric.name}{_format_labels(key)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,72 @@
+"""
+Embedding vectors as contiguous float32 NumPy batches.
+
+Every stage between the embedding service and the database (caches, guards,
+query deduplication, result fusion, SQL binding) works on ``(n, dim)``
+float32 arrays instead of lists of Python floats, so a batch is one
+allocation and the similarity math is a matrix product.
+"""
+
+import struct
+from typing import Any
+
+import numpy as np
+
+EMPTY_BATCH = np.empty((0, 0), dtype=np.float32)
+EMPTY_VECTOR = np.empty(0, dtype=np.float32)
+
+
+def as_batch(vectors: Any) -> np.ndarray:
+    """A C-contiguous ``(n, dim)`` float32 array from a batch, a single vector or nested lists."""
+    if vectors is None or len(vectors) == 0:
+        return EMPTY_BATCH
+    batch = np.asarray(vectors, dtype=np.float32)
+    if batch.ndim == 1:
+        batch = batch.reshape(1, -1)
+    return np.ascontiguousarray(batch)
+
+
+def normalize(vectors: np.ndarray, copy: bool = True) -> np.ndarray:
+    """Scale vectors (a single one or the rows of a batch) to unit length; zero vectors stay zero."""
+    vectors = np.array(vectors, dtype=np.float32) if copy else np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    vectors /= np.where(norms == 0, 1, norms)
+    return vectors
+
+
+def cosine_similarity(batch: np.ndarray, vector: np.ndarray) -> np.ndarray:
+    """Cosine similarity of every row of ``batch`` with ``vector``."""
+    return normalize(batch) @ normalize(vector)
+
+
+def dedupe_rows(batch: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Indices of the rows to keep so that no two kept rows have cosine similarity >= ``threshold``.
+
+    Greedy in row order (earlier rows win), over one similarity matrix.
+    """
+    if len(batch) < 2:
+        return np.arange(len(batch))
+    unit = normalize(batch)
+    similar = np.triu(unit @ unit.T >= threshold, k=1)
+    keep = np.ones(len(batch), dtype=bool)
+    for i in range(len(batch)):
+        if keep[i]:
+            keep[similar[i]] = False
+    return np.flatnonzero(keep)
+
+
+def encode_pgvector(vector: Any) -> bytes:
+    """pgvector binary format: dimension and a reserved field (int16 each), then big-endian float32 values."""
+    values = np.asarray(vector, dtype=">f4").ravel()
+    return struct.pack(">HH", values.size, 0) + values.tobytes()
+
+
+def decode_pgvector(data: bytes) -> np.ndarray:
+    dim, _ = struct.unpack_from(">HH", data)
+    return np.frombuffer(data, dtype=">f4", count=dim, offset=4).astype(np.float32)
+
+
+def to_pgvector_text(vector: Any) -> str:
+    """pgvector text literal, for connections without the binary codec."""
+    return "[" + ",".join(map(str, np.asarray(vector, dtype=np.float32).ravel().tolist())) + "]"
@@ -1,46 +1,175 @@
 import asyncpg
 import asyncio
-from typing import Any, List
+import contextvars
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Sequence, Tuple
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from app.core.config import settings
+from app.core.deadline import record_degradation, stop_on_deadline, timeout_for
+from app.core.instrumentation import record_span, span
+from app.core.metrics import metrics
+from app.core.vectors import as_batch, decode_pgvector, encode_pgvector, to_pgvector_text
+from app.db.sharding import ShardRouter
+from app.schema.retrieved_paper import RetrievedPaper
 from langsmith import traceable
  
  
 _TRANSIENT_ERRORS = (asyncpg.PostgresError, asyncio.TimeoutError) # Added asyncio.TimeoutError for robustness
  
 def with_retry() -> Any:
-    """Exponential-back-off (0.2 s → 5 s, 5 tries) for transient errors."""
+    """
+    Exponential-back-off (0.2 s → 5 s, 5 tries) for transient errors.
+
+    Retries also stop early when the next back-off would overrun the request deadline.
+    """
     return retry(
         retry=retry_if_exception_type(_TRANSIENT_ERRORS),
         wait=wait_exponential(multiplier=0.2, min=0.2, max=5),
-        stop=stop_after_attempt(5),
+        stop=stop_after_attempt(5) | stop_on_deadline,
         reraise=True,
     )
  
+class VectorConnection(asyncpg.Connection):
+    """A pooled connection that knows whether the binary pgvector codec is registered on it."""
+    binary_vectors = False
+
+
+async def _init_connection(con: VectorConnection) -> None:
+    """Bind pgvector values in binary straight from float32 arrays, when the extension is installed."""
+    try:
+        await con.set_type_codec(
+            "vector", schema=settings.db_default_schema,
+            encoder=encode_pgvector, decoder=decode_pgvector, format="binary",
+        )
+        con.binary_vectors = True
+    except ValueError:
+        # No vector type in this database (or schema): vectors are sent as text literals.
+        con.binary_vectors = False
+
+
+def vector_param(con: VectorConnection, vector: Any) -> Any:
+    """
+    A query parameter for a pgvector column on ``con``: the array itself when
+    the binary codec is registered on that connection, else its text form.
+    """
+    return vector if con.binary_vectors else to_pgvector_text(vector)
+
+
+async def create_pool(min_size: int, max_size: int, dsn: str | None = None) -> asyncpg.Pool:
+    """An asyncpg pool to the configured database, or to ``dsn`` (e.g. a read replica)."""
+    if dsn:
+        return await asyncpg.create_pool(
+            dsn=dsn,
+            ssl=settings.db_ssl,
+            timeout=30,
+            min_size=min_size,
+            max_size=max_size,
+            init=_init_connection,
+            connection_class=VectorConnection,
+        )
+    return await asyncpg.create_pool(
+        host=settings.db_host,
+        port=settings.db_port,
+        database=settings.db_database,
+        user=settings.db_user,
+        password=settings.db_password,
+        ssl=settings.db_ssl,
+        timeout=30,
+        min_size=min_size,
+        max_size=max_size,
+        init=_init_connection,
+        connection_class=VectorConnection,
+    )
+
+
+pool_wait_seconds = metrics.histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection, by pool",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+shard_searches = metrics.counter("vector_search_shard_queries_total", "Per-shard vector searches by shard and outcome")
+
+
+class NamedPool:
+    """An asyncpg pool with a name and a count of callers holding or waiting for its connections."""
+
+    def __init__(self, name: str, pool: asyncpg.Pool, target: str = "primary"):
+        self.name = name
+        self.pool = pool
+        self.target = target
+        self.in_use = 0
+
+    def load(self) -> float:
+        return self.in_use / self.pool.get_max_size()
+
+    async def warm(self) -> None:
+        """Open and check ``min_size`` connections now rather than on the first requests."""
+        async def ping():
+            async with self.pool.acquire(timeout=30) as con:
+                await con.execute("SELECT 1;")
+
+        await asyncio.gather(*(ping() for _ in range(self.pool.get_min_size())))
+
+
 # Connection pool for asyncpg
 class Database:
+    """
+    Named asyncpg pools, sized independently from ``Settings``:
+
+    * ``search``: vector search and other read-heavy queries. With
+      ``db_read_replica_dsns`` set there is one pool per replica and each
+      acquire goes to the least busy one; otherwise it points at the primary.
+    * ``write``: inserts and updates (the default for the generic helpers).
+    * ``admin``: health pings and catalog/statistics queries.
+    * ``shard``: with ``db_shard_dsns`` set, one pool per shard database, each
+      holding its part of ``arxiv``. Vector search then scatters to every
+      shard and merges the results (see ``fetch_batch_vector_search``).
+
+    All pools open their ``min`` connections at startup.
+    """
     _pool: asyncpg.Pool | None = None
+    _pools: Dict[str, List[NamedPool]] = {}
+    _shard_router: ShardRouter | None = None
     _init_lock: asyncio.Lock = asyncio.Lock()
     DEFAULT_SCHEMA: str = "public"
  
     @classmethod
     async def init(cls) -> None:
-        """Create the global asyncpg pool."""
+        """Create and warm the search, write and admin pools."""
         if cls._pool is None:
             try:
-                print("Initializing database connection pool...")
-                cls._pool = await asyncpg.create_pool(
-                    host=settings.db_host,
-                    port=settings.db_port,
-                    database=settings.db_database,
-                    user=settings.db_user,
-                    password=settings.db_password,
-                    ssl="require",
-                    timeout=30,
-                    min_size=1,
-                    max_size=10
-                )
-                print("Database pool initialized successfully")
+                print("Initializing database connection pools...")
+                pools = {
+                    "write": [NamedPool("write", await create_pool(
+                        settings.db_write_pool_min_size, settings.db_write_pool_max_size))],
+                    "admin": [NamedPool("admin", await create_pool(
+                        settings.db_admin_pool_min_size, settings.db_admin_pool_max_size))],
+                    "search": [],
+                }
+                for i, dsn in enumerate(settings.db_read_replica_dsns):
+                    try:
+                        pool = await create_pool(
+                            settings.db_search_pool_min_size, settings.db_search_pool_max_size, dsn=dsn)
+                        pools["search"].append(NamedPool("search", pool, target=f"replica-{i}"))
+                    except Exception as e:
+                        print(f"Error connecting to read replica {i}, leaving it out: {e}")
+                if not pools["search"]:
+                    pools["search"].append(NamedPool("search", await create_pool(
+                        settings.db_search_pool_min_size, settings.db_search_pool_max_size)))
+                # Shards are addressed by index, so unlike replicas none can be left out.
+                pools["shard"] = [
+                    NamedPool("shard", await create_pool(
+                        settings.db_shard_pool_min_size, settings.db_shard_pool_max_size, dsn=dsn), target=f"shard-{i}")
+                    for i, dsn in enumerate(settings.db_shard_dsns)
+                ]
+                await asyncio.gather(*(named.warm() for group in pools.values() for named in group))
+                cls._pools = pools
+                cls._pool = pools["write"][0].pool
+                cls._shard_router = ShardRouter.from_settings() if pools["shard"] else None
+                print(f"Database pools initialized successfully ({len(pools['search'])} search target(s))")
             except Exception as e:
                 print(f"Error initializing database pool: {str(e)}")
                 raise
@@ -50,37 +179,100 @@ class Database:
         async with cls._init_lock:
             if cls._pool and not cls._pool._closed:
                 try:
-                    await cls._pool.close()
+                    await asyncio.gather(*(
+                        named.pool.close() for group in cls._pools.values() for named in group
+                    ))
                     cls._pool = None
+                    cls._pools = {}
                 except Exception:
                     raise
             else:
                 print("DB pool already closed or not initialized.")
+
+    @classmethod
+    def _choose(cls, pool: str) -> NamedPool:
+        """The named pool's least busy target (in-flight acquires relative to its size)."""
+        return min(cls._pools[pool], key=NamedPool.load)
+
+    @classmethod
+    @asynccontextmanager
+    async def _acquire(
+            cls, timeout: float | None = None, pool: str = "write", shard: int | None = None
+    ) -> AsyncIterator[asyncpg.Connection]:
+        """Acquire a connection from a named pool (or a given shard), recording how long the caller waited for it."""
+        if shard is not None:
+            pool, named = "shard", cls._pools["shard"][shard]
+        else:
+            named = cls._choose(pool)
+        named.in_use += 1
+        try:
+            started = time.perf_counter()
+            async with named.pool.acquire(timeout=timeout) as con:
+                waited = time.perf_counter() - started
+                record_span("db_pool_wait", waited)
+                pool_wait_seconds.observe(waited, pool=pool)
+                yield con
+        finally:
+            named.in_use -= 1
+
+    @classmethod
+    def pool_stats(cls) -> dict:
+        """Size, idle connections, in-flight acquires and configured maximum of every pool."""
+        if cls._pool is None or cls._pool._closed:
+            return {}
+        stats = {}
+        for name, group in cls._pools.items():
+            for named in group:
+                labels = (("pool", name), ("target", named.target))
+                stats[labels + (("state", "size"),)] = named.pool.get_size()
+                stats[labels + (("state", "idle"),)] = named.pool.get_idle_size()
+                stats[labels + (("state", "in_use"),)] = named.in_use
+                stats[labels + (("state", "max"),)] = named.pool.get_max_size()
+        return stats
                
     # ── generic helpers ─────────────────────────────────────────────────── #
     @classmethod
     @with_retry()
-    async def fetch(cls, query:str, *args) -> list[asyncpg.Record]:
+    async def fetch(cls, query:str, *args, pool: str = "write") -> list[asyncpg.Record]:
         if cls._pool is None or cls._pool._closed:
             raise RuntimeError("Database pool is not initialized or is closed.")
-        async with cls._pool.acquire() as con:
+        async with cls._acquire(pool=pool) as con:
             return await con.fetch(query, *args)
  
     @classmethod
     @with_retry()
-    async def fetchrow(cls, query:str, *args) -> asyncpg.Record|None:
+    async def fetchrow(cls, query:str, *args, pool: str = "write") -> asyncpg.Record|None:
         if cls._pool is None or cls._pool._closed:
             raise RuntimeError("Database pool is not initialized or is closed.")
-        async with cls._pool.acquire() as con:
+        async with cls._acquire(pool=pool) as con:
             return await con.fetchrow(query, *args)
  
     @classmethod
     @with_retry()
-    async def execute(cls, query:str, *args) -> str:
+    async def execute(cls, query:str, *args, pool: str = "write") -> str:
         if cls._pool is None or cls._pool._closed:
             raise RuntimeError("Database pool is not initialized or is closed.")
-        async with cls._pool.acquire() as con:
+        async with cls._acquire(pool=pool) as con:
             return await con.execute(query, *args)
+
+    @classmethod
+    @with_retry()
+    async def copy_rows(cls, table: str, columns: Sequence[str], rows: List[Sequence[Any]]) -> None:
+        """
+        Write ``rows`` with one ``COPY`` on the write pool; raises if they were not written.
+
+        Unlike ``bulk_writer``, nothing is buffered or dropped: use it when the
+        caller must know the rows are stored.
+        """
+        if cls._pool is None or cls._pool._closed:
+            raise RuntimeError("Database pool is not initialized or is closed.")
+        if not rows:
+            return
+        async with cls._acquire(pool="write") as con:
+            await con.copy_records_to_table(
+                table, records=[tuple(row) for row in rows], columns=list(columns),
+                schema_name=settings.db_default_schema,
+            )
    
     @classmethod
     @with_retry()
@@ -102,7 +294,7 @@ class Database:
         if cls._pool is None or cls._pool._closed:
             return False
         try:
-            async with cls._pool.acquire(timeout=5) as con:
+            async with cls._acquire(timeout=5, pool="admin") as con:
                 result = await con.fetch("SELECT 1;")
                 if result:
                     return True
@@ -111,85 +303,450 @@ class Database:
         return False
  
    
+    @classmethod
+    async def fetch_arxiv_index_version(cls) -> tuple:
+        """
+        A value that changes whenever rows of the arxiv table are written.
+
+        Uses the cumulative statistics counters, so it costs no table scan. On a
+        sharded layout the rows live in the shard databases, so the counters of
+        every shard are combined (in shard order). Unlike searches, a shard that
+        fails raises instead of being left out: a partial version would look
+        like an index change.
+        """
+        sql = """
+            SELECT n_tup_ins, n_tup_upd, n_tup_del
+            FROM pg_stat_user_tables
+            WHERE relname = 'arxiv';
+        """
+        if not cls._pools.get("shard"):
+            row = await cls.fetchrow(sql, pool="admin")
+            return tuple(row) if row else ()
+
+        async def shard_counters(shard: int) -> tuple:
+            async with cls._acquire(shard=shard) as con:
+                row = await asyncio.wait_for(con.fetchrow(sql), timeout=settings.db_shard_timeout_seconds)
+            return tuple(row) if row else (None, None, None)
+
+        per_shard = await asyncio.gather(*(shard_counters(i) for i in range(len(cls._pools["shard"]))))
+        return tuple(value for counters in per_shard for value in counters)
+
     @classmethod
     @with_retry()
-    async def fetch_batch_vector_search(cls, query_vectors: List[List[float]], limit: int = 5) -> list:
-        """Perform a batch vector search for arxiv data based on a list of query vectors."""
-        try:
-            if cls._pool is None or cls._pool._closed:
-                raise RuntimeError("Database pool is not initialized or is closed.")
-            
-            if not query_vectors:
-                return []
+    @span("vector_search")
+    async def fetch_batch_vector_search(
+            cls,
+            query_vectors: Any,
+            limit: int = 5,
+            ef_search: int | None = None,
+            missing_shards: List[str] | None = None,
+    ) -> List[RetrievedPaper]:
+        """
+        Perform a batch vector search for arxiv data based on a list of query vectors.
 
-            # Convert all vectors to the appropriate string format for SQL compatibility
-            query_vectors_str = [
-                f"[{','.join(map(str, vector))}]" for vector in query_vectors
-            ]
+        On a sharded layout each vector is searched on every shard in parallel
+        and the per-shard top ``limit`` rows are merged by distance. A shard
+        that errors or misses ``db_shard_timeout_seconds`` is left out: the
+        result is partial, the shard is appended to ``missing_shards`` and a
+        ``partial_search_results`` degradation is recorded.
+
+        Args:
+            query_vectors (np.ndarray): ``(n, dim)`` float32 batch, one embedding per search
+                (nested lists are converted).
+            limit (int): Rows returned per vector.
+            ef_search (int | None): Lower HNSW search effort for this call (faster,
+                less exact); ``None`` keeps the server default.
+            missing_shards (list[str] | None): Collects the shards left out of the result.
+
+        Returns:
+            list[RetrievedPaper]: The top ``limit`` papers of every vector, concatenated, with
+                ``score`` = cosine similarity to the vector that found them.
+
+        Raises:
+            Exception: The search failed (pool closed, timeout, query error) after retries;
+                only a missing shard degrades to a partial result.
+        """
+        if cls._pool is None or cls._pool._closed:
+            raise RuntimeError("Database pool is not initialized or is closed.")
+
+        query_vectors = as_batch(query_vectors)
+        if len(query_vectors) == 0:
+            return []
 
-            # Generate a list of tasks for each vector in the batch
-            # Each task will acquire its own connection from the pool
+        # Generate a list of tasks for each vector in the batch
+        # Each task will acquire its own connection from the pool
+        if cls._pools.get("shard"):
+            missing = set()
             tasks = [
-                cls._fetch_vector_for_single_query_with_connection(vector_str, limit)
-                for vector_str in query_vectors_str
+                cls._scatter_vector_search(vector, limit, ef_search, missing)
+                for vector in query_vectors
             ]
-            # Gather the results for all the queries
-            results = await asyncio.gather(*tasks)
+        else:
+            tasks = [
+                cls._fetch_vector_for_single_query_with_connection(vector, limit, ef_search)
+                for vector in query_vectors
+            ]
+        # Gather the results for all the queries
+        results = await asyncio.gather(*tasks)
+        if cls._pools.get("shard") and missing:
+            record_degradation("partial_search_results")
+            if missing_shards is not None:
+                missing_shards.extend(sorted(missing))
 
-            # Flatten the results into a single list
-            return [item for sublist in results for item in sublist]
-        
-        except Exception as e:
-            print(f"Error in fetch_batch_vector_search: {str(e)}")
-            return []
+        # Flatten the results into a single list
+        return [item for sublist in results for item in sublist]
+
+    @classmethod
+    async def _gather_shards(cls, search: Callable[[int], Awaitable[Any]], empty: Any, missing: set) -> list:
+        """
+        Run ``search(shard)`` on every shard concurrently, each within ``db_shard_timeout_seconds``.
+
+        A shard that errors or times out contributes ``empty`` and is added to ``missing``.
+        """
+        async def search_shard(shard: int) -> Any:
+            target = cls._pools["shard"][shard].target
+            try:
+                result = await asyncio.wait_for(search(shard), timeout=timeout_for(settings.db_shard_timeout_seconds))
+                shard_searches.inc(shard=target, outcome="ok")
+                return result
+            except asyncio.TimeoutError:
+                shard_searches.inc(shard=target, outcome="timeout")
+            except Exception as e:
+                print(f"Error searching {target}: {e}")
+                shard_searches.inc(shard=target, outcome="error")
+            missing.add(target)
+            return empty
+
+        return await asyncio.gather(*(search_shard(i) for i in range(len(cls._pools["shard"]))))
+
+    @staticmethod
+    def _merge_top(per_shard: List[List[RetrievedPaper]], limit: int) -> List[RetrievedPaper]:
+        # Each shard's rows are already ordered by distance, so a k-way heap merge is enough.
+        return list(itertools.islice(heapq.merge(*per_shard, key=lambda paper: -paper.score), limit))
+
+    @classmethod
+    async def _scatter_vector_search(
+            cls, vector: Any, limit: int, ef_search: int | None, missing: set
+    ) -> List[RetrievedPaper]:
+        """Search one vector on every shard and merge the per-shard top-k into the global top-k."""
+        per_shard = await cls._gather_shards(
+            lambda shard: cls._fetch_vector_for_single_query_with_connection(vector, limit, ef_search, shard=shard),
+            [],
+            missing,
+        )
+        return cls._merge_top(per_shard, limit)
+
+    @staticmethod
+    async def _fetch_search(con: asyncpg.Connection, sql: str, *args, ef_search: int | None = None) -> list:
+        """Run a vector search statement, with a lower HNSW ``ef_search`` for this statement only if given."""
+        if ef_search is None:
+            return await con.fetch(sql, *args, timeout=timeout_for(30))
+        # SET LOCAL only lasts for this transaction, so the pooled connection is unaffected.
+        async with con.transaction():
+            await con.execute(f"SET LOCAL hnsw.ef_search = {int(ef_search)}")
+            return await con.fetch(sql, *args, timeout=timeout_for(30))
 
     @classmethod
-    async def _fetch_vector_for_single_query_with_connection(cls, vector_str: str, limit: int) -> list:
+    async def _fetch_vector_for_single_query_with_connection(
+            cls, vector: Any, limit: int, ef_search: int | None = None, shard: int | None = None
+    ) -> List[RetrievedPaper]:
         """Helper function to fetch results for a single vector query with its own connection."""
         if cls._pool is None or cls._pool._closed:
             raise RuntimeError("Database pool is not initialized or is closed.")
             
-        async with cls._pool.acquire() as con:
+        async with cls._acquire(timeout=timeout_for(30), pool="search", shard=shard) as con:
             sql = """
-                SELECT title, abstract, category
+                SELECT id, title, abstract, category, embedding <=> $1 AS distance
                 FROM arxiv
                 WHERE embedding IS NOT NULL
                 ORDER BY embedding <=> $1
                 LIMIT $2;
             """
-            # Fetching results for a single query vector
-            results = await con.fetch(sql, vector_str, limit)
-
-            # Return the results in a structured format
-            return [
-                {
-                    "title": row["title"],
-                    "abstract": row["abstract"],
-                    "category": row["category"]
-                }
-                for row in results
-            ]
+            # The float32 row is bound as-is where the binary pgvector codec is registered.
+            results = await cls._fetch_search(con, sql, vector_param(con, vector), limit, ef_search=ef_search)
+            return [RetrievedPaper.from_record(row) for row in results]
 
     @classmethod
-    async def _fetch_vector_for_single_query(cls, con, vector_str: str, limit: int) -> list:
-        """Helper function to fetch results for a single vector query."""
-        sql = """
-            SELECT title, abstract, category
-            FROM arxiv
-            WHERE embedding IS NOT NULL
-            ORDER BY embedding <=> $1
-            LIMIT $2;
-        """
-        # Fetching results for a single query vector
-        results = await con.fetch(sql, vector_str, limit)
-
-        # Return the results in a structured format
-        return [
-            {
-                "title": row["title"],
-                "abstract": row["abstract"],
-                "category": row["category"]
-            }
-            for row in results
-        ]
- 
\ No newline at end of file
+    @with_retry()
+    @span("grouped_vector_search")
+    async def fetch_grouped_vector_search(
+            cls,
+            query_vectors: Any,
+            limit: int = 5,
+            ef_search: int | None = None,
+            missing_shards: List[str] | None = None,
+    ) -> List[List[RetrievedPaper]]:
+        """
+        Vector search for many query vectors in a few statements, with the results kept per vector.
+
+        Vectors are sent in groups of ``db_grouped_search_size``. Each group is one
+        statement that unnests the vectors and runs the top-``limit`` search of
+        each in a LATERAL subquery (still an HNSW index scan per vector), so a
+        group costs one round trip and one connection instead of one per vector.
+        Groups run concurrently on the search pool. On a sharded layout every
+        group is sent to every shard and the per-vector results are merged, with
+        missing shards handled as in ``fetch_batch_vector_search``.
+
+        Args:
+            query_vectors (np.ndarray): ``(n, dim)`` float32 batch (nested lists are converted).
+            limit (int): Rows returned per vector.
+            ef_search (int | None): Lower HNSW search effort for these statements.
+            missing_shards (list[str] | None): Collects the shards left out of the result.
+
+        Returns:
+            list[list[RetrievedPaper]]: The top ``limit`` papers of each vector, in input order.
+
+        Raises:
+            Exception: The search failed (pool closed, timeout, query error) after retries;
+                only a missing shard degrades to a partial result.
+        """
+        query_vectors = as_batch(query_vectors)
+        if cls._pool is None or cls._pool._closed:
+            raise RuntimeError("Database pool is not initialized or is closed.")
+        size = max(1, settings.db_grouped_search_size)
+        groups = [query_vectors[start:start + size] for start in range(0, len(query_vectors), size)]
+        if cls._pools.get("shard"):
+            missing = set()
+
+            async def scatter(group: list) -> List[List[RetrievedPaper]]:
+                per_shard = await cls._gather_shards(
+                    lambda shard: cls._grouped_search_with_connection(group, limit, ef_search, shard=shard),
+                    [[] for _ in group],
+                    missing,
+                )
+                return [cls._merge_top([papers[i] for papers in per_shard], limit) for i in range(len(group))]
+
+            results = await asyncio.gather(*(scatter(group) for group in groups))
+            if missing:
+                record_degradation("partial_search_results")
+                if missing_shards is not None:
+                    missing_shards.extend(sorted(missing))
+        else:
+            results = await asyncio.gather(*(
+                cls._grouped_search_with_connection(group, limit, ef_search) for group in groups
+            ))
+        return [papers for group in results for papers in group]
+
+    @classmethod
+    async def _grouped_search_with_connection(
+            cls, vectors: Any, limit: int, ef_search: int | None = None, shard: int | None = None
+    ) -> List[List[RetrievedPaper]]:
+        """One statement searching every vector of a group; the papers of each vector, in order."""
+        async with cls._acquire(timeout=timeout_for(30), pool="search", shard=shard) as con:
+            rows = await cls._fetch_search(
+                con, cls._grouped_search_sql(con.binary_vectors),
+                [vector_param(con, vector) for vector in vectors], limit, ef_search=ef_search,
+            )
+        papers = [[] for _ in vectors]
+        for row in rows:
+            papers[row["idx"] - 1].append(RetrievedPaper.from_record(row))
+        return papers
+
+    @staticmethod
+    def _grouped_search_sql(binary_vectors: bool) -> str:
+        # With the binary codec the array elements are pgvector values already; otherwise text literals.
+        return f"""
+            SELECT q.idx, a.id, a.title, a.abstract, a.category, a.distance
+            FROM unnest($1::{'vector' if binary_vectors else 'text'}[]) WITH ORDINALITY AS q(embedding, idx)
+            CROSS JOIN LATERAL (
+                SELECT id, title, abstract, category, arxiv.embedding <=> q.embedding::vector AS distance
+                FROM arxiv
+                WHERE arxiv.embedding IS NOT NULL
+                ORDER BY arxiv.embedding <=> q.embedding::vector
+                LIMIT $2
+            ) a
+            ORDER BY q.idx, a.distance;
+        """
+
+    @classmethod
+    async def insert_arxiv_rows(cls, rows: List[dict], batch_size: int = 1000) -> List[int]:
+        """
+        Insert arxiv rows, routing each to its shard (or the primary when unsharded).
+
+        Rows are dicts with the same keys (``id``, ``title``, ``abstract``,
+        ``category``, ``embedding`` as a float32 array or list of floats, plus the date field for
+        date sharding).
+
+        Returns:
+            list[int]: Rows written per shard (a single count when unsharded).
+        """
+        if not rows:
+            return []
+        columns = list(rows[0])
+        placeholders = ", ".join(
+            f"${i}::vector" if column == "embedding" else f"${i}" for i, column in enumerate(columns, start=1)
+        )
+        sql = f"INSERT INTO arxiv ({', '.join(columns)}) VALUES ({placeholders});"
+
+        def values(con: VectorConnection, row: dict) -> tuple:
+            return tuple(
+                vector_param(con, as_batch(row[column])[0]) if column == "embedding" else row[column]
+                for column in columns
+            )
+
+        @with_retry()
+        async def insert(batch: List[dict], shard: int | None) -> None:
+            async with cls._acquire(pool="write", shard=shard) as con:
+                await con.executemany(sql, [values(con, row) for row in batch])
+
+        groups = cls._shard_router.partition(rows) if cls._shard_router else [rows]
+        for shard, group in enumerate(groups):
+            for start in range(0, len(group), batch_size):
+                await insert(group[start:start + batch_size], shard if cls._shard_router else None)
+        return [len(group) for group in groups]
+
+
+metrics.gauge("db_pool_connections", "asyncpg pool connections by pool, target and state", callback=Database.pool_stats)
+
+
+bulk_rows = metrics.counter("db_bulk_writer_rows_total", "Rows handled by the bulk writer, by table and outcome")
+bulk_flush_seconds = metrics.histogram("db_bulk_writer_flush_seconds", "Duration of one bulk COPY, by table")
+
+
+class BulkWriter:
+    """
+    Buffers inserts in memory and writes them with ``COPY`` in batches.
+
+    Rows are grouped by table and column list and flushed when a group
+    reaches ``batch_size`` rows or every ``flush_interval`` seconds. Writes go
+    through a dedicated pool of ``connections`` connections, so bulk inserts
+    never take connections from vector search.
+
+    When ``max_buffered`` rows are waiting, ``write`` blocks (backpressure) for
+    up to ``put_timeout`` seconds and then drops the row, counting it, rather
+    than stalling the caller indefinitely.
+
+    Attributes:
+        batch_size (int): Rows per COPY.
+        flush_interval (float): Seconds between timed flushes.
+        max_buffered (int): Buffered rows before writers are held back.
+        connections (int): Size of the dedicated pool.
+        put_timeout (float): How long ``write`` waits for buffer space.
+    """
+
+    def __init__(
+            self,
+            batch_size: int = 500,
+            flush_interval: float = 1.0,
+            max_buffered: int = 10000,
+            connections: int = 2,
+            put_timeout: float = 1.0,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.connections = connections
+        self.put_timeout = put_timeout
+        self._buffers: Dict[Tuple[str, Tuple[str, ...]], List[tuple]] = {}
+        self._buffered = 0
+        self._space = asyncio.Event()
+        self._space.set()
+        self._flush_now = asyncio.Event()
+        self._pool: asyncpg.Pool | None = None
+        self._flusher: asyncio.Task | None = None
+        self._closing = False
+        self._start_lock = asyncio.Lock()
+
+    def buffered(self) -> int:
+        return self._buffered
+
+    async def start(self) -> None:
+        """Open the dedicated pool and start the periodic flusher."""
+        async with self._start_lock:
+            if self._flusher is not None:
+                return
+            self._pool = await create_pool(min_size=1, max_size=self.connections)
+            self._closing = False
+            # A fresh context, so a first write from a request does not tie flush retries to its deadline.
+            self._flusher = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def write(self, table: str, columns: Sequence[str], row: Sequence[Any]) -> bool:
+        """
+        Buffer one row; starts the writer on first use.
+
+        Returns:
+            bool: False if the row was dropped because the buffer stayed full.
+        """
+        if self._flusher is None:
+            await self.start()
+        if self._buffered >= self.max_buffered:
+            self._flush_now.set()
+            try:
+                await asyncio.wait_for(self._space.wait(), timeout=self.put_timeout)
+            except asyncio.TimeoutError:
+                bulk_rows.inc(table=table, outcome="dropped")
+                return False
+        key = (table, tuple(columns))
+        buffer = self._buffers.setdefault(key, [])
+        buffer.append(tuple(row))
+        self._buffered += 1
+        if self._buffered >= self.max_buffered:
+            self._space.clear()
+        if len(buffer) >= self.batch_size:
+            self._flush_now.set()
+        return True
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write everything buffered so far, one COPY per table and column list."""
+        buffers, self._buffers = self._buffers, {}
+        if not buffers:
+            return
+        await asyncio.gather(*(
+            self._copy(table, columns, rows) for (table, columns), rows in buffers.items()
+        ))
+
+    async def _copy(self, table: str, columns: Tuple[str, ...], rows: List[tuple]) -> None:
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            started = time.perf_counter()
+            try:
+                await self._copy_batch(table, columns, batch)
+                bulk_rows.inc(len(batch), table=table, outcome="written")
+                bulk_flush_seconds.observe(time.perf_counter() - started, table=table)
+            except Exception as e:
+                print(f"❌ Error bulk writing {len(batch)} rows to {table}: {e}")
+                bulk_rows.inc(len(batch), table=table, outcome="failed")
+            finally:
+                self._buffered -= len(batch)
+                if self._buffered < self.max_buffered:
+                    self._space.set()
+
+    @with_retry()
+    async def _copy_batch(self, table: str, columns: Tuple[str, ...], rows: List[tuple]) -> None:
+        async with self._pool.acquire() as con:
+            await con.copy_records_to_table(
+                table, records=rows, columns=list(columns), schema_name=settings.db_default_schema
+            )
+
+    async def close(self) -> None:
+        """Stop the flusher, write what is left and close the pool."""
+        if self._flusher is not None:
+            # Let an in-flight flush finish rather than cancelling it mid-COPY.
+            self._closing = True
+            self._flush_now.set()
+            await self._flusher
+            self._flusher = None
+        await self.flush()
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+
+bulk_writer = BulkWriter(
+    batch_size=settings.db_bulk_writer_batch_size,
+    flush_interval=settings.db_bulk_writer_flush_interval_seconds,
+    max_buffered=settings.db_bulk_writer_max_buffered_rows,
+    connections=settings.db_bulk_writer_connections,
+    put_timeout=settings.db_bulk_writer_put_timeout_seconds,
+)
+
+metrics.gauge("db_bulk_writer_buffered_rows", "Rows waiting in the bulk writer", callback=bulk_writer.buffered)
@@ -0,0 +1,64 @@
+import bisect
+import zlib
+from typing import Any, List, Sequence
+
+from app.core.config import settings
+
+
+class ShardRouter:
+    """
+    Maps an arxiv row to the shard that stores it.
+
+    ``hash`` spreads rows evenly by a stable hash (CRC32) of their id; ``date``
+    splits them by ``date_field`` at the given boundaries (ISO dates, one
+    fewer than shards; a row on a boundary goes to the later shard).
+
+    Attributes:
+        shard_count (int): Number of shards.
+        strategy (str): ``hash`` or ``date``.
+        date_boundaries (list[str]): Sorted ISO dates separating the date shards.
+        date_field (str): Row key holding the date for the ``date`` strategy.
+    """
+
+    def __init__(
+            self,
+            shard_count: int,
+            strategy: str = "hash",
+            date_boundaries: Sequence[str] = (),
+            date_field: str = "published",
+    ):
+        if strategy not in ("hash", "date"):
+            raise ValueError(f"Unknown shard strategy: {strategy}")
+        if strategy == "date" and len(date_boundaries) != shard_count - 1:
+            raise ValueError(
+                f"Date sharding over {shard_count} shards needs {shard_count - 1} boundaries, got {len(date_boundaries)}"
+            )
+        self.shard_count = shard_count
+        self.strategy = strategy
+        self.date_boundaries = sorted(str(boundary)[:10] for boundary in date_boundaries)
+        self.date_field = date_field
+
+    @classmethod
+    def from_settings(cls) -> "ShardRouter":
+        return cls(
+            shard_count=len(settings.db_shard_dsns),
+            strategy=settings.db_shard_strategy,
+            date_boundaries=settings.db_shard_date_boundaries,
+            date_field=settings.db_shard_date_field,
+        )
+
+    def shard_for_id(self, row_id: Any) -> int:
+        return zlib.crc32(str(row_id).encode("utf-8")) % self.shard_count
+
+    def shard_for(self, row: dict) -> int:
+        """The shard index for a row (a dict with ``id``, or ``date_field`` for date sharding)."""
+        if self.strategy == "date":
+            return bisect.bisect_right(self.date_boundaries, str(row[self.date_field])[:10])
+        return self.shard_for_id(row["id"])
+
+    def partition(self, rows: List[dict]) -> List[List[dict]]:
+        """Rows grouped by shard index."""
+        shards = [[] for _ in range(self.shard_count)]
+        for row in rows:
+            shards[self.shard_for(row)].append(row)
+        return shards
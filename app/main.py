@@ -1,20 +1,70 @@
+import asyncio
+import json
+import time
 from datetime import datetime
 from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
-from contextlib import asynccontextmanager
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from contextlib import aclosing, asynccontextmanager
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal, Optional
 
-from app.agent_infrastructure.agents.main_agent import rag_agent
-from app.agent_infrastructure.evaluation.deepeval import run_deep_eval
+from app.agent_infrastructure.agents.batch import BatchAnswerer
+from app.agent_infrastructure.agents.fast_path import select_agent
+from app.agent_infrastructure.agents.streaming import document_ids, sse_event, stream_agent_events
+from app.agent_infrastructure.evaluation import eval_queue
 from app.agent_infrastructure.guardrails.guardrails import guardrails_validator
+from app.agent_infrastructure.infrastructure.answer_cache import AnswerCacheLookup, CachedAnswer, answer_cache
+from app.agent_infrastructure.infrastructure.conversation_store import conversation_store
+from app.agent_infrastructure.infrastructure.request_log import request_log
+from app.agent_infrastructure.infrastructure.warmup import warm_up
+from app.agent_infrastructure.tools.document_retriver import retrieval_prefetch
+from app.core.admission import AdmissionTicket, batch_admission, chat_admission
+from app.core.config import settings
+from app.core.deadline import Deadline, current_deadline, remaining, set_deadline, use_deadline
+from app.core.instrumentation import ServerTimingMiddleware
+from app.core.metrics import metrics, render_prometheus
+from app.core.resilience import CircuitOpenError, get_upstream
 from app.core.security import verify_token
-from app.db.client import Database
+from app.db.client import Database, bulk_writer
+from app.schema.chat_response import REFUSAL_MESSAGE, BatchChatResponse, ChatResponse, CitedDocument
+
+speculative_runs = metrics.counter(
+    "speculative_agent_runs_total", "Speculative agent runs by outcome (used/cancelled/cache_hit/failed)"
+)
+speculative_wasted_seconds = metrics.histogram(
+    "speculative_agent_wasted_seconds", "Agent time spent before a speculative run was cancelled"
+)
+speculative_saved_seconds = metrics.histogram(
+    "speculative_agent_saved_seconds", "Latency saved by overlapping guardrails with the agent"
+)
+# Not hedged: a duplicate agent run doubles token spend. The breaker sheds load fast when OpenAI is failing.
+agent_upstream = get_upstream("agent_llm", hedge=False)
+
+time_to_first_token = metrics.histogram(
+    "chat_time_to_first_token_seconds", "Time until the client receives the first answer token, by endpoint"
+)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await Database.init()
+    try:
+        await conversation_store.ensure_schema()
+    except Exception as e:
+        print(f"Error creating the conversations table: {e}")
+    try:
+        await eval_queue.ensure_schema()
+    except Exception as e:
+        print(f"Error creating the eval_jobs table: {e}")
+    try:
+        await request_log.ensure_schema()
+    except Exception as e:
+        print(f"Error creating the request_log table: {e}")
+    await bulk_writer.start()
+    # uvicorn only accepts connections once this returns, so the warm-up gates readiness.
+    app.state.warmup = await warm_up() if settings.startup_warmup_enabled else {}
     yield
+    # Flush buffered request logs before the pools go away.
+    await bulk_writer.close()
     await Database.close()
 
 
@@ -24,46 +74,563 @@ app = FastAPI(
     description="API for chatting with ArXiv RAG agent",
     lifespan=lifespan
 )
+app.add_middleware(ServerTimingMiddleware, on_response=request_log.record)
 
 class ChatRequest(BaseModel):
     user_id: str
     messages: List[dict[str, str]]
+    debug: bool = False
+    timeout_ms: Optional[int] = None
+    pipeline: Optional[Literal["auto", "agent", "fast"]] = None
+    bypass_cache: bool = False
+    conversation_id: Optional[str] = None
+
+    def deadline_seconds(self) -> float:
+        """The request's time budget: the client's ``timeout_ms``, capped by the server default."""
+        if self.timeout_ms is None:
+            return settings.chat_deadline_seconds
+        return min(self.timeout_ms / 1000, settings.chat_deadline_seconds)
+
+class BatchChatRequest(BaseModel):
+    user_id: str
+    questions: List[str]
+    timeout_ms: Optional[int] = None
+    bypass_cache: bool = False
+
+    def deadline_seconds(self) -> float:
+        """The batch's time budget: the client's ``timeout_ms``, capped by the server default."""
+        if self.timeout_ms is None:
+            return settings.chat_batch_deadline_seconds
+        return min(self.timeout_ms / 1000, settings.chat_batch_deadline_seconds)
+
+    def validate_questions(self) -> None:
+        if not self.questions:
+            raise HTTPException(status_code=400, detail="Missing 'questions'")
+        if len(self.questions) > settings.chat_batch_max_questions:
+            raise HTTPException(
+                status_code=400, detail=f"At most {settings.chat_batch_max_questions} questions per batch"
+            )
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the ArXiv RAG API"}
 
 
-@app.post("/chat/")
+@app.get("/ready")
+def read_ready():
+    """Readiness probe: served once the start-up warm-up has run; reports each warm-up step."""
+    return {"ready": True, "warmup": getattr(app.state, "warmup", {})}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    """Prometheus metrics: stage latencies, cache hit rates, pool saturation and evaluation backlog."""
+    await eval_queue.queue_stats_refresher.maybe_refresh()
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/cache/invalidate")
+async def invalidate_caches(token: str = Depends(verify_token)):
+    """Drop cached answers and retrievals; call after refreshing the arxiv index."""
+    answer_cache.invalidate_index()
+    return {"invalidated": True}
+
+
+@app.post("/chat/", response_model=ChatResponse)
 async def chat(request_data: ChatRequest, background_tasks: BackgroundTasks, token: str = Depends(verify_token)):
     """
     Chat with the ArXiv agent
+
+    Returns the answer, the retrieved documents and stage timings. Set
+    ``debug`` to also get the full agent trace (messages and documents).
+    Under overload the request is rejected fast with 429 (this user has too
+    many queued requests) or 503 (queue full or its deadline would be missed)
+    and a ``Retry-After`` header.
+
+    The request runs under a deadline (``timeout_ms``, capped by the server
+    default) that starts on arrival. When the remaining budget gets low, stages
+    degrade instead of overrunning and are listed in ``degradations``; if the
+    agent still cannot finish in time the request fails with 504.
+
+    With a ``conversation_id`` the history is kept server-side: send only the
+    new message(s) and the stored (summarized) history is prepended.
     """
-    messages = request_data.messages
-    prompts = messages[-1]['content']
-    if not messages:
+    if not request_data.messages:
         raise HTTPException(status_code=400, detail="Missing 'messages'")
 
-    guardrails_result = await guardrails_validator(prompts)
-    if not guardrails_result.get("validationPassed", False):
-        return JSONResponse({"response": "Sorry, I cannot assist with that request."})
+    started = time.perf_counter()
+    set_deadline(request_data.deadline_seconds())
+    async with chat_admission.admit(request_data.user_id):
+        timing = {"queue_ms": (time.perf_counter() - started) * 1000}
+        messages = await _conversation_messages(request_data)
+        return await _answer(request_data, messages, background_tasks, started, timing)
+
+
+async def _answer(
+        request_data: ChatRequest,
+        messages: List[dict[str, str]],
+        background_tasks: BackgroundTasks,
+        started: float,
+        timing: dict,
+) -> Response:
+    """Run guardrails and the agent for an admitted /chat/ request."""
+    prompts = _latest_prompt(messages)
+    agent_input = _agent_input(messages)
+    pipeline, agent = select_agent(messages, request_data.pipeline)
+    guardrails_started = time.perf_counter()
+    # Embedding the question for the answer cache overlaps with guardrails (and a speculative agent run);
+    # the result is only used once they pass.
+    lookup_task = asyncio.create_task(_lookup_answer(messages, request_data.bypass_cache))
+
+    try:
+        # The fast path retrieves first anyway; prefetching only helps the ReAct agent.
+        prefetch = settings.retrieval_prefetch_enabled and pipeline == "agent"
+        async with retrieval_prefetch(prompts, enabled=prefetch):
+            if settings.speculative_agent_enabled:
+                response, lookup = await _speculative_agent_run(prompts, agent_input, agent, lookup_task, timing)
+                if response is None and lookup is None:
+                    return _refusal_response(started)
+            else:
+                guardrails_result = await guardrails_validator(prompts)
+                timing["guardrails_ms"] = (time.perf_counter() - guardrails_started) * 1000
+                if not guardrails_result.get("validationPassed", False):
+                    return _refusal_response(started)
+                lookup = await lookup_task
+                if lookup is None or lookup.hit is None:
+                    agent_started = time.perf_counter()
+                    response = await _run_agent(agent_input, agent)
+                    timing["agent_ms"] = (time.perf_counter() - agent_started) * 1000
+            if lookup is not None and lookup.hit is not None:
+                await _save_turn(request_data, lookup.hit.answer, lookup.hit.documents, background_tasks)
+                _schedule_cached_evaluation(background_tasks, prompts, lookup, pipeline)
+                return _cached_response(lookup, started, timing)
+    finally:
+        if not lookup_task.done():
+            lookup_task.cancel()
+
+    _schedule_evaluation(background_tasks, prompts, response, pipeline)
+    # The whole answer arrives at once, so the first token lands with the response.
+    time_to_first_token.observe(time.perf_counter() - started, endpoint="chat")
+    timing["total_ms"] = (time.perf_counter() - started) * 1000
+    chat_response = ChatResponse.from_agent_state(response, timing, debug=request_data.debug)
+    chat_response.degradations = list(current_deadline().degradations)
+    chat_response.pipeline = pipeline
+    documents = [doc.model_dump() for doc in chat_response.documents]
+    _store_answer(lookup, chat_response.answer, documents)
+    await _save_turn(request_data, chat_response.answer, documents, background_tasks)
+    return _json_response(chat_response)
+
+
+def _latest_prompt(messages: List[dict[str, str]]) -> str:
+    """The latest message's content, the text that guardrails validate; 400 when it is missing."""
+    content = messages[-1].get("content")
+    if not content:
+        raise HTTPException(status_code=400, detail="Missing 'content' in the last message")
+    return content
+
+
+async def _conversation_messages(request_data: ChatRequest) -> List[dict[str, str]]:
+    """The request's messages, preceded by the stored history when a conversation id is given."""
+    if not request_data.conversation_id:
+        return request_data.messages
+    try:
+        history = await conversation_store.load(request_data.user_id, request_data.conversation_id)
+    except Exception as e:
+        print(f"Error loading conversation {request_data.conversation_id}: {e}")
+        history = []
+    return history + request_data.messages
+
+
+async def _save_turn(
+        request_data: ChatRequest, answer: str, documents: list[dict], background_tasks: BackgroundTasks
+) -> None:
+    """Append the new messages and the answer (with cited document ids) to the stored conversation."""
+    if not request_data.conversation_id:
+        return
+    turn = [{"role": m.get("role", "user"), "content": m.get("content", "")} for m in request_data.messages]
+    turn.append({"role": "assistant", "content": answer, "document_ids": document_ids(documents)})
+    try:
+        await conversation_store.append(request_data.user_id, request_data.conversation_id, turn)
+    except Exception as e:
+        print(f"Error saving conversation {request_data.conversation_id}: {e}")
+        return
+    background_tasks.add_task(conversation_store.compact, request_data.user_id, request_data.conversation_id)
+
+
+async def _lookup_answer(messages: List[dict[str, str]], bypass: bool) -> AnswerCacheLookup | None:
+    """Consult the semantic answer cache; None when it is disabled or unavailable."""
+    if not settings.answer_cache_enabled:
+        return None
+    try:
+        return await answer_cache.lookup(messages, bypass=bypass)
+    except Exception as e:
+        print(f"Error in answer cache lookup: {e}")
+        return None
+
+
+def _store_answer(lookup: AnswerCacheLookup | None, answer: str, documents: list[dict]) -> None:
+    """Cache a fresh answer unless it was produced under a degraded deadline budget."""
+    deadline = current_deadline()
+    if lookup is None or (deadline is not None and deadline.degradations):
+        return
+    answer_cache.store(lookup, CachedAnswer(answer=answer, documents=documents))
+
+
+def _cached_response(lookup: AnswerCacheLookup, started: float, timing: dict) -> Response:
+    time_to_first_token.observe(time.perf_counter() - started, endpoint="chat")
+    timing["total_ms"] = (time.perf_counter() - started) * 1000
+    return _json_response(ChatResponse(
+        answer=lookup.hit.answer,
+        documents=[CitedDocument(**doc) for doc in lookup.hit.documents],
+        timing=timing,
+        cached=True,
+    ))
+
+
+async def _run_agent(agent_input: dict, agent) -> dict:
+    """
+    Run the agent (ReAct or fast path) within the request deadline and the LLM circuit breaker.
+
+    Raises:
+        HTTPException: 504 once the deadline has passed, 503 while the breaker is open.
+    """
+    try:
+        return await asyncio.wait_for(
+            agent_upstream.acall(lambda: agent.ainvoke(agent_input)), timeout=remaining()
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
+    except CircuitOpenError:
+        raise HTTPException(
+            status_code=503,
+            detail="Language model is unavailable, please retry later",
+            headers={"Retry-After": str(int(agent_upstream.breaker.reset_timeout))},
+        )
+
+
+def _json_response(body: BaseModel) -> Response:
+    """Serialize with pydantic-core's JSON encoder, skipping FastAPI's generic jsonable_encoder pass."""
+    return Response(content=body.model_dump_json(exclude_none=True), media_type="application/json")
+
+
+def _refusal_response(started: float) -> Response:
+    return _json_response(ChatResponse(
+        answer=REFUSAL_MESSAGE,
+        refused=True,
+        timing={"total_ms": (time.perf_counter() - started) * 1000},
+    ))
+
 
+@app.post("/chat/stream")
+async def chat_stream(request_data: ChatRequest, background_tasks: BackgroundTasks, token: str = Depends(verify_token)):
+    """
+    Chat with the ArXiv agent, streaming progress and answer tokens as Server-Sent Events.
+
+    Events: ``guardrails`` (passed), ``refusal``, ``retrieval_started``,
+    ``retrieval_finished`` (document ids), ``token``, ``error`` and ``done``
+    (full answer, document ids, any deadline degradations and whether it came
+    from the answer cache, in which case the whole answer is one ``token``). Nothing is sent
+    before input validation passes. The deadline works as for ``/chat/``; when it
+    runs out mid-stream an ``error`` event is sent. ``conversation_id`` works as
+    for ``/chat/``.
+    """
+    if not request_data.messages:
+        raise HTTPException(status_code=400, detail="Missing 'messages'")
+    started = time.perf_counter()
+    deadline = set_deadline(request_data.deadline_seconds())
+    # Everything that can fail runs before admission: once a slot is taken, only the stream releases it.
+    messages = await _conversation_messages(request_data)
+    prompts = _latest_prompt(messages)
+    agent_input = _agent_input(messages)
+    pipeline, agent = select_agent(messages, request_data.pipeline)
+
+    async def event_stream(deadline: Deadline, started: float, ticket: AdmissionTicket):
+        # The budget started on arrival, before the history load and admission.
+        use_deadline(deadline)
+        queue: asyncio.Queue = asyncio.Queue()
+        produce_started = produce_finished = None
+
+        async def produce():
+            nonlocal produce_finished
+            try:
+                async with asyncio.timeout(deadline.remaining()):
+                    async for item in stream_agent_events(agent_input, agent):
+                        await queue.put(item)
+            except TimeoutError:
+                await queue.put(("error", {"detail": "Request deadline exceeded"}))
+            except Exception as e:
+                print(f"Error in chat_stream: {e}")
+                await queue.put(("error", {"detail": str(e)}))
+            finally:
+                produce_finished = time.perf_counter()
+                await queue.put(None)
+
+        def discard_speculative(outcome: str) -> None:
+            producer.cancel()
+            speculative_runs.inc(outcome=outcome)
+            speculative_wasted_seconds.observe((produce_finished or time.perf_counter()) - produce_started)
+
+        lookup_task = asyncio.create_task(_lookup_answer(messages, request_data.bypass_cache))
+        prefetch_enabled = settings.retrieval_prefetch_enabled and pipeline == "agent"
+        async with retrieval_prefetch(prompts, enabled=prefetch_enabled):
+            # In speculative mode the agent runs during validation; its events are buffered, not sent.
+            speculative = settings.speculative_agent_enabled
+            if speculative:
+                produce_started = time.perf_counter()
+            producer = asyncio.create_task(produce()) if speculative else None
+            try:
+                guardrails_result = await guardrails_validator(prompts)
+                if not guardrails_result.get("validationPassed", False):
+                    if speculative:
+                        discard_speculative("cancelled")
+                    yield sse_event("refusal", {"response": REFUSAL_MESSAGE})
+                    return
+                yield sse_event("guardrails", {"passed": True})
+
+                lookup = await lookup_task
+                lookup_done = time.perf_counter()
+                if lookup is not None and lookup.hit is not None:
+                    if speculative:
+                        discard_speculative("cache_hit")
+                    time_to_first_token.observe(time.perf_counter() - started, endpoint="chat_stream")
+                    yield sse_event("token", {"content": lookup.hit.answer})
+                    yield sse_event("done", {
+                        "answer": lookup.hit.answer,
+                        "document_ids": document_ids(lookup.hit.documents),
+                        "degradations": [],
+                        "cached": True,
+                    })
+                    await _save_turn(request_data, lookup.hit.answer, lookup.hit.documents, background_tasks)
+                    _schedule_cached_evaluation(background_tasks, prompts, lookup, pipeline)
+                    return
+
+                if producer is None:
+                    producer = asyncio.create_task(produce())
+
+                final_state = None
+                first_token = True
+                while (item := await queue.get()) is not None:
+                    event, data = item
+                    if event == "final_state":
+                        final_state = data
+                        continue
+                    if event == "token" and first_token:
+                        first_token = False
+                        time_to_first_token.observe(time.perf_counter() - started, endpoint="chat_stream")
+                    yield sse_event(event, data)
+
+                if speculative and final_state is None:
+                    speculative_runs.inc(outcome="failed")
+                elif speculative:
+                    # As for /chat/: the agent would otherwise only have started once the lookup was done.
+                    speculative_saved_seconds.observe(
+                        min(lookup_done - produce_started, produce_finished - produce_started)
+                    )
+                    speculative_runs.inc(outcome="used")
+
+                if final_state is not None:
+                    _schedule_evaluation(background_tasks, prompts, final_state, pipeline)
+                    documents = [doc for batch in final_state.get("retrieved_docs") or [] for doc in batch]
+                    cited = ChatResponse.from_agent_state(final_state, {}).documents
+                    cited = [doc.model_dump() for doc in cited]
+                    _store_answer(lookup, final_state["messages"][-1].content, cited)
+                    await _save_turn(request_data, final_state["messages"][-1].content, cited, background_tasks)
+                    yield sse_event("done", {
+                        "answer": final_state["messages"][-1].content,
+                        "document_ids": document_ids(documents),
+                        "degradations": deadline.degradations,
+                    })
+            finally:
+                if producer is not None and not producer.done():
+                    producer.cancel()
+                if not lookup_task.done():
+                    lookup_task.cancel()
+                ticket.release()
+
+    # Admit before the response starts so overload is still reported as 429/503.
+    await chat_admission.acquire(request_data.user_id)
+    ticket = chat_admission.ticket()
+    try:
+        # Released by the stream itself, or after the response if the client went away first.
+        background_tasks.add_task(ticket.release)
+        return StreamingResponse(
+            event_stream(deadline, started, ticket),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    except BaseException:
+        # Background tasks are dropped when the handler raises, so release here or the slot leaks.
+        ticket.release()
+        raise
+
+
+@app.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(request_data: BatchChatRequest, token: str = Depends(verify_token)):
+    """
+    Answer many independent questions (e.g. a literature survey) in one request.
+
+    Guardrails, answer cache lookups, embeddings and vector searches are
+    batched across questions, and answers are generated with bounded LLM
+    concurrency (see ``BatchAnswerer``). Each question is answered on its own
+    (no conversation), like a fast-path ``/chat/`` call. Answers are returned
+    in question order with a ``summary`` including throughput in
+    questions/minute. Batches have their own admission limit and deadline
+    (``timeout_ms``, capped by ``chat_batch_deadline_seconds``).
+    """
+    request_data.validate_questions()
+    set_deadline(request_data.deadline_seconds())
+    async with batch_admission.admit(request_data.user_id):
+        answerer = BatchAnswerer(request_data.questions, bypass_cache=request_data.bypass_cache)
+        try:
+            # aclosing: on timeout the answerer's remaining tasks are cancelled right away.
+            async with asyncio.timeout(remaining()), aclosing(answerer.run()) as answers_stream:
+                answers = [answer async for answer in answers_stream]
+        except TimeoutError:
+            raise HTTPException(status_code=504, detail="Batch deadline exceeded")
+    answers.sort(key=lambda answer: answer.index)
+    return _json_response(BatchChatResponse(answers=answers, summary=answerer.summary()))
+
+
+@app.post("/chat/batch/stream")
+async def chat_batch_stream(
+        request_data: BatchChatRequest, background_tasks: BackgroundTasks, token: str = Depends(verify_token)
+):
+    """
+    ``/chat/batch`` as newline-delimited JSON: one ``BatchAnswer`` per line as
+    soon as it is ready (completion order, ``index`` gives the question), then
+    a final ``{"summary": ...}`` line. When the deadline runs out the remaining
+    questions are dropped and the summary line carries ``"error"``.
+    """
+    request_data.validate_questions()
+    # Admit before the response starts so overload is still reported as 429/503.
+    await batch_admission.acquire(request_data.user_id)
+    ticket = batch_admission.ticket()
+    background_tasks.add_task(ticket.release)
+    deadline_seconds = request_data.deadline_seconds()
+
+    async def lines():
+        deadline = set_deadline(deadline_seconds)
+        answerer = BatchAnswerer(request_data.questions, bypass_cache=request_data.bypass_cache)
+        error = None
+        try:
+            async with asyncio.timeout(deadline.remaining()), aclosing(answerer.run()) as answers:
+                async for answer in answers:
+                    yield answer.model_dump_json(exclude_none=True) + "\n"
+        except TimeoutError:
+            error = "Batch deadline exceeded"
+        finally:
+            ticket.release()
+        summary = {"summary": answerer.summary().model_dump()}
+        if error:
+            summary["error"] = error
+        yield json.dumps(summary) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+
+def _agent_input(messages: List[dict[str, str]]) -> dict:
+    """Build the initial agent state for a conversation."""
     current_date = datetime.now().strftime("%Y-%m-%d")
-    response = await rag_agent.ainvoke({
+    return {
         "messages": messages ,
         "date": current_date,
         "retrieved_docs": []
-    })
+    }
+
+
+def _schedule_evaluation(background_tasks: BackgroundTasks, prompts: str, response: dict, pipeline: str) -> None:
+    """Enqueue the (sampled) DeepEval run for a finished agent state; the evaluation worker picks it up."""
     current_response = response["messages"][-1].content
     tool_used = []
     for msg in response['messages']:
         if getattr(msg, 'tool_calls', []):
             tool_used.append(msg.tool_calls[0]['name'])
     retrieved_docs = response['retrieved_docs']
-    background_tasks.add_task(run_deep_eval,
+    background_tasks.add_task(eval_queue.enqueue_evaluation,
         user_query=prompts,
         agent_output=current_response,
         retrieved_docs=retrieved_docs,
         tools_used=tool_used,
+        pipeline=pipeline,
+        model=response.get("model"),
     )
-    return response
+
+
+def _schedule_cached_evaluation(
+        background_tasks: BackgroundTasks, prompts: str, lookup: AnswerCacheLookup, pipeline: str
+) -> None:
+    """Enqueue evaluation of a cached answer, sampled in its own ``cache_hit`` stratum."""
+    background_tasks.add_task(eval_queue.enqueue_evaluation,
+        user_query=prompts,
+        agent_output=lookup.hit.answer,
+        retrieved_docs=lookup.hit.documents,
+        pipeline=pipeline,
+        cache_hit=True,
+    )
+
+async def _speculative_agent_run(
+        prompts: str, agent_input: dict, agent, lookup_task: asyncio.Task, timing: dict
+) -> tuple[dict | None, AnswerCacheLookup | None]:
+    """
+    Run input guardrails and the agent concurrently, alongside the answer cache lookup.
+
+    The agent result is only released once validation has passed and the
+    lookup has missed. If validation fails, or the lookup hits, the agent task
+    is cancelled and its time counted as wasted. Records ``guardrails_ms`` and
+    ``agent_ms`` in ``timing`` like the sequential path.
+
+    Args:
+        prompts (str): The latest user message to validate.
+        agent_input (dict): The initial state for the agent.
+        agent: The graph chosen by ``select_agent``.
+        lookup_task (asyncio.Task): The running ``_lookup_answer`` for this request.
+        timing (dict): The request's stage timings.
+
+    Returns:
+        tuple: ``(state, lookup)``: the agent's final state and the cache lookup
+        on a miss, ``(None, lookup)`` on a cache hit, ``(None, None)`` if validation failed.
+    """
+    started = time.perf_counter()
+    agent_finished_at = None
+
+    async def run_agent() -> dict:
+        nonlocal agent_finished_at
+        try:
+            return await _run_agent(agent_input, agent)
+        finally:
+            agent_finished_at = time.perf_counter()
+
+    def discard(outcome: str) -> None:
+        agent_task.cancel()
+        speculative_runs.inc(outcome=outcome)
+        speculative_wasted_seconds.observe((agent_finished_at or time.perf_counter()) - started)
+
+    agent_task = asyncio.create_task(run_agent())
+    try:
+        guardrails_result = await guardrails_validator(prompts)
+        timing["guardrails_ms"] = (time.perf_counter() - started) * 1000
+        if not guardrails_result.get("validationPassed", False):
+            discard("cancelled")
+            return None, None
+
+        lookup = await lookup_task
+        lookup_done = time.perf_counter()
+        if lookup is not None and lookup.hit is not None:
+            discard("cache_hit")
+            return None, lookup
+
+        try:
+            response = await agent_task
+        except Exception:
+            speculative_runs.inc(outcome="failed")
+            raise
+    finally:
+        # Never leave the speculative run behind if the request itself is cancelled.
+        if not agent_task.done():
+            agent_task.cancel()
+
+    timing["agent_ms"] = (agent_finished_at - started) * 1000
+    # Sequential cost is guardrails and lookup, then the agent; overlapped cost is the longest of them.
+    speculative_saved_seconds.observe(min(lookup_done - started, agent_finished_at - started))
+    speculative_runs.inc(outcome="used")
+    return response, lookup
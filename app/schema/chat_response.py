@@ -0,0 +1,100 @@
+from typing import Any, Optional
+
+from langchain_core.messages import messages_to_dict
+from pydantic import BaseModel, Field
+
+from app.schema.retrieved_paper import as_paper
+
+REFUSAL_MESSAGE = "Sorry, I cannot assist with that request."
+
+
+class CitedDocument(BaseModel):
+    """A retrieved paper referenced by the answer."""
+    id: Optional[Any] = None
+    title: Optional[str] = None
+    category: Optional[str] = None
+
+
+class ChatResponse(BaseModel):
+    """Compact /chat/ response: the answer, its documents and timings."""
+    answer: str
+    documents: list[CitedDocument] = Field(default_factory=list)
+    timing: dict[str, float] = Field(default_factory=dict, description="Stage durations in milliseconds")
+    refused: bool = False
+    cached: bool = Field(False, description="Answer served from the semantic answer cache")
+    pipeline: Optional[str] = Field(None, description="Pipeline that answered: agent (ReAct) or fast")
+    degradations: list[str] = Field(default_factory=list, description="Stages degraded to meet the request deadline")
+    trace: Optional[dict] = Field(None, description="Full agent state, only when debug is requested")
+
+    @classmethod
+    def from_agent_state(cls, state: dict, timing: dict[str, float], debug: bool = False) -> "ChatResponse":
+        """
+        Build the response from the agent's final LangGraph state.
+
+        Args:
+            state (dict): The agent's final state (messages, retrieved_docs).
+            timing (dict[str, float]): Stage durations in milliseconds.
+            debug (bool): Include the full message and document trace.
+
+        Returns:
+            ChatResponse: The compact response.
+        """
+        seen = set()
+        documents = []
+        for batch in state.get("retrieved_docs") or []:
+            for doc in (batch if isinstance(batch, list) else [batch]):
+                paper = as_paper(doc)
+                key = paper.id or paper.title
+                if key in seen:
+                    continue
+                seen.add(key)
+                documents.append(CitedDocument(id=paper.id, title=paper.title, category=paper.category))
+
+        return cls(
+            answer=state["messages"][-1].content,
+            documents=documents,
+            timing=timing,
+            trace=agent_trace(state) if debug else None,
+        )
+
+
+class BatchAnswer(BaseModel):
+    """The answer to one question of a /chat/batch request."""
+    index: int = Field(description="Position of the question in the request")
+    question: str
+    answer: Optional[str] = None
+    documents: list[CitedDocument] = Field(default_factory=list)
+    refused: bool = False
+    cached: bool = Field(False, description="Answer served from the semantic answer cache")
+    error: Optional[str] = None
+    completed_ms: float = Field(0.0, description="Time from the start of the batch until this answer was ready")
+
+
+class BatchSummary(BaseModel):
+    """Totals for a /chat/batch request; answered, refused, cached and failed add up to questions."""
+    questions: int
+    answered: int = 0
+    refused: int = 0
+    cached: int = 0
+    failed: int = 0
+    elapsed_ms: float = 0.0
+    questions_per_minute: float = 0.0
+    degradations: list[str] = Field(default_factory=list, description="Stages degraded to meet the batch deadline")
+
+
+class BatchChatResponse(BaseModel):
+    """/chat/batch response: every answer, in question order, and the totals."""
+    answers: list[BatchAnswer]
+    summary: BatchSummary
+
+
+def agent_trace(state: dict) -> dict:
+    """JSON-ready copy of the full agent state for debugging."""
+    return {
+        "messages": messages_to_dict(state["messages"]),
+        "retrieved_docs": [
+            [as_paper(d)._asdict() for d in (batch if isinstance(batch, list) else [batch])]
+            for batch in state.get("retrieved_docs") or []
+        ],
+        "date": state.get("date"),
+    }
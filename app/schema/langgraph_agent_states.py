@@ -4,10 +4,14 @@ from langgraph.prebuilt.chat_agent_executor import AgentState
 from langchain_core.messages import AnyMessage
 from langgraph.graph.message import add_messages
 
+from app.schema.retrieved_paper import RetrievedPaper
+
 class MAINAGENTSTATE(AgentState):
     messages: Annotated[list[AnyMessage], add_messages]
-    retrieved_docs: Optional[list[dict]] = None
+    retrieved_docs: Optional[list[list[RetrievedPaper]]] = None
     date: Optional[str] = None
+    # Routed generation model of the latest LLM call (``model_router``), an evaluation stratum.
+    model: Optional[str] = None
    
 
 
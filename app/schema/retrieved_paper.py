@@ -0,0 +1,59 @@
+from typing import Any, NamedTuple, Optional
+
+from langchain_core.documents import Document
+
+
+class RetrievedPaper(NamedTuple):
+    """
+    One arXiv paper found by vector search.
+
+    A plain tuple (no per-instance ``__dict__``, no metadata dict), so the up
+    to 25 papers cached per query cost a few hundred bytes of containers; the
+    strings are the ones asyncpg decoded. Retrieval, the retrieval cache,
+    responses and evaluation all use this record; it only becomes a LangChain
+    ``Document`` where a LangChain API needs one (``to_document``).
+
+    Attributes:
+        id: The arxiv row id.
+        title (str | None): Paper title.
+        category (str | None): arXiv category.
+        abstract (str): Paper abstract, the text given to the LLM.
+        score (float | None): Cosine similarity to the query that found it (1 - pgvector distance).
+    """
+    id: Any
+    title: Optional[str] = None
+    category: Optional[str] = None
+    abstract: str = ""
+    score: Optional[float] = None
+
+    @classmethod
+    def from_record(cls, row: Any) -> "RetrievedPaper":
+        """From a search row (asyncpg record or dict) with ``id, title, category, abstract, distance``."""
+        return cls(row["id"], row["title"], row["category"], row["abstract"] or "", 1.0 - row["distance"])
+
+    def to_document(self) -> Document:
+        return Document(
+            page_content=self.abstract,
+            metadata={"id": self.id, "title": self.title, "category": self.category},
+        )
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "title": self.title, "category": self.category, "abstract": self.abstract}
+
+
+def as_paper(doc: Any) -> RetrievedPaper:
+    """
+    A ``RetrievedPaper`` from a retrieved document in any of the shapes still in
+    circulation: the record itself, a LangChain ``Document`` or a dict (cached
+    answers, JSON evaluation payloads).
+    """
+    if isinstance(doc, RetrievedPaper):
+        return doc
+    if hasattr(doc, "page_content"):
+        metadata = doc.metadata or {}
+        return RetrievedPaper(metadata.get("id"), metadata.get("title"), metadata.get("category"), doc.page_content or "")
+    if isinstance(doc, dict):
+        return RetrievedPaper(
+            doc.get("id"), doc.get("title"), doc.get("category"), doc.get("abstract") or "", doc.get("score")
+        )
+    return RetrievedPaper(None)
@@ -0,0 +1,138 @@
+"""
+Triton Guardrails Benchmark
+Drives each guardrails model at several concurrency levels through Triton's
+HTTP inference API and records throughput and latency per model config.
+
+Usage:
+    python3 benchmark.py --url http://localhost:8000 \
+        --models bart-mnli toxic-comment bias-comment bias-comment-int8 \
+        --concurrency 1 4 8 16 --requests 200 --output benchmark_results.jsonl
+
+Each result line includes the model's config.pbtxt settings (batching,
+instances, threads) so runs with different generated configs can be compared.
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from transformers import AutoTokenizer
+
+OUTPUT_DIR = "models"
+
+SAMPLE_TEXTS = [
+    "What are the latest advances in retrieval augmented generation?",
+    "Explain LoRA fine-tuning for large language models.",
+    "You are an idiot and your answers are garbage.",
+    "Summarise recent work on diffusion models for protein design.",
+    "Which political party is obviously the only sensible choice?",
+    "How do graph neural networks handle over-smoothing?",
+]
+HYPOTHESIS = "This example is violence."
+
+
+def read_config_summary(model_name):
+    """Extract the tuning knobs from a model's config.pbtxt."""
+    config_file = Path(OUTPUT_DIR) / model_name / "config.pbtxt"
+    if not config_file.is_file():
+        return {}
+    text = config_file.read_text()
+
+    def find(pattern):
+        match = re.search(pattern, text)
+        return match.group(1).strip() if match else None
+
+    return {
+        "config_hash": hashlib.sha1(text.encode()).hexdigest()[:10],
+        "max_batch_size": find(r"max_batch_size:\s*(\d+)"),
+        "preferred_batch_size": find(r"preferred_batch_size:\s*\[([^\]]*)\]"),
+        "max_queue_delay_us": find(r"max_queue_delay_microseconds:\s*(\d+)"),
+        "instance_count": find(r"count:\s*(\d+)"),
+        "intra_op_threads": find(r'"intra_op_thread_count"\s*value:\s*{\s*string_value:\s*"(\d+)"'),
+    }
+
+
+def build_payload(tokenizer, text, pair=None):
+    encoded = tokenizer(text, pair, truncation=True)
+    length = len(encoded["input_ids"])
+    return {
+        "inputs": [
+            {"name": "input_ids", "shape": [1, length], "datatype": "INT64", "data": encoded["input_ids"]},
+            {"name": "attention_mask", "shape": [1, length], "datatype": "INT64", "data": encoded["attention_mask"]},
+        ]
+    }
+
+
+def run_level(url, model_name, payloads, concurrency, total_requests):
+    """Send ``total_requests`` requests with ``concurrency`` in flight and return stats."""
+    endpoint = f"{url}/v2/models/{model_name}/infer"
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+
+    def one(i):
+        started = time.perf_counter()
+        response = session.post(endpoint, json=payloads[i % len(payloads)], timeout=60)
+        response.raise_for_status()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(one, range(total_requests)))
+    elapsed = time.perf_counter() - started
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "throughput_rps": round(total_requests / elapsed, 2),
+        "latency_ms_mean": round(statistics.mean(latencies) * 1000, 2),
+        "latency_ms_p50": round(pct(50), 2),
+        "latency_ms_p95": round(pct(95), 2),
+        "latency_ms_p99": round(pct(99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Triton guardrails models")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--models", nargs="+", default=["bart-mnli", "toxic-comment", "bias-comment"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 8, 16])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--output", default="benchmark_results.jsonl")
+    args = parser.parse_args()
+
+    with open(args.output, "a") as out:
+        for model_name in args.models:
+            tokenizer = AutoTokenizer.from_pretrained(Path(OUTPUT_DIR) / model_name / "1")
+            pair = HYPOTHESIS if model_name.startswith("bart-mnli") else None
+            payloads = [build_payload(tokenizer, text, pair) for text in SAMPLE_TEXTS]
+            config = read_config_summary(model_name)
+
+            # Warm up sessions and thread pools before measuring
+            run_level(args.url, model_name, payloads, 1, 5)
+
+            for concurrency in args.concurrency:
+                result = {"model": model_name, **config, **run_level(
+                    args.url, model_name, payloads, concurrency, args.requests
+                )}
+                out.write(json.dumps(result) + "\n")
+                print(
+                    f"{model_name:<20} c={concurrency:<3} "
+                    f"{result['throughput_rps']:>8.1f} req/s  "
+                    f"p50={result['latency_ms_p50']:.1f}ms  p99={result['latency_ms_p99']:.1f}ms"
+                )
+
+    print(f"✓ Results appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
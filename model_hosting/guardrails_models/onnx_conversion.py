@@ -7,18 +7,33 @@ from pathlib import Path
 from optimum.onnxruntime import ORTModelForSequenceClassification
 from transformers import AutoTokenizer
 import os
+import shutil
 
 # Configuration
 HF_TOKEN = os.getenv('HF_TOKEN')
 
 OUTPUT_DIR = "models"
 
+# Triton serving configuration (overridable per model in MODELS_CONFIG)
+TRITON_MAX_BATCH_SIZE = int(os.getenv("TRITON_MAX_BATCH_SIZE", "16"))
+TRITON_PREFERRED_BATCH_SIZES = [int(x) for x in os.getenv("TRITON_PREFERRED_BATCH_SIZES", "4,8,16").split(",") if x]
+TRITON_MAX_QUEUE_DELAY_US = int(os.getenv("TRITON_MAX_QUEUE_DELAY_US", "2000"))
+TRITON_INSTANCE_COUNT = int(os.getenv("TRITON_INSTANCE_COUNT", "2"))
+ORT_INTRA_OP_THREADS = int(os.getenv("ORT_INTRA_OP_THREADS", "2"))
+ORT_INTER_OP_THREADS = int(os.getenv("ORT_INTER_OP_THREADS", "1"))
+# Also export dynamically quantized int8 variants as "<model>-int8"
+QUANTIZE_INT8 = os.getenv("QUANTIZE_INT8", "false").lower() == "true"
+
 # Model configurations
 MODELS_CONFIG = {
     "bart-mnli": {
         "model_id": "facebook/bart-large-mnli",
         "output_path": "bart-mnli",
-        "requires_token": False
+        "requires_token": False,
+        # One (text, topic) pair per banned topic, so batches fill quickly; the
+        # model is large, so fewer instances with more threads each.
+        "instance_count": 1,
+        "intra_op_threads": 4
     },
     "toxic-comment": {
         "model_id": "martin-ha/toxic-comment-model", 
@@ -32,9 +47,14 @@ MODELS_CONFIG = {
     }
 }
 
-def create_config_pbtxt(model_name, model_path):
-    """Create config.pbtxt file for Triton Inference Server based on model type."""
-    
+def create_config_pbtxt(model_name, model_path, model_config=None):
+    """Create config.pbtxt file for Triton Inference Server based on model type.
+
+    Enables dynamic batching, CPU instance groups and ONNX Runtime thread
+    options. Per-model overrides come from ``model_config`` (see MODELS_CONFIG).
+    """
+    model_config = model_config or {}
+
     # Define model-specific output dimensions
     output_dims = {
         "bart-mnli": "[ 3 ]",      # 3 classes: entailment, neutral, contradiction
@@ -43,11 +63,19 @@ def create_config_pbtxt(model_name, model_path):
     }
     
     # Get output dimension for this model (default to dynamic if unknown)
-    output_dim = output_dims.get(model_name, "[ -1 ]")
+    base_name = model_name.removesuffix("-int8")
+    output_dim = output_dims.get(base_name, "[ -1 ]")
+
+    max_batch_size = model_config.get("max_batch_size", TRITON_MAX_BATCH_SIZE)
+    preferred = [b for b in model_config.get("preferred_batch_sizes", TRITON_PREFERRED_BATCH_SIZES) if b <= max_batch_size]
+    queue_delay_us = model_config.get("max_queue_delay_us", TRITON_MAX_QUEUE_DELAY_US)
+    instance_count = model_config.get("instance_count", TRITON_INSTANCE_COUNT)
+    intra_op_threads = model_config.get("intra_op_threads", ORT_INTRA_OP_THREADS)
+    inter_op_threads = model_config.get("inter_op_threads", ORT_INTER_OP_THREADS)
     
     config_content = f'''name: "{model_name}"                # must match folder name
 platform: "onnxruntime_onnx"     # backend to use
-max_batch_size: 8                # max batch requests Triton can handle
+max_batch_size: {max_batch_size}               # max batch requests Triton can handle
 
 input [
   {{
@@ -70,6 +98,22 @@ output [
   }}
 ]
 
+# Merge concurrent requests into one inference call
+dynamic_batching {{
+  preferred_batch_size: [ {", ".join(str(b) for b in preferred)} ]
+  max_queue_delay_microseconds: {queue_delay_us}
+}}
+
+instance_group [
+  {{
+    count: {instance_count}
+    kind: KIND_CPU
+  }}
+]
+
+parameters {{ key: "intra_op_thread_count" value: {{ string_value: "{intra_op_threads}" }} }}
+parameters {{ key: "inter_op_thread_count" value: {{ string_value: "{inter_op_threads}" }} }}
+
 version_policy: {{ latest {{ num_versions: 1 }} }}
 '''
     
@@ -78,7 +122,38 @@ version_policy: {{ latest {{ num_versions: 1 }} }}
         f.write(config_content)
     print(f"✓ Created config.pbtxt for {model_name}")
 
-def convert_model_to_onnx(model_id, output_path, use_token=False):
+def quantize_model_int8(model_name, model_version_path, model_config=None):
+    """
+    Write a dynamically quantized (int8 weights) copy of an exported model as
+    ``<model_name>-int8`` with its own Triton config.
+
+    Args:
+        model_name (str): Name of the fp32 model directory.
+        model_version_path (Path): Path to the fp32 ``<model>/1`` directory.
+        model_config (dict): Per-model Triton overrides.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized_name = f"{model_name}-int8"
+    quantized_base_path = Path(OUTPUT_DIR) / quantized_name
+    quantized_version_path = quantized_base_path / "1"
+    quantized_version_path.mkdir(parents=True, exist_ok=True)
+
+    # Tokenizer and config files are shared with the fp32 export
+    for file in model_version_path.iterdir():
+        if file.is_file() and file.suffix != ".onnx":
+            shutil.copy(file, quantized_version_path / file.name)
+
+    quantize_dynamic(
+        model_input=model_version_path / "model.onnx",
+        model_output=quantized_version_path / "model.onnx",
+        weight_type=QuantType.QInt8,
+    )
+    create_config_pbtxt(quantized_name, quantized_base_path, model_config)
+    print(f"✓ Quantized model saved to {quantized_version_path}")
+    return quantized_base_path
+
+def convert_model_to_onnx(model_id, output_path, use_token=False, model_config=None):
     """
     Convert a HuggingFace model to ONNX format in Triton server structure.
     
@@ -86,6 +161,7 @@ def convert_model_to_onnx(model_id, output_path, use_token=False):
         model_id (str): HuggingFace model identifier
         output_path (str): Path to save the ONNX model
         use_token (bool): Whether to use HF token for private models
+        model_config (dict): Per-model Triton overrides from MODELS_CONFIG
     """
     print(f"Converting {model_id} to ONNX...")
     
@@ -108,7 +184,10 @@ def convert_model_to_onnx(model_id, output_path, use_token=False):
     tokenizer.save_pretrained(model_version_path)
     
     # Create config.pbtxt in model base directory
-    create_config_pbtxt(output_path, model_base_path)
+    create_config_pbtxt(output_path, model_base_path, model_config)
+
+    if QUANTIZE_INT8:
+        quantize_model_int8(output_path, model_version_path, model_config)
     
     print(f"✓ Model saved to {model_version_path}")
     print(f"✓ Structure: {model_base_path}/{{config.pbtxt, 1/{{model files}}}}")
@@ -123,7 +202,8 @@ def convert_all_models():
             convert_model_to_onnx(
                 model_id=config["model_id"],
                 output_path=config["output_path"], 
-                use_token=config["requires_token"]
+                use_token=config["requires_token"],
+                model_config=config
             )
         except Exception as e:
             print(f"✗ Error converting {model_name}: {e}")
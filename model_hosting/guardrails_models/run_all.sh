@@ -25,9 +25,9 @@ else
 fi
 
 # Start Triton server with better error handling
+# Batch sizes, dynamic batching and instance groups come from each model's config.pbtxt
 echo "Starting Triton server..."
 tritonserver \
     --model-repository=/models \
-    --backend-config=default-max-batch-size=2 \
-    --log-verbose=1 \
+    --log-verbose=${TRITON_LOG_VERBOSE:-1} \
     --exit-on-error=false
@@ -0,0 +1,139 @@
+"""
+A/B replay of the ReAct agent against the retrieve-then-generate fast path.
+
+Replays a fixed query set through both pipelines in-process and compares
+latency, token usage (agent and query-expansion models together) and answer
+quality scored by DeepEval (answer relevancy and faithfulness, same judge
+model as online evaluation). Also shows what ``route_question`` would pick
+for each query, so the router can be checked against the quality numbers.
+
+Needs the same environment as the API (database, OpenAI and Azure judge keys).
+
+Usage:
+    python -m scripts.ab_replay_pipelines
+    python -m scripts.ab_replay_pipelines --queries queries.txt --output ab_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime
+
+from deepeval.metrics import AnswerRelevancyMetric, FaithfulnessMetric
+from deepeval.test_case import LLMTestCase
+from langchain_core.callbacks import get_usage_metadata_callback
+
+from app.agent_infrastructure.agents.fast_path import fast_rag_agent, route_question
+from app.agent_infrastructure.agents.main_agent import rag_agent
+from app.agent_infrastructure.evaluation.deepeval import build_judge_model
+from app.agent_infrastructure.evaluation.sampling import to_text_context
+from app.db.client import Database
+
+DEFAULT_QUERIES = [
+    "What is low-rank adaptation for fine-tuning large language models?",
+    "How does retrieval augmented generation reduce hallucinations?",
+    "What are recent approaches to efficient attention for long sequences?",
+    "Explain diffusion models for image generation.",
+    "What methods exist for detecting out-of-distribution inputs?",
+    "How do graph neural networks handle over-smoothing?",
+    "Compare contrastive and masked pretraining for vision transformers.",
+    "What are the trade-offs between quantization and pruning for model compression?",
+]
+
+PIPELINES = {"agent": rag_agent, "fast": fast_rag_agent}
+
+
+async def run_once(name: str, query: str, judge) -> dict:
+    agent_input = {
+        "messages": [{"role": "user", "content": query}],
+        "date": datetime.now().strftime("%Y-%m-%d"),
+        "retrieved_docs": [],
+    }
+    with get_usage_metadata_callback() as usage:
+        started = time.perf_counter()
+        state = await PIPELINES[name].ainvoke(agent_input)
+        latency = time.perf_counter() - started
+
+    answer = state["messages"][-1].content
+    context = to_text_context(state.get("retrieved_docs") or [])
+    test_case = LLMTestCase(input=query, actual_output=answer, retrieval_context=context or [""])
+    scores = {}
+    for metric in (AnswerRelevancyMetric(model=judge), FaithfulnessMetric(model=judge)):
+        try:
+            await metric.a_measure(test_case)
+            scores[metric.__name__] = metric.score
+        except Exception as e:
+            print(f"❌ {metric.__name__} failed for '{query[:40]}': {e}")
+
+    return {
+        "pipeline": name,
+        "query": query,
+        "latency_s": latency,
+        "llm_calls": sum(1 for m in state["messages"] if m.type == "ai"),
+        "input_tokens": sum(u.get("input_tokens", 0) for u in usage.usage_metadata.values()),
+        "output_tokens": sum(u.get("output_tokens", 0) for u in usage.usage_metadata.values()),
+        "scores": scores,
+    }
+
+
+def summarize(rows: list) -> None:
+    print(f"\n{'pipeline':<8} {'p50 s':>7} {'p95 s':>7} {'in tok':>8} {'out tok':>8} {'relevancy':>10} {'faithful':>9}")
+    for name in PIPELINES:
+        subset = [r for r in rows if r["pipeline"] == name]
+        if not subset:
+            continue
+        latencies = sorted(r["latency_s"] for r in subset)
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+        def mean_score(metric):
+            values = [r["scores"][metric] for r in subset if r["scores"].get(metric) is not None]
+            return f"{statistics.mean(values):.3f}" if values else "n/a"
+
+        print(
+            f"{name:<8} {statistics.median(latencies):7.2f} {p95:7.2f} "
+            f"{statistics.mean(r['input_tokens'] for r in subset):8.0f} "
+            f"{statistics.mean(r['output_tokens'] for r in subset):8.0f} "
+            f"{mean_score('Answer Relevancy'):>10} {mean_score('Faithfulness'):>9}"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay a query set through the agent and the fast path")
+    parser.add_argument("--queries", help="Text file with one query per line (default: built-in set)")
+    parser.add_argument("--runs", type=int, default=1, help="Replays per query and pipeline")
+    parser.add_argument("--output", help="Write per-query results as JSON")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    await Database.init()
+    judge = build_judge_model()
+    rows = []
+    try:
+        for query in queries:
+            route, reason = route_question([{"role": "user", "content": query}])
+            print(f"[{route:<5} {reason:<14}] {query}")
+            for _ in range(args.runs):
+                # Alternate the order so neither pipeline always gets the warm retrieval cache.
+                order = list(PIPELINES) if len(rows) % 4 == 0 else list(reversed(PIPELINES))
+                for name in order:
+                    row = await run_once(name, query, judge)
+                    row["routed_to"] = route
+                    rows.append(row)
+    finally:
+        await Database.close()
+
+    summarize(rows)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nWrote {len(rows)} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
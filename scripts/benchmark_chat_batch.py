@@ -0,0 +1,106 @@
+"""
+Throughput of /chat/batch/stream against the same questions sent one by one to /chat/.
+
+The sequential run is what survey clients did before: one /chat/ call after
+the other. Both runs bypass the answer cache so the second one does not just
+replay the first; the sequential run uses the fast pipeline by default, which
+is how /chat/batch generates its answers.
+
+Questions come from ``--questions`` (one per line) or are generated from a
+few topic templates.
+
+Usage:
+    python -m scripts.benchmark_chat_batch --url http://localhost:80 --token $api_auth_token --count 100
+    python -m scripts.benchmark_chat_batch --token $api_auth_token --questions survey.txt --sequential-limit 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+TOPICS = [
+    "low-rank adaptation", "retrieval augmented generation", "efficient attention", "diffusion models",
+    "out-of-distribution detection", "graph neural networks", "contrastive pretraining", "model quantization",
+    "speculative decoding", "mixture of experts", "reinforcement learning from human feedback", "neural radiance fields",
+]
+TEMPLATES = [
+    "What are the main recent approaches to {}?",
+    "What are the known limitations of {}?",
+    "How is {} evaluated in recent papers?",
+]
+
+
+def generated_questions(count: int) -> list:
+    questions = [template.format(topic) for template in TEMPLATES for topic in TOPICS]
+    return [questions[i % len(questions)] + ("" if i < len(questions) else f" ({i})") for i in range(count)]
+
+
+async def run_sequential(client: httpx.AsyncClient, questions: list, pipeline: str) -> float:
+    started = time.perf_counter()
+    for question in questions:
+        response = await client.post("/chat/", json={
+            "user_id": "benchmark",
+            "messages": [{"role": "user", "content": question}],
+            "pipeline": pipeline,
+            "bypass_cache": True,
+        })
+        response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def run_batch(client: httpx.AsyncClient, questions: list) -> tuple[float, float, dict]:
+    started = time.perf_counter()
+    first_answer = None
+    summary = {}
+    payload = {"user_id": "benchmark", "questions": questions, "bypass_cache": True}
+    async with client.stream("POST", "/chat/batch/stream", json=payload) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            item = json.loads(line)
+            if "summary" in item:
+                summary = item
+            elif first_answer is None:
+                first_answer = time.perf_counter() - started
+    total = time.perf_counter() - started
+    return (first_answer if first_answer is not None else total), total, summary
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare /chat/batch throughput with sequential /chat/ calls")
+    parser.add_argument("--url", default="http://localhost:80")
+    parser.add_argument("--token", required=True, help="API bearer token")
+    parser.add_argument("--questions", help="File with one question per line")
+    parser.add_argument("--count", type=int, default=100, help="Generated questions when --questions is not given")
+    parser.add_argument("--sequential-limit", type=int, help="Only time this many sequential /chat/ calls")
+    parser.add_argument("--pipeline", default="fast", choices=["auto", "agent", "fast"])
+    args = parser.parse_args()
+
+    if args.questions:
+        with open(args.questions) as f:
+            questions = [line.strip() for line in f if line.strip()]
+    else:
+        questions = generated_questions(args.count)
+    sequential_questions = questions[:args.sequential_limit] if args.sequential_limit else questions
+
+    headers = {"Authorization": f"Bearer {args.token}"}
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, timeout=None) as client:
+        first_answer, batch_total, summary = await run_batch(client, questions)
+        sequential_total = await run_sequential(client, sequential_questions, args.pipeline)
+
+    sequential_rate = len(sequential_questions) / sequential_total * 60
+    batch_rate = len(questions) / batch_total * 60
+    print(f"{'run':<22} {'questions':>9} {'seconds':>9} {'questions/min':>14}")
+    print(f"{'sequential /chat/':<22} {len(sequential_questions):>9} {sequential_total:>9.1f} {sequential_rate:>14.1f}")
+    print(f"{'/chat/batch/stream':<22} {len(questions):>9} {batch_total:>9.1f} {batch_rate:>14.1f}")
+    print(f"\nspeed-up: {batch_rate / sequential_rate:.1f}x, first batch answer after {first_answer:.1f}s")
+    if summary:
+        print("batch summary:", json.dumps(summary))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+"""
+Cold start of the API: import time and time to the first successful request.
+
+Each run uses a fresh interpreter:
+
+* ``import``: ``python -X importtime -c "import app.main"``, reporting the
+  cumulative import time of ``app.main`` and which heavy libraries it pulled
+  in (DeepEval, guardrails, the OpenAI SDK, ...);
+* ``serve``: ``uvicorn app.main:app`` on a free port, timing until ``/ready``
+  answers (the lifespan, warm-up included, has run), then, with ``--token``,
+  one ``/chat/`` request and when its answer arrived.
+
+``--compare-warmup`` repeats the serve runs with ``startup_warmup_enabled=false``:
+without the warm-up the server is ready sooner but the first request pays for
+building clients, loading guardrail models and opening connections.
+
+Usage:
+    python -m scripts.benchmark_cold_start --runs 5
+    python -m scripts.benchmark_cold_start --runs 3 --token $api_auth_token --compare-warmup
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+HEAVY_MODULES = ["deepeval", "guardrails", "openai", "langchain_openai", "langgraph", "onnxruntime", "transformers"]
+IMPORT_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| app\.main$")
+QUESTION = "What are the main recent approaches to retrieval augmented generation?"
+
+
+def measure_import() -> tuple[float, list]:
+    """Cumulative import time of ``app.main`` in seconds, and the heavy modules it loaded."""
+    probe = f"import sys, json, app.main; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe], capture_output=True, text=True, check=True
+    )
+    matches = [IMPORT_LINE.search(line) for line in result.stderr.splitlines()]
+    micros = next(int(match.group(1)) for match in matches if match)
+    return micros / 1e6, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_serve(token: str | None, warmup: bool, ready_timeout: float) -> dict:
+    """Seconds from spawning uvicorn to ``/ready`` and, with a token, to the first /chat/ answer."""
+    port = free_port()
+    env = {**os.environ, "startup_warmup_enabled": "true" if warmup else "false"}
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    result = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+            while "ready_s" not in result:
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+                if time.perf_counter() - started > ready_timeout:
+                    raise RuntimeError(f"not ready after {ready_timeout:.0f}s")
+                try:
+                    if client.get("/ready").status_code == 200:
+                        result["ready_s"] = time.perf_counter() - started
+                except httpx.TransportError:
+                    time.sleep(0.05)
+            if token:
+                sent = time.perf_counter()
+                response = client.post("/chat/", headers={"Authorization": f"Bearer {token}"}, json={
+                    "user_id": "benchmark",
+                    "messages": [{"role": "user", "content": QUESTION}],
+                    "bypass_cache": True,
+                })
+                response.raise_for_status()
+                result["first_request_s"] = time.perf_counter() - sent
+                result["first_answer_s"] = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+    return result
+
+
+def summarize(runs: list, key: str) -> str:
+    values = [run[key] for run in runs if key in run]
+    if not values:
+        return f"{'-':>8} {'-':>8}"
+    return f"{statistics.median(values):>8.2f} {max(values):>8.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API import time and time to the first successful request")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--token", help="API bearer token; also time one /chat/ request after start-up")
+    parser.add_argument("--compare-warmup", action="store_true", help="Also run with the start-up warm-up disabled")
+    parser.add_argument("--ready-timeout", type=float, default=180)
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    print(f"import app.main: median {statistics.median(s for s, _ in imports):.2f}s, "
+          f"max {max(s for s, _ in imports):.2f}s over {args.runs} runs")
+    print(f"heavy modules loaded at import: {', '.join(imports[0][1]) or 'none'}\n")
+
+    modes = [True, False] if args.compare_warmup else [True]
+    print(f"{'warm-up':<8} {'metric':<22} {'median s':>8} {'max s':>8}")
+    for warmup in modes:
+        runs = [measure_serve(args.token, warmup, args.ready_timeout) for _ in range(args.runs)]
+        label = "on" if warmup else "off"
+        print(f"{label:<8} {'spawn -> /ready':<22} {summarize(runs, 'ready_s')}")
+        if args.token:
+            print(f"{label:<8} {'first /chat/ latency':<22} {summarize(runs, 'first_request_s')}")
+            print(f"{label:<8} {'spawn -> first answer':<22} {summarize(runs, 'first_answer_s')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Serialization time and payload size of /chat/ responses.
+
+Builds a typical agent state for a 20-document answer and compares the old
+path (raw state through FastAPI's ``jsonable_encoder`` + ``JSONResponse``)
+with the compact ``ChatResponse`` serialized by pydantic-core's JSON encoder,
+with and without the debug trace.
+
+Usage:
+    python -m scripts.benchmark_response_serialization --iterations 500
+"""
+
+import argparse
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.schema.chat_response import ChatResponse
+from app.schema.retrieved_paper import RetrievedPaper
+
+ABSTRACT = (
+    "We study retrieval augmented generation for scientific question answering. "
+    "Our method combines dense retrieval over millions of arXiv abstracts with a "
+    "large language model and improves faithfulness on several benchmarks. "
+) * 6
+
+
+def typical_state(num_documents: int = 20) -> dict:
+    documents = [
+        RetrievedPaper(1000 + i, f"Paper {i} on retrieval augmented generation", "cs.CL", ABSTRACT, 0.8)
+        for i in range(num_documents)
+    ]
+    tool_call = {"name": "document_retriever", "args": {"query": "retrieval augmented generation"}, "id": "call_1"}
+    messages = [
+        HumanMessage(content="What is retrieval augmented generation?"),
+        AIMessage(content="", tool_calls=[tool_call]),
+        ToolMessage(content=str([paper.to_document() for paper in documents]), tool_call_id="call_1"),
+        AIMessage(content="Retrieval augmented generation combines a retriever with a generator. " * 8),
+    ]
+    return {"messages": messages, "retrieved_docs": [documents], "date": "2025-01-01"}
+
+
+def measure(name: str, render, iterations: int) -> None:
+    body = render()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        render()
+    per_call_ms = (time.perf_counter() - started) / iterations * 1000
+    print(f"{name:<28} {per_call_ms:8.3f} ms/response  {len(body) / 1024:8.1f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /chat/ response serialization")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--documents", type=int, default=20)
+    args = parser.parse_args()
+
+    state = typical_state(args.documents)
+    timing = {"guardrails_ms": 120.0, "agent_ms": 4200.0, "total_ms": 4330.0}
+
+    measure("raw state (jsonable_encoder)", lambda: JSONResponse(jsonable_encoder(state)).body, args.iterations)
+    measure("ChatResponse", lambda: ChatResponse.from_agent_state(
+        state, timing
+    ).model_dump_json(exclude_none=True).encode(), args.iterations)
+    measure("ChatResponse debug", lambda: ChatResponse.from_agent_state(
+        state, timing, debug=True
+    ).model_dump_json(exclude_none=True).encode(), args.iterations)
+
+
+if __name__ == "__main__":
+    main()
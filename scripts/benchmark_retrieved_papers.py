@@ -0,0 +1,116 @@
+"""
+Memory per retrieval-cache entry and conversion cost, Documents vs RetrievedPaper.
+
+Replays what happens to the search rows of one query (``--papers`` rows,
+25 = 5 expanded queries x 5 rows) offline:
+
+* ``documents``: the previous path. Every row is copied into a dict by the
+  DB layer, then into a LangChain ``Document`` with a fresh metadata dict,
+  which is what the retrieval cache kept; responses and evaluation turned the
+  Documents back into dicts (``docs_to_dicts``).
+* ``papers``: the current path. Every row becomes one ``RetrievedPaper``
+  tuple, which is what the cache keeps; only the tool message shown to the
+  LLM converts them to Documents.
+
+Cache entry memory is measured with tracemalloc over the containers only: the
+row strings are allocated beforehand, as asyncpg has already decoded them and
+both paths share them.
+
+Usage:
+    python -m scripts.benchmark_retrieved_papers
+    python -m scripts.benchmark_retrieved_papers --papers 25 --iterations 20000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from langchain_core.documents import Document
+
+from app.schema.retrieved_paper import RetrievedPaper
+
+
+def search_rows(count: int) -> list:
+    """Stand-ins for asyncpg records."""
+    return [
+        {
+            "id": f"2401.{10000 + i}",
+            "title": f"Paper {i} on retrieval augmented generation",
+            "abstract": "We study retrieval augmented generation for scientific question answering. " * 12,
+            "category": "cs.CL",
+            "distance": 0.2 + i / 1000,
+        }
+        for i in range(count)
+    ]
+
+
+def build_documents(rows: list) -> list:
+    results = [
+        {"id": row["id"], "title": row["title"], "abstract": row["abstract"], "category": row["category"],
+         "distance": row["distance"]}
+        for row in rows
+    ]
+    return [
+        Document(page_content=r["abstract"], metadata={"id": r["id"], "title": r["title"], "category": r["category"]})
+        for r in results
+    ]
+
+
+def build_papers(rows: list) -> list:
+    return [RetrievedPaper.from_record(row) for row in rows]
+
+
+def documents_downstream(documents: list) -> list:
+    return [
+        {"id": d.metadata.get("id"), "title": d.metadata.get("title"), "category": d.metadata.get("category"),
+         "abstract": d.page_content}
+        for d in documents
+    ]
+
+
+def papers_downstream(papers: list) -> list:
+    return [paper.to_dict() for paper in papers]
+
+
+def entry_bytes(build, rows: list) -> int:
+    tracemalloc.start()
+    entry = build(rows)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del entry
+    return size
+
+
+def per_call_us(fn, arg, iterations: int) -> float:
+    fn(arg)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(arg)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Document and RetrievedPaper retrieval results")
+    parser.add_argument("--papers", type=int, default=25, help="Rows per retrieval")
+    parser.add_argument("--iterations", type=int, default=10000)
+    args = parser.parse_args()
+
+    rows = search_rows(args.papers)
+    documents, papers = build_documents(rows), build_papers(rows)
+    print(f"{args.papers} papers per retrieval\n")
+    print(f"{'path':<10} {'entry bytes':>12} {'build us':>9} {'downstream us':>14} {'to Document us':>15}")
+    print(
+        f"{'documents':<10} {entry_bytes(build_documents, rows):>12} "
+        f"{per_call_us(build_documents, rows, args.iterations):>9.1f} "
+        f"{per_call_us(documents_downstream, documents, args.iterations):>14.1f} {'-':>15}"
+    )
+    print(
+        f"{'papers':<10} {entry_bytes(build_papers, rows):>12} "
+        f"{per_call_us(build_papers, rows, args.iterations):>9.1f} "
+        f"{per_call_us(papers_downstream, papers, args.iterations):>14.1f} "
+        f"{per_call_us(lambda ps: [p.to_document() for p in ps], papers, args.iterations):>15.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
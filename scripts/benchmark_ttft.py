@@ -0,0 +1,73 @@
+"""
+Compare time-to-first-token between /chat/ and /chat/stream.
+
+For /chat/ the first token only arrives with the full JSON response; for
+/chat/stream it is the first ``token`` SSE event. Total latency is reported
+for both.
+
+Usage:
+    python -m scripts.benchmark_ttft --url http://localhost:80 --token $api_auth_token \
+        --question "What is retrieval augmented generation?" --runs 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def time_chat(client: httpx.AsyncClient, payload: dict) -> tuple[float, float]:
+    started = time.perf_counter()
+    response = await client.post("/chat/", json=payload)
+    response.raise_for_status()
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed
+
+
+async def time_chat_stream(client: httpx.AsyncClient, payload: dict) -> tuple[float, float]:
+    started = time.perf_counter()
+    first_token = None
+    async with client.stream("POST", "/chat/stream", json=payload) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first_token is None and line == "event: token":
+                first_token = time.perf_counter() - started
+    total = time.perf_counter() - started
+    return (first_token if first_token is not None else total), total
+
+
+def summarize(name: str, samples: list[tuple[float, float]]) -> None:
+    ttft = sorted(s[0] * 1000 for s in samples)
+    total = sorted(s[1] * 1000 for s in samples)
+    print(
+        f"{name:<14} ttft p50={statistics.median(ttft):8.0f}ms  max={ttft[-1]:8.0f}ms  "
+        f"total p50={statistics.median(total):8.0f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Time-to-first-token benchmark")
+    parser.add_argument("--url", default="http://localhost:80")
+    parser.add_argument("--token", required=True, help="API bearer token")
+    parser.add_argument("--question", default="What is retrieval augmented generation?")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    payload = {"user_id": "benchmark", "messages": [{"role": "user", "content": args.question}]}
+    headers = {"Authorization": f"Bearer {args.token}"}
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, timeout=300) as client:
+        results = {"chat": [], "chat_stream": []}
+        for i in range(args.runs):
+            # Alternate which endpoint goes first so neither always gets the warm retrieval cache
+            order = [("chat", time_chat), ("chat_stream", time_chat_stream)]
+            for name, run in (order if i % 2 == 0 else order[::-1]):
+                results[name].append(await run(client, payload))
+
+    for name, samples in results.items():
+        summarize(name, samples)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
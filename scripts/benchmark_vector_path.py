@@ -0,0 +1,110 @@
+"""
+Allocations and time per retrieval on the vector path, lists vs float32 batches.
+
+Replays what happens to the query embeddings of one retrieval between the
+embedding service's JSON response and the SQL parameters, offline:
+
+* ``lists``: the previous path. Parse the JSON and keep the lists of Python
+  floats, compute cosine similarities in pure Python for query deduplication,
+  and format every vector as a pgvector text literal.
+* ``numpy``: the current path. Parse the JSON into one contiguous float32
+  batch (``as_batch``), deduplicate with one matrix product (``dedupe_rows``),
+  and encode each row in pgvector's binary format (``encode_pgvector``).
+
+"held" is what tracemalloc sees allocated for the parsed vectors that travel
+from the embedding client to the DB layer; "bind peak" is the peak while
+deduplicating and building the SQL parameters. Both are measured separately
+from timing, because tracing slows everything down.
+
+Usage:
+    python -m scripts.benchmark_vector_path
+    python -m scripts.benchmark_vector_path --queries 5 --dim 768 --iterations 2000
+"""
+
+import argparse
+import json
+import math
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.core.vectors import as_batch, dedupe_rows, encode_pgvector
+
+DEDUP_THRESHOLD = 0.97
+
+
+def parse_lists(payload: str) -> list:
+    return json.loads(payload)["embeddings"]
+
+
+def parse_batch(payload: str) -> np.ndarray:
+    return as_batch(json.loads(payload)["embeddings"])
+
+
+def params_from_lists(vectors: list) -> list:
+    norms = [math.sqrt(sum(x * x for x in v)) for v in vectors]
+    keep = []
+    for i, v in enumerate(vectors):
+        if all(
+            sum(a * b for a, b in zip(v, vectors[j])) / (norms[i] * norms[j]) < DEDUP_THRESHOLD
+            for j in keep
+        ):
+            keep.append(i)
+    return [f"[{','.join(map(str, vectors[i]))}]" for i in keep]
+
+
+def params_from_batch(batch: np.ndarray) -> list:
+    return [encode_pgvector(row) for row in batch[dedupe_rows(batch, DEDUP_THRESHOLD)]]
+
+
+PATHS = {"lists": (parse_lists, params_from_lists), "numpy": (parse_batch, params_from_batch)}
+
+
+def measure(parse, to_params, payload: str, iterations: int) -> dict:
+    to_params(parse(payload))
+    started = time.perf_counter()
+    for _ in range(iterations):
+        to_params(parse(payload))
+    per_call = (time.perf_counter() - started) / iterations
+
+    tracemalloc.start()
+    vectors = parse(payload)
+    # What the retrieval carries from the embedding client to the DB layer.
+    held_bytes, _ = tracemalloc.get_traced_memory()
+    held_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.reset_peak()
+    params = to_params(vectors)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "us_per_call": per_call * 1e6,
+        "held_kib": held_bytes / 1024,
+        "held_blocks": held_blocks,
+        "peak_kib": peak / 1024,
+        "params_bytes": sum(len(param) for param in params),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the list and float32 vector paths")
+    parser.add_argument("--queries", type=int, default=5, help="Embeddings per retrieval (expanded queries)")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    payload = json.dumps({"embeddings": rng.standard_normal((args.queries, args.dim)).astype(np.float32).tolist()})
+    print(f"{args.queries} x {args.dim} embeddings, {len(payload) / 1024:.0f} KiB JSON response\n")
+
+    print(f"{'path':<6} {'us/call':>9} {'held KiB':>9} {'held blocks':>12} {'bind peak KiB':>14} {'param bytes':>12}")
+    for name, (parse, to_params) in PATHS.items():
+        r = measure(parse, to_params, payload, args.iterations)
+        print(
+            f"{name:<6} {r['us_per_call']:>9.0f} {r['held_kib']:>9.0f} {r['held_blocks']:>12} "
+            f"{r['peak_kib']:>14.0f} {r['params_bytes']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
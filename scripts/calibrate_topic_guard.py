@@ -0,0 +1,139 @@
+"""
+Calibrate the embedding topic guard against the zero-shot MNLI detector.
+
+Reads a labelled JSONL sample, one prompt per line:
+
+    {"text": "how do I build a pipe bomb", "topics": ["violence", "illegal"]}
+    {"text": "summarise recent work on diffusion models", "topics": []}
+
+For every banned topic it scores the sample with both detectors, picks the
+cosine threshold that maximises F1 against the labels, and writes the
+thresholds plus the topic prototypes to a calibration JSON that
+``EmbeddingTopicDetector`` loads via ``guardrails_topic_calibration_path``.
+It also prints (and optionally saves) an agreement report between the two
+detectors.
+
+Usage:
+    python -m scripts.calibrate_topic_guard --sample topic_sample.jsonl \
+        --output topic_calibration.json --report topic_report.json
+"""
+
+import argparse
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.agent_infrastructure.guardrails.guardrails_models import GuardrailsModels
+from app.agent_infrastructure.guardrails.topic_embeddings import EmbeddingTopicDetector
+
+BANNED_TOPICS = ["nudity", "violence", "adult content", "illegal", "hate speech", "offensive"]
+
+
+def _prf(predicted: np.ndarray, actual: np.ndarray) -> dict:
+    tp = int(np.sum(predicted & actual))
+    fp = int(np.sum(predicted & ~actual))
+    fn = int(np.sum(~predicted & actual))
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4)}
+
+
+def _best_threshold(scores: np.ndarray, actual: np.ndarray, default: float) -> float:
+    """Threshold (midpoint between neighbouring scores) with the highest F1."""
+    if not actual.any():
+        # No positives to calibrate on: sit just above the highest negative score.
+        return float(max(default, scores.max() + 1e-3)) if len(scores) else default
+    candidates = np.unique(scores)
+    midpoints = (candidates[:-1] + candidates[1:]) / 2 if len(candidates) > 1 else candidates - 1e-3
+    best, best_f1 = default, -1.0
+    for threshold in midpoints:
+        f1 = _prf(scores > threshold, actual)["f1"]
+        if f1 > best_f1:
+            best, best_f1 = float(threshold), f1
+    return best
+
+
+def calibrate(sample_path: str, mnli_threshold: float, default_threshold: float) -> tuple[dict, dict]:
+    with open(sample_path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    topics = BANNED_TOPICS
+    labels = np.array([[t in row.get("topics", []) for t in topics] for row in rows], dtype=bool)
+
+    guard_models = GuardrailsModels()
+    detector = EmbeddingTopicDetector(calibration_path="")
+
+    mnli_scores = np.zeros(labels.shape, dtype=np.float32)
+    embedding_scores = np.zeros(labels.shape, dtype=np.float32)
+    for i, row in enumerate(rows):
+        result = guard_models._topic_detection_model(text=row["text"], topics=topics)
+        by_label = dict(zip(result["labels"], result["scores"]))
+        mnli_scores[i] = [by_label.get(t, 0.0) for t in topics]
+        embedding_scores[i] = detector.similarities(row["text"], topics)
+        print(f"[{i + 1}/{len(rows)}] scored")
+
+    thresholds = {
+        topic: _best_threshold(embedding_scores[:, j], labels[:, j], default_threshold)
+        for j, topic in enumerate(topics)
+    }
+    limits = np.array([thresholds[t] for t in topics], dtype=np.float32)
+    mnli_predicted = mnli_scores > mnli_threshold
+    embedding_predicted = embedding_scores > limits
+
+    report = {
+        "samples": len(rows),
+        "mnli_threshold": mnli_threshold,
+        "per_topic": {
+            topic: {
+                "positives": int(labels[:, j].sum()),
+                "threshold": round(thresholds[topic], 4),
+                "mnli": _prf(mnli_predicted[:, j], labels[:, j]),
+                "embedding": _prf(embedding_predicted[:, j], labels[:, j]),
+                "agreement": round(float(np.mean(mnli_predicted[:, j] == embedding_predicted[:, j])), 4),
+            }
+            for j, topic in enumerate(topics)
+        },
+        # Prompt-level decision: blocked if any topic fires.
+        "prompt_level": {
+            "mnli": _prf(mnli_predicted.any(axis=1), labels.any(axis=1)),
+            "embedding": _prf(embedding_predicted.any(axis=1), labels.any(axis=1)),
+            "agreement": round(float(np.mean(mnli_predicted.any(axis=1) == embedding_predicted.any(axis=1))), 4),
+        },
+    }
+    calibration = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "thresholds": thresholds,
+        "prototypes": {t: v.tolist() for t, v in zip(topics, detector.prototype_matrix(topics))},
+    }
+    return calibration, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sample", required=True, help="Labelled JSONL sample")
+    parser.add_argument("--output", default="topic_calibration.json", help="Calibration JSON to write")
+    parser.add_argument("--report", help="Optional path for the agreement report JSON")
+    parser.add_argument("--mnli-threshold", type=float, default=0.8)
+    parser.add_argument("--default-threshold", type=float, default=0.5)
+    args = parser.parse_args()
+
+    calibration, report = calibrate(args.sample, args.mnli_threshold, args.default_threshold)
+    with open(args.output, "w") as f:
+        json.dump(calibration, f)
+    print(f"✓ Calibration written to {args.output}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Report written to {args.report}")
+
+    print(f"\n{'topic':<14}{'thr':>7}{'mnli f1':>9}{'emb f1':>8}{'agree':>7}")
+    for topic, r in report["per_topic"].items():
+        print(f"{topic:<14}{r['threshold']:>7.3f}{r['mnli']['f1']:>9.3f}{r['embedding']['f1']:>8.3f}{r['agreement']:>7.3f}")
+    p = report["prompt_level"]
+    print(f"{'any topic':<14}{'':>7}{p['mnli']['f1']:>9.3f}{p['embedding']['f1']:>8.3f}{p['agreement']:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Check the named connection pools and replica routing against real databases.
+
+Initializes ``Database`` from the environment, fires concurrent read queries
+through the ``search`` pool and writes/pings through ``write`` and ``admin``,
+then prints which server answered each search query (by ``inet_server_port``)
+and the per-pool wait times.
+
+To try replica routing locally, run two Postgres instances and point the
+primary settings at one and ``db_read_replica_dsns`` at both, e.g.:
+
+    docker run -d -p 5433:5432 -e POSTGRES_PASSWORD=pg postgres:16
+    docker run -d -p 5434:5432 -e POSTGRES_PASSWORD=pg postgres:16
+    HOST=localhost PORT=5433 DATABASE=postgres USER=postgres PASSWORD=pg db_ssl=disable \
+    db_read_replica_dsns=postgresql://postgres:pg@localhost:5433/postgres,postgresql://postgres:pg@localhost:5434/postgres \
+        python -m scripts.check_db_pools --queries 500 --concurrency 40
+
+Usage:
+    python -m scripts.check_db_pools --queries 500 --concurrency 40 --sleep-ms 5
+"""
+
+import argparse
+import asyncio
+import collections
+import time
+
+from app.db.client import Database, pool_wait_seconds
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Exercise the search/write/admin pools")
+    parser.add_argument("--queries", type=int, default=500, help="Search-pool queries to run")
+    parser.add_argument("--concurrency", type=int, default=40, help="Concurrent callers")
+    parser.add_argument("--sleep-ms", type=float, default=5, help="Server-side duration of each query")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    await Database.init()
+    print(f"init (pools opened and warmed): {time.perf_counter() - started:.2f}s")
+    print("pools:", {name: [named.target for named in group] for name, group in Database._pools.items()})
+
+    servers = collections.Counter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def search_query():
+        async with semaphore:
+            row = await Database.fetchrow(
+                "SELECT inet_server_port() AS port, pg_sleep($1) IS NULL AS slept;",
+                args.sleep_ms / 1000,
+                pool="search",
+            )
+            servers[row["port"]] += 1
+
+    async def write_query():
+        async with semaphore:
+            await Database.execute("SELECT 1;")
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(search_query() for _ in range(args.queries)),
+            *(write_query() for _ in range(args.queries // 10)),
+            *(Database.ping() for _ in range(5)),
+        )
+        elapsed = time.perf_counter() - started
+    finally:
+        await Database.close()
+
+    print(f"\n{args.queries} search queries in {elapsed:.2f}s")
+    for port, count in sorted(servers.items(), key=lambda item: str(item[0])):
+        print(f"  server port {port}: {count} ({count / args.queries:.0%})")
+    print(f"\n{'pool':<8} {'acquires':>9} {'mean wait ms':>13}")
+    for pool in ("search", "write", "admin"):
+        count = pool_wait_seconds.count(pool=pool)
+        mean = pool_wait_seconds.sum(pool=pool) / count * 1000 if count else 0.0
+        print(f"{pool:<8} {count:>9} {mean:>13.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""
+Exercise hedging and circuit breaking against deliberately slow local stubs.
+
+Starts a local HTTP stub whose responses are normally fast but, for a fraction
+of requests, stall like a bad replica. It then compares latency percentiles
+with and without hedging, and finally makes the stub fail to show the breaker
+opening, serving the fallback, and closing again after the reset timeout.
+
+Usage:
+    python -m scripts.check_resilience --requests 400 --slow-fraction 0.05
+"""
+
+import argparse
+import asyncio
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from app.core.resilience import CircuitOpenError, Upstream, hedged_requests
+
+stub = {"fast": 0.01, "slow": 1.0, "slow_fraction": 0.05, "failing": False}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if stub["failing"]:
+            self.send_response(500)
+            self.end_headers()
+            return
+        slow = random.random() < stub["slow_fraction"]
+        time.sleep(stub["slow"] if slow else stub["fast"] * random.uniform(0.5, 1.5))
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub() -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/"
+
+
+def fetch(url: str) -> str:
+    response = requests.get(url, timeout=5)
+    response.raise_for_status()
+    return response.text
+
+
+def percentiles(latencies: list) -> str:
+    latencies = sorted(latencies)
+    pick = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+    return f"p50={pick(50):7.1f}ms p95={pick(95):7.1f}ms p99={pick(99):7.1f}ms max={latencies[-1] * 1000:7.1f}ms"
+
+
+def run_sync(upstream: Upstream, url: str, count: int) -> list:
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        upstream.call(lambda: fetch(url))
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def run_async(upstream: Upstream, count: int) -> list:
+    async def slow_call():
+        slow = random.random() < stub["slow_fraction"]
+        await asyncio.sleep(stub["slow"] if slow else stub["fast"] * random.uniform(0.5, 1.5))
+        return "ok"
+
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        await upstream.acall(slow_call)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def check_breaker(url: str) -> None:
+    upstream = Upstream("stub_breaker", hedge=False, failure_threshold=3, reset_timeout=0.5)
+    stub["failing"] = True
+    outcomes = [upstream.call(lambda: fetch(url), fallback=lambda e: type(e).__name__) for _ in range(5)]
+    print(f"failing stub        -> {outcomes} breaker={upstream.breaker.state}")
+    assert upstream.breaker.state == "open" and outcomes[-1] == "CircuitOpenError"
+    try:
+        upstream.call(lambda: fetch(url))
+    except CircuitOpenError:
+        print("no fallback         -> CircuitOpenError raised without calling the stub")
+
+    stub["failing"] = False
+    time.sleep(0.6)
+    print(f"after reset timeout -> {upstream.call(lambda: fetch(url))!r} breaker={upstream.breaker.state}")
+    assert upstream.breaker.state == "closed"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hedging and circuit breaker check against local stubs")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--slow-fraction", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=1000)
+    args = parser.parse_args()
+    stub["slow_fraction"] = args.slow_fraction
+    stub["slow"] = args.slow_ms / 1000
+
+    url = start_stub()
+    for name, hedge in [("sync, no hedging", False), ("sync, hedged", True)]:
+        upstream = Upstream(f"stub_sync_{hedge}", hedge=hedge, max_hedge_delay=0.2)
+        print(f"{name:<20} {percentiles(run_sync(upstream, url, args.requests))}")
+    for name, hedge in [("async, no hedging", False), ("async, hedged", True)]:
+        upstream = Upstream(f"stub_async_{hedge}", hedge=hedge, max_hedge_delay=0.2)
+        print(f"{name:<20} {percentiles(asyncio.run(run_async(upstream, args.requests)))}")
+
+    for name in ("stub_sync_True", "stub_async_True"):
+        won = hedged_requests.value(upstream=name, winner="hedge")
+        sent = won + hedged_requests.value(upstream=name, winner="primary")
+        print(f"{name}: {int(sent)} hedges sent, hedge won {won / sent:.0%}" if sent else f"{name}: no hedges sent")
+
+    check_breaker(url)
+
+
+if __name__ == "__main__":
+    main()
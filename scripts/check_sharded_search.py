@@ -0,0 +1,120 @@
+"""
+Check scatter-gather vector search against several local shard databases.
+
+With ``--setup`` the script creates an ``arxiv`` table (pgvector) on every
+shard, ingests random rows through ``Database.insert_arxiv_rows`` (so they
+are routed by the configured strategy) and then compares sharded search with
+an exact brute-force top-k computed in NumPy over the same rows. Tables have
+no ANN index, so the sharded result should match exactly. A very small
+``--shard-timeout-ms`` shows partial results being reported.
+
+Setup only runs against localhost DSNs, since it replaces the arxiv table.
+
+Example with three local Postgres instances (pgvector image):
+
+    for port in 5441 5442 5443; do docker run -d -p $port:5432 -e POSTGRES_PASSWORD=pg pgvector/pgvector:pg16; done
+    HOST=localhost PORT=5441 DATABASE=postgres USER=postgres PASSWORD=pg db_ssl=disable \
+    db_shard_dsns=postgresql://postgres:pg@localhost:5441/postgres,postgresql://postgres:pg@localhost:5442/postgres,postgresql://postgres:pg@localhost:5443/postgres \
+        python -m scripts.check_sharded_search --setup --rows 3000
+
+Usage:
+    python -m scripts.check_sharded_search --setup --rows 3000 --dim 64 --queries 50
+    python -m scripts.check_sharded_search --shard-timeout-ms 1
+"""
+
+import argparse
+import asyncio
+import datetime
+import statistics
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.db.client import Database
+
+SETUP_SQL = """
+CREATE EXTENSION IF NOT EXISTS vector;
+DROP TABLE IF EXISTS arxiv;
+CREATE TABLE arxiv (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    abstract TEXT,
+    category TEXT,
+    published DATE,
+    embedding vector({dim})
+);
+"""
+
+
+def random_rows(count: int, dim: int, rng: np.random.Generator) -> list:
+    start = datetime.date(2010, 1, 1)
+    return [
+        {
+            "id": f"check-{i}",
+            "title": f"Paper {i}",
+            "abstract": f"Abstract of paper {i}",
+            "category": f"cs.{'ABCDE'[i % 5]}",
+            "published": start + datetime.timedelta(days=int(rng.integers(0, 5000))),
+            "embedding": rng.standard_normal(dim).astype(np.float32).tolist(),
+        }
+        for i in range(count)
+    ]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare sharded vector search with exact brute force")
+    parser.add_argument("--setup", action="store_true", help="(Re)create arxiv on every shard and ingest random rows")
+    parser.add_argument("--rows", type=int, default=3000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--shard-timeout-ms", type=float, help="Override db_shard_timeout_seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not settings.db_shard_dsns:
+        raise SystemExit("Set db_shard_dsns to the shard databases first")
+    if args.shard_timeout_ms is not None:
+        settings.db_shard_timeout_seconds = args.shard_timeout_ms / 1000
+
+    rng = np.random.default_rng(args.seed)
+    rows = random_rows(args.rows, args.dim, rng)
+    await Database.init()
+    try:
+        if args.setup:
+            if not all("localhost" in dsn or "127.0.0.1" in dsn for dsn in settings.db_shard_dsns):
+                raise SystemExit("--setup only runs against localhost shards")
+            for shard in range(len(settings.db_shard_dsns)):
+                async with Database._acquire(shard=shard) as con:
+                    await con.execute(SETUP_SQL.format(dim=args.dim))
+            started = time.perf_counter()
+            counts = await Database.insert_arxiv_rows(rows)
+            print(f"ingested {args.rows} rows in {time.perf_counter() - started:.2f}s, per shard: {counts}")
+
+        matrix = np.array([row["embedding"] for row in rows], dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        ids = np.array([row["id"] for row in rows])
+
+        latencies, recalls, partial = [], [], 0
+        for _ in range(args.queries):
+            query = rng.standard_normal(args.dim).astype(np.float32)
+            missing = []
+            started = time.perf_counter()
+            results = await Database.fetch_batch_vector_search([query.tolist()], limit=args.limit, missing_shards=missing)
+            latencies.append(time.perf_counter() - started)
+            partial += bool(missing)
+            # Cosine distance, as pgvector's <=> operator.
+            expected = set(ids[np.argsort(-(matrix @ (query / np.linalg.norm(query))))[:args.limit]])
+            recalls.append(len(expected & {paper.id for paper in results}) / args.limit)
+    finally:
+        await Database.close()
+
+    print(f"{args.queries} queries over {len(settings.db_shard_dsns)} shards")
+    print(f"  latency p50 {statistics.median(latencies) * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms")
+    print(f"  recall@{args.limit} vs brute force: {statistics.mean(recalls):.3f}")
+    print(f"  partial results: {partial}/{args.queries}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
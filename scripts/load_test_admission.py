@@ -0,0 +1,126 @@
+"""
+Overload test for /chat/ admission control.
+
+Runs many concurrent clients for a fixed duration and reports latency
+percentiles of successful requests plus how many were shed with 429/503.
+
+By default it runs in-process against a simulated backend whose service time
+grows once concurrency exceeds its capacity (like the 10-connection DB pool
+and upstream rate limits), once without and once with ``AdmissionController``,
+so the two p99s can be compared. With ``--url`` it drives a real deployment.
+
+Usage:
+    python -m scripts.load_test_admission --clients 100 --duration 20
+    python -m scripts.load_test_admission --url http://localhost:80 --token $api_auth_token --clients 50
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.admission import AdmissionController
+
+
+def simulated_app(admission: AdmissionController | None, capacity: int, base_latency: float) -> FastAPI:
+    """A /chat/ stand-in whose latency degrades linearly past ``capacity`` concurrent requests."""
+    app = FastAPI()
+    in_flight = 0
+
+    async def work():
+        nonlocal in_flight
+        in_flight += 1
+        try:
+            await asyncio.sleep(base_latency * max(1.0, in_flight / capacity) * random.uniform(0.8, 1.2))
+        finally:
+            in_flight -= 1
+
+    @app.post("/chat/")
+    async def chat(payload: dict):
+        if admission is None:
+            await work()
+        else:
+            async with admission.admit(payload["user_id"]):
+                await work()
+        return {"answer": "ok"}
+
+    return app
+
+
+async def run_load(client: httpx.AsyncClient, clients: int, users: int, duration: float) -> dict:
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + duration
+
+    async def worker(i: int):
+        payload = {"user_id": f"user-{i % users}", "messages": [{"role": "user", "content": "what is LoRA?"}]}
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.post("/chat/", json=payload)
+            elapsed = time.perf_counter() - started
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                latencies.append(elapsed)
+            else:
+                retry_after = float(response.headers.get("Retry-After", "1"))
+                await asyncio.sleep(min(retry_after, 1.0))
+
+    await asyncio.gather(*(worker(i) for i in range(clients)))
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000 if latencies else float("nan")
+
+    return {
+        "statuses": statuses,
+        "throughput_rps": round(len(latencies) / duration, 2),
+        "p50_ms": round(pct(50), 1),
+        "p99_ms": round(pct(99), 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1) if latencies else float("nan"),
+    }
+
+
+def report(name: str, result: dict) -> None:
+    print(
+        f"{name:<22} ok/s={result['throughput_rps']:<8} p50={result['p50_ms']:>8}ms "
+        f"p99={result['p99_ms']:>8}ms statuses={result['statuses']}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Admission control overload test")
+    parser.add_argument("--url", help="Target a running server instead of the simulation")
+    parser.add_argument("--token", help="API bearer token (with --url)")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--capacity", type=int, default=8, help="Simulated backend capacity")
+    parser.add_argument("--base-latency", type=float, default=0.2, help="Simulated service time at capacity")
+    args = parser.parse_args()
+
+    if args.url:
+        headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+        async with httpx.AsyncClient(base_url=args.url, headers=headers, timeout=300) as client:
+            report("server", await run_load(client, args.clients, args.users, args.duration))
+        return
+
+    for name, admission in [
+        ("no admission control", None),
+        ("admission control", AdmissionController(
+            max_concurrency=args.capacity,
+            max_queue=args.capacity * 4,
+            max_queue_per_user=4,
+            queue_timeout=args.base_latency * 8,
+        )),
+    ]:
+        app = simulated_app(admission, args.capacity, args.base_latency)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=300) as client:
+            report(name, await run_load(client, args.clients, args.users, args.duration))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
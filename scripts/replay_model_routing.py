@@ -0,0 +1,161 @@
+"""
+Offline replay for tuning gpt-4o / gpt-4o-mini routing against DeepEval scores.
+
+For every query the documents are retrieved once, then both models generate
+an answer from the same context (the fast-path prompt), and each answer is
+scored by DeepEval (answer relevancy and faithfulness). From those rows the
+script
+
+* evaluates a grid of heuristic thresholds: share routed to mini, mean
+  quality and mean generation latency, next to the all-4o and all-mini
+  baselines;
+* fits the logistic classifier used by ``model_routing_mode=classifier``
+  (label: mini scores within ``--tolerance`` of gpt-4o) and writes its weights.
+
+Rows can be saved and re-used to re-tune without calling the models again.
+
+Usage:
+    python -m scripts.replay_model_routing --rows-output routing_rows.json
+    python -m scripts.replay_model_routing --rows routing_rows.json --classifier-output routing_classifier.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import time
+
+import numpy as np
+from deepeval.metrics import AnswerRelevancyMetric, FaithfulnessMetric
+from deepeval.test_case import LLMTestCase
+from langchain_core.messages import HumanMessage
+
+from app.agent_infrastructure.agents.fast_path import format_context
+from app.agent_infrastructure.agents.model_router import (
+    FEATURE_NAMES,
+    LARGE_MODEL,
+    MODELS,
+    SMALL_MODEL,
+    ModelRoutingPolicy,
+    RoutingFeatures,
+    extract_features,
+    get_model,
+)
+from app.agent_infrastructure.evaluation.deepeval import build_judge_model
+from app.agent_infrastructure.prompt_templates import rag_answer_prompt_template
+from app.agent_infrastructure.tools.document_retriver import document_retriever_utils
+from app.db.client import Database
+from scripts.ab_replay_pipelines import DEFAULT_QUERIES
+
+
+async def score(judge, query: str, answer: str, context: list) -> float:
+    test_case = LLMTestCase(input=query, actual_output=answer, retrieval_context=context or [""])
+    values = []
+    for metric in (AnswerRelevancyMetric(model=judge), FaithfulnessMetric(model=judge)):
+        try:
+            await metric.a_measure(test_case)
+            values.append(metric.score)
+        except Exception as e:
+            print(f"❌ {metric.__name__} failed for '{query[:40]}': {e}")
+    return statistics.mean(values) if values else float("nan")
+
+
+async def collect_rows(queries: list) -> list:
+    await Database.init()
+    judge = build_judge_model()
+    rows = []
+    try:
+        for query in queries:
+            documents = await document_retriever_utils(query)
+            state = {"messages": [HumanMessage(content=query)], "retrieved_docs": [documents]}
+            row = {"query": query, "features": extract_features(state).__dict__, "models": {}}
+            messages = rag_answer_prompt_template(format_context(documents)) + [HumanMessage(content=query)]
+            for name in MODELS:
+                started = time.perf_counter()
+                response = await get_model(name).ainvoke(messages)
+                latency = time.perf_counter() - started
+                quality = await score(judge, query, response.content, [d.abstract for d in documents])
+                row["models"][name] = {"latency_s": latency, "quality": quality}
+            print(
+                f"{query[:60]:<60} 4o={row['models'][LARGE_MODEL]['quality']:.2f} "
+                f"mini={row['models'][SMALL_MODEL]['quality']:.2f}"
+            )
+            rows.append(row)
+    finally:
+        await Database.close()
+    return rows
+
+
+def evaluate_policy(rows: list, choose) -> dict:
+    """Quality and latency if each row's model had been picked by ``choose(features) -> model``."""
+    chosen = [choose(RoutingFeatures(**row["features"])) for row in rows]
+    quality = [row["models"][model]["quality"] for row, model in zip(rows, chosen)]
+    latency = [row["models"][model]["latency_s"] for row, model in zip(rows, chosen)]
+    return {
+        "mini_share": chosen.count(SMALL_MODEL) / len(rows),
+        "quality": float(np.nanmean(quality)),
+        "latency_s": statistics.mean(latency),
+    }
+
+
+def fit_classifier(rows: list, tolerance: float, epochs: int = 5000, lr: float = 0.1) -> dict:
+    """Logistic regression (plain gradient descent) on the routing features."""
+    x = np.array([RoutingFeatures(**row["features"]).vector() for row in rows], dtype=np.float64)
+    y = np.array([
+        float(row["models"][SMALL_MODEL]["quality"] >= row["models"][LARGE_MODEL]["quality"] - tolerance)
+        for row in rows
+    ])
+    weights, bias = np.zeros(x.shape[1]), 0.0
+    for _ in range(epochs):
+        p = 1 / (1 + np.exp(-(x @ weights + bias)))
+        weights -= lr * (x.T @ (p - y) / len(y) + 1e-3 * weights)
+        bias -= lr * float(np.mean(p - y))
+    accuracy = float(np.mean((1 / (1 + np.exp(-(x @ weights + bias))) >= 0.5) == y))
+    print(f"\nclassifier: {y.mean():.0%} of queries fine on mini, training accuracy {accuracy:.0%}")
+    return {"feature_names": FEATURE_NAMES, "weights": weights.tolist(), "bias": bias, "threshold": 0.5}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune gpt-4o / gpt-4o-mini routing offline")
+    parser.add_argument("--queries", help="Text file with one query per line (default: built-in set)")
+    parser.add_argument("--rows", help="Re-use rows saved by --rows-output instead of calling the models")
+    parser.add_argument("--rows-output", help="Save the collected rows as JSON")
+    parser.add_argument("--classifier-output", help="Write fitted classifier weights (for model_routing_classifier_path)")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Quality drop still counted as 'mini is fine'")
+    args = parser.parse_args()
+
+    if args.rows:
+        with open(args.rows) as f:
+            rows = json.load(f)
+    else:
+        queries = DEFAULT_QUERIES
+        if args.queries:
+            with open(args.queries) as f:
+                queries = [line.strip() for line in f if line.strip()]
+        rows = asyncio.run(collect_rows(queries))
+        if args.rows_output:
+            with open(args.rows_output, "w") as f:
+                json.dump(rows, f, indent=2)
+
+    print(f"\n{'policy':<34} {'mini':>6} {'quality':>8} {'latency':>8}")
+    for name, model in (("all gpt-4o", LARGE_MODEL), ("all gpt-4o-mini", SMALL_MODEL)):
+        result = evaluate_policy(rows, lambda features, model=model: model)
+        print(f"{name:<34} {result['mini_share']:>6.0%} {result['quality']:>8.3f} {result['latency_s']:>7.2f}s")
+
+    for words, chars in itertools.product((10, 15, 20, 30, 40), (3000, 6000, 9000, 12000)):
+        policy = ModelRoutingPolicy(max_query_words=words, max_context_chars=chars)
+        result = evaluate_policy(rows, lambda features: policy.choose(features)[0])
+        print(
+            f"{f'heuristic words<={words} ctx<={chars}':<34} {result['mini_share']:>6.0%} "
+            f"{result['quality']:>8.3f} {result['latency_s']:>7.2f}s"
+        )
+
+    if args.classifier_output:
+        with open(args.classifier_output, "w") as f:
+            json.dump(fit_classifier(rows, args.tolerance), f, indent=2)
+        print(f"Wrote {args.classifier_output}")
+
+
+if __name__ == "__main__":
+    main()